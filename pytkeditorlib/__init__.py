@@ -17,4 +17,11 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 from .utils import __version__
-from .app import App
+
+
+def __getattr__(name):
+    # App is imported on demand so that submodules can be imported alone
+    if name == 'App':
+        from .app import App
+        return App
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
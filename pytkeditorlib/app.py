@@ -24,14 +24,15 @@ import tkinter as tk
 from tkinter import ttk
 import traceback
 import os
+import sys
 import signal
 import logging
-from subprocess import Popen, PIPE
+import queue
+from itertools import chain
+from subprocess import Popen
 from getpass import getuser
 from datetime import datetime
 
-from ewmh import ewmh, EWMH
-import pdfkit
 from tkfilebrowser import askopenfilenames, asksaveasfilename
 from pygments import highlight
 from pygments.formatters import HtmlFormatter
@@ -41,26 +42,34 @@ from pytkeditorlib.code_editor import EditorNotebook
 from pytkeditorlib.utils.constants import IMAGES, CONFIG, IM_CLOSE, IM_SELECTED
 from pytkeditorlib.utils import constants as cst
 from pytkeditorlib.utils import check_file
+from pytkeditorlib.utils.fileio import iter_file_chunks
+from pytkeditorlib.utils.filewatcher import FileWatcher
+from pytkeditorlib.utils.jupyter_link import JupyterLink
+from pytkeditorlib.utils.kernel_completion import KernelCompleter
+from pytkeditorlib.utils.lazy_import import pdfkit, jupyter_client, warm_up
+from pytkeditorlib.utils import startup_trace, instance
 from pytkeditorlib.dialogs import showerror, About, Config, SearchDialog, \
-    PrintDialog, HelpDialog, SelectKernel, askyesno
+    PrintDialog, HelpDialog, SelectKernel, Diagnostics, askyesno
 from pytkeditorlib.widgets import WidgetNotebook, Help, HistoryFrame, \
-    ConsoleFrame, Filebrowser, CodeStructure
+    ConsoleFrame, Filebrowser, CodeStructure, VariableExplorer, JupyterOutput
 from pytkeditorlib.gui_utils import LongMenu
 
 
 class App(tk.Tk):
-    def __init__(self, pid, *files):
+    def __init__(self, pid, *files, server=None):
+        startup_trace.phase('Tk')
         tk.Tk.__init__(self, className='PyTkEditor')
         self.pid = pid
-        self.tk.eval('package require Tkhtml')
         self.title('PyTkEditor')
         self.configure(cursor='watch')
         self.update_idletasks()
+        startup_trace.phase('splash')
         self.splash = Popen(['python',
                              os.path.join(os.path.dirname(__file__), 'utils', 'splash.py')])
         self._frame = ttk.Frame(self, padding=(0, 0, 0, 4))
 
         # --- images
+        startup_trace.phase('images')
         self._images = {name: tk.PhotoImage(f'img_{name}', file=IMAGES[name], master=self)
                         for name, path in IMAGES.items()}
         self._images['img_menu_dummy'] = tk.PhotoImage('img_menu_dummy', width=18, height=18, master=self)
@@ -70,6 +79,7 @@ class App(tk.Tk):
         self._im_selected = tk.PhotoImage(name='img_selected', master=self)
         self.iconphoto(True, 'img_icon')
 
+        startup_trace.phase('menus creation')
         self.option_add('*Menu.borderWidth', 1)
         self.option_add('*Menu.activeBorderWidth', 0)
         self.option_add('*Menu.relief', 'sunken')
@@ -103,6 +113,7 @@ class App(tk.Tk):
         self.recent_files = [f for f in recent_files if f and os.path.exists(f)]
 
         # --- style
+        startup_trace.phase('style')
         for seq in self.bind_class('TButton'):
             self.bind_class('Notebook.Tab.Close', seq, self.bind_class('TButton', seq), True)
         style = ttk.Style(self)
@@ -110,37 +121,68 @@ class App(tk.Tk):
         self._setup_style()
 
         # --- jupyter kernel
-        self._qtconsole_process = None
-        self._qtconsole_ready = False
-        self.jupyter_kernel = None
-        self.jupyter_kernel_existing = False
+        self.jupyter = JupyterLink(self, self._on_jupyter_output,
+                                   lambda msg, err: showerror('Error', msg, err, False))
+        self._qtconsole = None  # Jupyter QtConsole connected to the kernel
+
+        # --- external modifications
+        startup_trace.phase('file watcher')
+        self.file_watcher = FileWatcher()
+        self.file_watcher.start()
 
         # --- GUI elements
         self._horizontal_pane = ttk.PanedWindow(self._frame, orient='horizontal')
         self._vertical_pane = ttk.PanedWindow(self._horizontal_pane, orient='vertical')
         # --- --- editor notebook
-        self.editor = EditorNotebook(self._horizontal_pane, width=696)
+        startup_trace.phase('widget: EditorNotebook')
+        self.editor = EditorNotebook(self._horizontal_pane, width=696,
+                                     watcher=self.file_watcher,
+                                     loadcommand=self._load_lazy_tab)
+        if cst.JUPYTER:
+            self.editor.kernel_completer = KernelCompleter(self.jupyter)
         # --- --- right pane
+        startup_trace.phase('widget: WidgetNotebook')
         self.right_nb = WidgetNotebook(self._horizontal_pane)
-        widgets = ['Code structure', 'Console', 'History', 'Help', 'File browser']
+        widgets = ['Code structure', 'Console', 'History', 'Help', 'File browser',
+                   'Variables']
+        if cst.JUPYTER:
+            widgets.append('Jupyter')
         widgets.sort(key=lambda w: CONFIG.getint(w, 'order', fallback=0))
         # --- --- code structure tree
+        startup_trace.phase('widget: CodeStructure')
         self.codestruct = CodeStructure(self._horizontal_pane, self.right_nb)
         # --- --- --- command history
+        startup_trace.phase('widget: History')
         self.widgets['History'] = HistoryFrame(self.right_nb, padding=1)
         # --- --- --- python console
+        startup_trace.phase('widget: Console')
         self.widgets['Console'] = ConsoleFrame(self.right_nb,
                                                history=self.widgets['History'].history,
                                                padding=1)
         self.console = self.widgets['Console'].console
+        self.editor.cell_session = self._cell_session
+        # --- --- --- variable explorer
+        startup_trace.phase('widget: Variables')
+        self.widgets['Variables'] = VariableExplorer(self.right_nb, self.console.request,
+                                                     padding=1)
+        self.console.set_explorer(self.widgets['Variables'])
         # --- --- --- help
+        startup_trace.phase('widget: Help')
         self.widgets['Help'] = Help(self.right_nb, padding=1,
                                     help_cmds={'Editor': self.editor.get_docstring,
                                                'Console': self.console.get_docstring})
         # --- --- --- filebrowser
-        self.widgets['File browser'] = Filebrowser(self.right_nb, self.open_file)
+        startup_trace.phase('widget: File browser')
+        self.widgets['File browser'] = Filebrowser(self.right_nb, self.open_file,
+                                                   watcher=self.file_watcher)
+        # --- --- --- jupyter outputs
+        if cst.JUPYTER:
+            startup_trace.phase('widget: Jupyter')
+            self.widgets['Jupyter'] = JupyterOutput(self.right_nb, self.jupyter.interrupt,
+                                                    self.restart_jupyter, padding=1)
 
         # --- --- placement
+        startup_trace.phase('layout')
         self._frame.pack(fill='both', expand=True)
         self._horizontal_pane.pack(fill='both', expand=True)
         for name in widgets:
@@ -155,6 +197,7 @@ class App(tk.Tk):
         self.right_nb.select_first_tab()
 
         # --- menu
+        startup_trace.phase('menus')
         # --- --- file
         self.menu_file.add_command(label='New', command=self.new,
                                    image='img_new',
@@ -305,6 +348,10 @@ class App(tk.Tk):
                              command=lambda: self.run_cell(goto_next=True),
                              compound='left', label='Run cell and advance',
                              accelerator='Shift+Return')
+        menu_run.add_command(image='img_run_cell',
+                             command=self.run_modified_cells,
+                             compound='left', label='Run modified cells',
+                             accelerator='F6')
         menu_run.add_separator()
         menu_run.add_command(image='img_run_selection',
                              command=self.run_selection,
@@ -313,7 +360,7 @@ class App(tk.Tk):
         if cst.JUPYTER:
             menu_run.add_command(image='img_qtconsole_run',
                                  command=self.execute_in_jupyter,
-                                 compound='left', label='Run selected code in Jupyter QtConsole',
+                                 compound='left', label='Run selected code in Jupyter kernel',
                                  accelerator='F10')
         # --- --- consoles
         menu_consoles.add_command(label='Clear console',
@@ -326,7 +373,7 @@ class App(tk.Tk):
                                   compound='left')
         if cst.JUPYTER:
             menu_consoles.add_separator()
-            menu_consoles.add_command(label='Start Jupyter QtConsole',
+            menu_consoles.add_command(label='Start Jupyter kernel',
                                       command=self.start_jupyter,
                                       image='img_qtconsole',
                                       compound='left')
@@ -334,6 +381,15 @@ class App(tk.Tk):
                                       command=self.start_jupyter_existing_kernel,
                                       image='img_menu_dummy',
                                       compound='left')
+            menu_consoles.add_command(label='Restart Jupyter kernel',
+                                      command=self.restart_jupyter,
+                                      image='img_menu_dummy',
+                                      compound='left')
+            if cst.QTCONSOLE:
+                menu_consoles.add_command(label='Open Jupyter QtConsole',
+                                          command=self.open_qtconsole,
+                                          image='img_menu_dummy',
+                                          compound='left')
 
         # --- --- view
         menu_view.add_cascade(label='Panes', menu=menu_widgets,
@@ -397,6 +453,7 @@ class App(tk.Tk):
                               image='img_about', compound='left')
         menu_help.add_command(label='Help', command=lambda: HelpDialog(self),
                               image='img_help', compound='left')
+        menu_help.add_command(label='Diagnostics', command=lambda: Diagnostics(self))
 
         # --- --- menu bar
         self.menu.add_cascade(label='File', underline=0, menu=self.menu_file)
@@ -412,6 +469,7 @@ class App(tk.Tk):
         self.toggle_menubar()
 
         # --- bindings
+        startup_trace.phase('bindings')
         self.bind_class('TCombobox', '<<ComboboxSelected>>',
                         lambda e: e.widget.selection_clear(), True)
         self.bind_class('TEntry', '<Control-a>', self._select_all)
@@ -447,36 +505,35 @@ class App(tk.Tk):
         self.bind('<Control-Shift-I>', lambda e: self.switch_to_widget(e, self.widgets['History']))
         self.bind('<Control-Shift-F>', lambda e: self.switch_to_widget(e, self.widgets['File browser']))
         self.bind('<Control-Shift-G>', lambda e: self.switch_to_widget(e, self.codestruct))
+        self.bind('<Control-Shift-V>', lambda e: self.switch_to_widget(e, self.widgets['Variables']))
         self.bind('<Control-Shift-Q>', self.quit)
         self.bind('<<CtrlReturn>>', self.run_cell)
         self.bind('<<ShiftReturn>>', lambda e: self.run_cell(goto_next=True))
         self.bind('<F5>', self.run)
+        self.bind('<F6>', self.run_modified_cells)
         self.bind('<F9>', self.run_selection)
         if cst.JUPYTER:
+            self.bind('<Control-Shift-J>', lambda e: self.switch_to_widget(e, self.widgets['Jupyter']))
             self.bind('<F10>', self.execute_in_jupyter)
         self.bind('<F11>', self.toggle_fullscreen)
 
         # --- maximize window
+        startup_trace.phase('maximize window')
         self.update_idletasks()
-        e = EWMH()
-        try:
-            for w in e.getClientList():
-                if w.get_wm_name() == self.title():
-                    e.setWmState(w, 1, '_NET_WM_STATE_MAXIMIZED_VERT')
-                    e.setWmState(w, 1, '_NET_WM_STATE_MAXIMIZED_HORZ')
-            e.display.flush()
-        except ewmh.display.error.BadWindow:
-            pass
+        self.attributes('-zoomed', True)
         self.update_idletasks()
         self.change_layout(True)
         self.toggle_fullscreen()
 
         # --- restore opened files
+        startup_trace.phase('restore files')
+        # only the first file is loaded now, the others when their tab is selected
         ofiles = CONFIG.get('General', 'opened_files').split(', ')
         for f in ofiles:
             if os.path.exists(f):
-                self.open_file(os.path.abspath(f))
+                self.open_file(os.path.abspath(f), lazy=True)
         # --- open files passed in argument
+        startup_trace.phase('open files')
         for f in files:
             self.open_file(os.path.abspath(f))
 
@@ -484,30 +541,97 @@ class App(tk.Tk):
             self._on_empty_notebook()
 
         self.protocol('WM_DELETE_WINDOW', self.quit)
+        self._processing_file_events = False
+        self.tk.createfilehandler(self.file_watcher.fileno(), tk.READABLE,
+                                  self._check_file_events)
+        self._check_file_events()
+        # --- files opened from other launches
+        self._server = server
+        self._clients = {}      # client socket: received data
+        self._requests = []     # [(client socket, files), ...]
+        self._requests_id = ''
+        if server is not None:
+            server.setblocking(False)
+            self.tk.createfilehandler(server, tk.READABLE, self._server_accept)
 
         # --- signals
-        signal.signal(signal.SIGUSR1, self._signal_open_files)
-        signal.signal(signal.SIGUSR2, self._signal_exec_jupyter)
+        startup_trace.phase(None)
         signal.signal(signal.SIGINT, self.kill)
         signal.signal(signal.SIGTERM, self.quit)
 
         self.configure(cursor='')
         self.splash.terminate()
+        # load the modules needed by the other features once the window is displayed
+        self.after(500, self._warm_up)
+        # time until the window is drawn
+        start = startup_trace.now()
+        self.after_idle(lambda: startup_trace.record('first frame', start, startup_trace.now(), 0))
+
+    def _warm_up(self):
+        """Import in advance the modules whose loading has been deferred."""
+        try:
+            self.tk.call('package', 'require', 'Tkhtml')
+        except tk.TclError as e:
+            logging.error(str(e))
+        warm_up('pytkeditorlib.utils.rst2html', 'pytkeditorlib.utils.syntax_check')
 
     @staticmethod
     def _select_all(event):
         """Select all entry content."""
         event.widget.selection_range(0, "end")
 
-    def _signal_open_files(self, *args):
+    # --- single instance
+    def _server_accept(self, server, mask):
+        """Accept the connection of another launch."""
+        try:
+            client = server.accept()[0]
+        except OSError:
+            return
+        client.setblocking(False)
+        self._clients[client] = b''
+        self.tk.createfilehandler(client, tk.READABLE, self._server_read)
+
+    def _server_read(self, client, mask):
+        """Read the files sent by another launch."""
+        try:
+            data = client.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            logging.error('Failed to read open request: %s', e)
+            self.tk.deletefilehandler(client)
+            del self._clients[client]
+            client.close()
+            return
+        if data:
+            self._clients[client] += data
+            return
+        # end of the request
+        self.tk.deletefilehandler(client)
+        self._requests.append((client, instance.decode_files(self._clients.pop(client))))
+        if not self._requests_id:
+            # batch the requests received in the meantime
+            self._requests_id = self.after_idle(self._open_requested_files)
+
+    def _open_requested_files(self):
+        """Open the files sent by the other launches and acknowledge them."""
+        self._requests_id = ''
+        requests, self._requests = self._requests, []
+        files = [file for client, client_files in requests for file in client_files]
+        self.deiconify()
         self.lift()
-        self.focus_get()
-        if os.path.exists(cst.OPENFILE_PATH):
-            with open(cst.OPENFILE_PATH) as f:
-                files = f.read().splitlines()
-            os.remove(cst.OPENFILE_PATH)
-            for f in files:
-                self.open_file(os.path.abspath(f))
+        self.focus_force()
+        # only the last file is loaded now, the others when their tab is selected
+        for file in files[:-1]:
+            self.open_file(file, lazy=True)
+        if files:
+            self.open_file(files[-1])
+        for client, client_files in requests:
+            try:
+                client.sendall(instance.ACK)
+            except OSError as e:
+                logging.error('Failed to acknowledge open request: %s', e)
+            client.close()
 
     def _setup_style(self):
         # --- load theme
@@ -1017,7 +1141,28 @@ class App(tk.Tk):
         for widget in self.widgets.values():
             widget.update_style()
 
+    def _check_file_events(self, *args):
+        """Process the external modifications reported by the file watcher."""
+        self.file_watcher.clear()
+        if self._processing_file_events:
+            # a prompt is displayed, the new events are processed once it is closed
+            return
+        self._processing_file_events = True
+        try:
+            while True:
+                try:
+                    path, kind = self.file_watcher.events.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == 'changed':
+                    self.widgets['File browser'].refresh(path)
+                else:
+                    self.editor.on_file_event(path)
+        finally:
+            self._processing_file_events = False
+
     def kill(self, *args):
+        self.file_watcher.stop()
         self.splash.kill()
         self.destroy()
 
@@ -1032,8 +1177,12 @@ class App(tk.Tk):
             CONFIG.save()
             res = self.editor.closeall()
             if res:
+                self.editor.flush()
+                self.file_watcher.stop()
                 self.save_layout()
-                self._kernel_disconnect()
+                self.jupyter.close()
+                if self._qtconsole is not None and self._qtconsole.poll() is None:
+                    self._qtconsole.terminate()
                 self.destroy()
                 self.splash.terminate()
                 self.splash.wait()
@@ -1089,61 +1238,98 @@ class App(tk.Tk):
             self.menu_recent_files.delete(self.menu_recent_files.index('end'))
 
     def load_file(self, file):
+        """Return an iterator over the chunks of file or None if it cannot be read."""
         try:
-            with open(file) as f:
-                txt = f.read()
-            return txt
+            chunks = iter_file_chunks(file)
+            first = next(chunks, None)  # open file and catch errors early
         except Exception as e:
-            if file in self.recent_files:
-                ind = self.recent_files.index(file)
-                del self.recent_files[ind]
-                self.menu_recent_files.delete(ind)
-            if isinstance(e, FileNotFoundError) or isinstance(e, IsADirectoryError):
-                return
-            elif isinstance(e, UnicodeDecodeError):
-                msg = 'Invalid file format: {}.'.format(file)
-                showerror('Error', msg, parent=self)
-                logging.error(msg)
+            self._load_error(file, e)
+        else:
+            return chain([first] if first else [], chunks)
+
+    def _load_error(self, file, e):
+        """Handle error e raised while loading file."""
+        if file in self.recent_files:
+            ind = self.recent_files.index(file)
+            del self.recent_files[ind]
+            self.menu_recent_files.delete(ind)
+        if isinstance(e, FileNotFoundError) or isinstance(e, IsADirectoryError):
+            return
+        elif isinstance(e, UnicodeDecodeError):
+            msg = 'Invalid file format: {}.'.format(file)
+            showerror('Error', msg, parent=self)
+            logging.error(msg)
+        else:
+            err = "".join(traceback.format_exception(type(e), e, e.__traceback__))
+            logging.error(err)
+            showerror('Error', "{}: {}".format(type(e), e), err, parent=self)
+
+    def _load(self, tab, file, chunks):
+        """Stream file content in tab, the analysis is done once it is loaded."""
+
+        def on_loaded(tab, error):
+            if error is not None:
+                self.editor.close(tab)
+                self._load_error(file, error)
             else:
-                err = traceback.format_exc()
-                logging.exception(str(e))
-                showerror('Error', "{}: {}".format(type(e), e), err, parent=self)
+                if tab == self.editor.current_tab:
+                    self._edit_modified(0, tab=tab)
+                    self.after_idle(self._filetype_change, None)
+                self.after_idle(self.editor.prefetch,
+                                CONFIG.getint('Editor', 'prefetch_tabs', fallback=1))
+
+        try:
+            size = os.path.getsize(file)
+        except OSError:
+            size = 0
+        if tab == self.editor.current_tab:
+            self.editor.goto_start()
+        self.editor.load(tab, chunks, size, on_loaded)
+
+    def _load_lazy_tab(self, tab, file):
+        """Load file in the editor of lazy tab."""
+        chunks = self.load_file(file)
+        if chunks is None:
+            self.after_idle(self.editor.close, tab)
+        else:
+            self._load(tab, file, chunks)
 
     def reload(self, event=None):
-        file = self.editor.files[self.editor.current_tab]
-        txt = self.load_file(file)
-        if txt is not None:
-            self.busy(True)
+        tab = self.editor.current_tab
+        file = self.editor.files[tab]
+        chunks = self.load_file(file)
+        if chunks is not None:
+            self.editor.cancel_load(tab)
             self.editor.delete('1.0', 'end')
-            self.editor.insert('1.0', txt)
-            self.editor.edit_reset()
-            self._edit_modified(0)
-            self.codestruct.populate(self.editor.filename, self.editor.get(strip=False))
-            self.check_syntax()
-            self.editor.goto_start()
-            self.busy(False)
+            self._load(tab, file, chunks)
+
+    def open_file(self, file, lazy=False):
+        """
+        Open file in a new tab or select the tab if it is already opened.
 
-    def open_file(self, file):
+        If lazy is True, the file is only loaded when its tab is selected (the
+        first file opened is never lazy).
+        """
         self.update_idletasks()
         files = list(self.editor.files.values())
         if file in files:
-            self.editor.select(list(self.editor.files.keys())[files.index(file)])
+            if not lazy:
+                self.editor.select(list(self.editor.files.keys())[files.index(file)])
             self._update_recent_files(file)
+        elif lazy and self.editor.current_tab >= 0:
+            if os.path.isfile(file):
+                self.editor.new(file, lazy=True)
+                self._update_recent_files(file)
+                CONFIG.set('General', 'recent_files', ', '.join(self.recent_files))
+                CONFIG.save()
         else:
-            txt = self.load_file(file)
-            if txt is not None:
-                self.busy(True)
+            chunks = self.load_file(file)
+            if chunks is not None:
                 self.editor.new(file)
-                self.editor.insert('1.0', txt)
-                self.editor.edit_reset()
-                self._edit_modified(0)
-                self.codestruct.populate(self.editor.filename, self.editor.get(strip=False))
-                self.check_syntax()
-                self.editor.goto_start()
+                self._load(self.editor.current_tab, file, chunks)
                 self._update_recent_files(file)
                 CONFIG.set('General', 'recent_files', ', '.join(self.recent_files))
                 CONFIG.save()
-                self.busy(False)
 
     def open(self, file=None):
         if file:
@@ -1155,8 +1341,11 @@ class App(tk.Tk):
             files = askopenfilenames(self, initialfile=initialfile,
                                      initialdir=initialdir,
                                      filetypes=[('Python', '*.py'), ('All files', '*')])
-            for file in files:
-                self.open_file(file)
+            # the last file is displayed, the other ones are loaded on demand
+            for file in files[:-1]:
+                self.open_file(file, lazy=True)
+            if files:
+                self.open_file(files[-1])
 
     # --- search
     def search(self, venet=None):
@@ -1186,10 +1375,9 @@ class App(tk.Tk):
                                  filetypes=[('Python', '*.py'), ('All files', '*')])
         if name:
             tab = self.editor.select()
-            self.editor.saveas(tab=tab, name=name)
+            if not self.editor.saveas(tab=tab, name=name, callback=self._on_saved):
+                return False
             self._edit_modified(0, tab=tab)
-            self.check_syntax()
-            self.codestruct.populate(self.editor.filename, self.editor.get(strip=False))
             return True
         else:
             return False
@@ -1198,18 +1386,23 @@ class App(tk.Tk):
         if tab is None:
             tab = self.editor.select()
             update = True
-        saved = self.editor.save(tab)
+        saved = self.editor.save(tab, callback=self._on_saved if update else None)
         if update and saved:
             self._edit_modified(0, tab=tab)
-            self.check_syntax()
-            self.codestruct.populate(self.editor.filename, self.editor.get(strip=False))
         self.editor.focus_tab()
         return saved
 
     def saveall(self, event=None):
+        """Save all tabs, the files are written concurrently."""
         for tab in self.editor.tabs():
             self.save(tab=tab, update=True)
 
+    def _on_saved(self, tab):
+        """Update syntax check and code structure once tab is written on disk."""
+        if tab == self.editor.current_tab:
+            self.check_syntax(tab)
+            self.codestruct.populate(self.editor.filename, self.editor.get(strip=False))
+
     # --- export / print
     def _to_html(self, title=True, linenos=True, style=None):
         if linenos:
@@ -1258,19 +1451,24 @@ class App(tk.Tk):
         self.wait_window(p)
 
     # --- run
-    def _make_console_visible(self):
-        """Ensure Console's visiblility"""
-        console = self.widgets['Console']
-        if not console.visible.get():
-            console.visible.set(True)
+    def _make_widget_visible(self, name):
+        """Ensure widget's visiblility"""
+        widget = self.widgets[name]
+        if not widget.visible.get():
+            widget.visible.set(True)
         else:
-            if not self.right_nb.select() == self.right_nb.index(console):
-                self.right_nb.select(console)
+            if not self.right_nb.select() == self.right_nb.index(widget):
+                self.right_nb.select(widget)
         self.update_idletasks()
 
+    def _make_console_visible(self):
+        """Ensure Console's visiblility"""
+        self._make_widget_visible('Console')
+
     def run(self, event=None):
         console = CONFIG.get("Run", "console")
         if self.save():
+            self.editor.flush(self.editor.current_tab)
             if console == 'external':
                 self.editor.run(CONFIG.getboolean("Run", "external_interactive"))
             else:
@@ -1281,7 +1479,7 @@ class App(tk.Tk):
                 wdir = os.path.dirname(file)
                 if console == "qtconsole":
                     if not cst.JUPYTER:
-                        showerror("Error", "The Jupyter QtConsole is not installed.")
+                        showerror("Error", "The Jupyter kernel is not installed.")
                         return
                     self.execute_in_jupyter(code="%cd {}\n%run {}".format(wdir, file))
                 else:
@@ -1298,73 +1496,98 @@ class App(tk.Tk):
     def run_cell(self, event=None, goto_next=False):
         code = self.editor.get_cell(goto_next=goto_next)
         if code:
-            if CONFIG.get('Run', 'cell', fallback="console") == "console":
-                self._make_console_visible()
-                self.console.execute(code)
-            else:  # in jupyter
-                self.execute_in_jupyter(code=code, focus=False)
-            self.editor.focus_tab()
+            self._run_cells([code])
+
+    def run_modified_cells(self, event=None):
+        """Run the cells of the current file modified since their last successful run."""
+        following = CONFIG.getboolean('Run', 'cells_following', fallback=False)
+        cells = self.editor.get_modified_cells(self._cell_session(), following)
+        if cells:
+            self._run_cells(cells)
+
+    def _cell_session(self):
+        """Return the (target, id) session running the cells, None if there is none."""
+        if CONFIG.get('Run', 'cell', fallback="console") == "console":
+            return 'console', self.console.session
+        if self.jupyter.session is None:
+            return None
+        return 'jupyter', self.jupyter.session.session
+
+    def _run_cells(self, cells):
+        """Run the cells one after the other in the console or Jupyter kernel."""
+        if CONFIG.get('Run', 'cell', fallback="console") == "console":
+            self._make_console_visible()
 
-    # --- jupyter
-    def _init_kernel(self, file=cst.JUPYTER_KERNEL_PATH):
-        """Initialize Jupyter kernel"""
-        if not cst.JUPYTER:
-            return
-        self._kernel_disconnect()
-        # launch new kernel
-        self.jupyter_kernel = cst.BlockingKernelClient(connection_file=file)
-        self.jupyter_kernel.load_connection_file()
-        self.jupyter_kernel.start_channels()
-
-    def _kernel_disconnect(self):
-        """Close the Qtconsole connected to the editor."""
-        if self.jupyter_kernel is not None:
-            if self.jupyter_kernel_existing:  # don't shutdown pre-existing kernel
-                if self._qtconsole_process is not None:
-                    self._qtconsole_process.terminate()
-            else:
-                self.jupyter_kernel.shutdown()
-                self._qtconsole_process.terminate()
+            def execute(code, callback):
+                self.console.execute(code, callback)
+                self.editor.focus_tab()
 
-    def start_jupyter(self, focus=True):
-        """Return true if new instance was started"""
+        else:  # in jupyter
+            if not cst.JUPYTER:
+                return
+            self.start_jupyter()
+            if self.jupyter.session is None:  # the kernel could not be started
+                return
+
+            def execute(code, callback):
+
+                def on_reply(msg):
+                    self._on_jupyter_reply(msg)
+                    # msg is None if the kernel was closed before answering
+                    callback(msg is not None and msg['content']['status'] == 'ok')
+
+                self.jupyter.execute(code, on_reply)
+
+        self.editor.run_cells(cells, self._cell_session(), execute)
+        self.editor.focus_tab()
+
+    # --- jupyter
+    @staticmethod
+    def _jupyter_env():
+        env = os.environ.copy()
+        home = os.path.expanduser('~')
+        env['IPYTHONDIR'] = CONFIG.get('Console', 'ipython_dir',
+                                       fallback=os.path.join(home, '.ipython'))
+        env['JUPYTER_CONFIG_DIR'] = CONFIG.get('Console', 'jupyter_config_dir',
+                                               fallback=os.path.join(home, '.jupyter'))
+        return env
+
+    def _on_jupyter_output(self, messages):
+        self.widgets['Jupyter'].display(messages)
+
+    def _on_jupyter_reply(self, msg):
+        if msg is not None and msg['content']['status'] == 'aborted':
+            # code sent while a previous one failed
+            self.widgets['Jupyter'].info('Execution aborted because of a previous error')
+
+    def start_jupyter(self):
+        """Return true if new kernel was started"""
         if not cst.JUPYTER:
             return
-        if (self._qtconsole_process is None) or (self._qtconsole_process.poll() is not None):
-            cfm = cst.ConnectionFileMixin(connection_file=cst.JUPYTER_KERNEL_PATH)
-            cfm.write_connection_file()
-            self.jupyter_kernel_existing = False
-            self._qtconsole_ready = False
-            cmd = ['python', '-m', 'pytkeditorlib.custom_qtconsole',
-                   '--JupyterWidget.include_other_output=True',
-                   '--JupyterWidget.other_output_prefix=[editor]',
-                   '--JupyterWidget.banner=PyTkEditor\n',
-                   f'--PyTkEditor.pid={self.pid}',
-                   '-f', cst.JUPYTER_KERNEL_PATH]
-            extra_options = CONFIG.get('Console', 'jupyter_options', fallback='').strip().split()
-            while '' in extra_options:
-                extra_options.remove('')
-            cmd.extend(extra_options)
-            env = os.environ.copy()
-            home = os.path.expanduser('~')
-            env['IPYTHONDIR'] = CONFIG.get('Console', 'ipython_dir',
-                                           fallback=os.path.join(home, '.ipython'))
-            env['JUPYTER_CONFIG_DIR'] = CONFIG.get('Console', 'jupyter_config_dir',
-                                                   fallback=os.path.join(home, '.jupyter'))
-            self._qtconsole_process = Popen(cmd, stderr=PIPE, env=env)
-            self.after(1000, self._check_qtconsole_stderr)
-            return True
-        else:
-            if focus:
-                os.kill(self._qtconsole_process.pid, signal.SIGUSR1)  # focus on console
+        if self.jupyter.is_running():
+            self._make_widget_visible('Jupyter')
             return False
+        cfm = jupyter_client.connect.ConnectionFileMixin(connection_file=cst.JUPYTER_KERNEL_PATH)
+        cfm.write_connection_file()
+        env = self._jupyter_env()
+        try:
+            spec = jupyter_client.kernelspec.get_kernel_spec('python3')
+        except jupyter_client.kernelspec.NoSuchKernel:
+            cmd = [sys.executable, '-m', 'ipykernel_launcher', '-f', cst.JUPYTER_KERNEL_PATH]
+        else:
+            cmd = [arg.format(connection_file=cst.JUPYTER_KERNEL_PATH) for arg in spec.argv]
+            env.update(spec.env)
+        self.jupyter.start(cmd, env, cst.JUPYTER_KERNEL_PATH)
+        self._make_widget_visible('Jupyter')
+        self.widgets['Jupyter'].info('Jupyter kernel started')
+        return True
 
     def start_jupyter_existing_kernel(self):
-        """Return true if new instance was started"""
+        """Return true if new kernel was connected"""
         if not cst.JUPYTER:
             return
         ans = True
-        if (self._qtconsole_process is not None) and (self._qtconsole_process.poll() is None):
+        if self.jupyter.is_running():
             # a kernel is already running
             ans = askyesno('Confirmation', 'A kernel is already connected to PyTkEditor. Do you want to connect a different kernel?')
         if ans:
@@ -1374,73 +1597,51 @@ class App(tk.Tk):
             if not kernel:
                 return
             try:
-                filepath = cst.find_connection_file(kernel)
+                filepath = jupyter_client.find_connection_file(kernel)
             except OSError:
-                showerror('Error', f'Unable to connect to {filepath}.')
-            self.jupyter_kernel_existing = True
-            self._init_kernel(filepath)
-            self._qtconsole_ready = False
-            cmd = ['python', '-m', 'pytkeditorlib.custom_qtconsole',
-                   '--JupyterWidget.include_other_output=True',
-                   '--JupyterWidget.other_output_prefix=[remote]',
-                   '--JupyterWidget.banner=PyTkEditor\n',
-                   f'--PyTkEditor.pid={self.pid}',
-                   f'--existing={filepath}']
-            extra_options = CONFIG.get('Console', 'jupyter_options', fallback='').strip().split()
-            while '' in extra_options:
-                extra_options.remove('')
-            cmd.extend(extra_options)
-            env = os.environ.copy()
-            home = os.path.expanduser('~')
-            env['IPYTHONDIR'] = CONFIG.get('Console', 'ipython_dir',
-                                           fallback=os.path.join(home, '.ipython'))
-            env['JUPYTER_CONFIG_DIR'] = CONFIG.get('Console', 'jupyter_config_dir',
-                                                   fallback=os.path.join(home, '.jupyter'))
-            self._qtconsole_process = Popen(cmd, stderr=PIPE, env=env)
-            self.after(1000, self._check_qtconsole_stderr)
-        else:
-            os.kill(self._qtconsole_process.pid, signal.SIGUSR1)
+                showerror('Error', f'Unable to connect to {kernel}.')
+                return
+            self.jupyter.connect(filepath)
+            self.widgets['Jupyter'].info(f'Connected to {kernel}')
+        self._make_widget_visible('Jupyter')
         return ans
 
-    def _signal_exec_jupyter(self, *args):
-
-        def ready():
-            self._qtconsole_ready = True
-        if not self.jupyter_kernel_existing:
-            self._init_kernel()
-        self.after(200, ready)
-
-    def _wait_execute_in_jupyter(self, code, focus=True):
-        if self._qtconsole_ready:
-            self.jupyter_kernel.execute(code)
-            if focus:
-                os.kill(self._qtconsole_process.pid, signal.SIGUSR1)
+    def restart_jupyter(self):
+        """Restart the kernel started by PyTkEditor, reconnect to an existing one."""
+        if not self.jupyter.is_running():
+            self.start_jupyter()
+        elif self.jupyter.process is None:
+            self.jupyter.connect(self.jupyter.connection_file)
+            self.widgets['Jupyter'].info('Reconnected to the kernel')
         else:
-            self.after(1000, lambda: self._wait_execute_in_jupyter(code))
+            self.jupyter.close()
+            self.start_jupyter()
 
-    def execute_in_jupyter(self, event=None, code=None, focus=True):
+    def open_qtconsole(self):
+        """Open a Jupyter QtConsole connected to the kernel of PyTkEditor."""
+        if self._qtconsole is not None and self._qtconsole.poll() is None:
+            return
+        if not self.jupyter.is_running():
+            self.start_jupyter()
+        extra_options = CONFIG.get('Console', 'jupyter_options', fallback='').split()
+        cmd = [sys.executable, '-m', 'qtconsole',
+               '--JupyterWidget.include_other_output=True',
+               '--JupyterWidget.other_output_prefix=[editor]',
+               f'--existing={self.jupyter.connection_file}']
+        self._qtconsole = Popen(cmd + extra_options, env=self._jupyter_env())
+
+    def execute_in_jupyter(self, event=None, code=None):
         if not cst.JUPYTER:
             return
         if code is None:
             code = self.editor.get_selection()
         if not code:
             return
-        if self.start_jupyter(False):
-            self._wait_execute_in_jupyter(code, focus)
-        else:
-            self.jupyter_kernel.execute(code)
-            if focus:
-                os.kill(self._qtconsole_process.pid, signal.SIGUSR1)
-        self.after(1000, self._check_qtconsole_stderr)
+        self.start_jupyter()
+        # executed right away if the kernel is ready, queued otherwise
+        self.jupyter.execute(code, self._on_jupyter_reply)
         return "break"
 
-    def _check_qtconsole_stderr(self):
-        if self._qtconsole_process.poll() is not None:
-            err = self._qtconsole_process.stderr.read().decode()
-            if err:
-                logging.error(err)
-                showerror('Error', 'Error in Jupyter QtConsole.', err, False)
-
     # --- syntax check
     def check_syntax(self, tab=None):
         if tab is None:
@@ -21,11 +21,13 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 Code editor text widget
 """
-import jedi
+import logging
 import re
 from glob import glob
+from hashlib import sha1
 from os.path import sep
 from pygments import lex
+from pygments.token import String
 import tkinter as tk
 from tkinter import ttk
 from tkinter.font import Font
@@ -34,9 +36,10 @@ from pytkeditorlib.dialogs.complistbox import CompListbox
 from pytkeditorlib.dialogs import showerror, showinfo, \
     TooltipTextWrapper, Tooltip, ColorPicker
 from pytkeditorlib.gui_utils import AutoHideScrollbar, EntryHistory
+from pytkeditorlib.utils.lazy_import import jedi
 from pytkeditorlib.utils.constants import PYTHON_LEX, CONFIG, IMAGES, \
-    get_screen, load_style, valide_entree_nb, PathCompletion
-from .filebar import FileBar
+    get_screen, load_style, valide_entree_nb, PathCompletion, CompletionObj
+from .filebar import FileBar, CELL_STATES
 
 
 class Editor(ttk.Frame):
@@ -68,6 +71,9 @@ class Editor(ttk.Frame):
         self._search_count = tk.IntVar(self)
 
         self.cells = []
+        self._cell_runs = {}  # target: (session, hashes of the cells run successfully)
+        self._cells_running = (None, set())  # (session, hashes of the cells being run)
+        self._parse_id = ''
 
         # --- GUI elements
         self._comp = CompListbox(self)
@@ -271,6 +277,7 @@ class Editor(ttk.Frame):
         self.filebar.clear_cells()
         for i in cells:
             self.filebar.add_mark(i, 'sep')
+        self._show_cell_states()
 
     # --- keyboard bindings
     def _on_focusout(self, event):
@@ -578,6 +585,13 @@ class Editor(ttk.Frame):
                 self.text.delete('%i.0' % line, '%i.4' % line)
         return "break"
 
+    def destroy(self):
+        try:
+            self.after_cancel(self._parse_id)
+        except ValueError:
+            pass
+        ttk.Frame.destroy(self)
+
     # --- style and syntax highlighting
     def busy(self, busy):
         if busy:
@@ -622,6 +636,8 @@ class Editor(ttk.Frame):
                                      selectbackground=bg, selectforeground=fg,
                                      inactiveselectbackground=bg)
         self.filebar.update_style(comment_fg=comment_fg)
+        for state in CELL_STATES:
+            self.line_nb.tag_configure(state, foreground=self.filebar.colors[state])
 
         # --- syntax highlighting
         tags = list(self.text.tag_names())
@@ -653,10 +669,14 @@ class Editor(ttk.Frame):
         while data and '\n' == data[0]:
             start = self.text.index('%s+1c' % start)
             data = data[1:]
+        self._highlight(lex(data, PYTHON_LEX), start, len(data))
+
+    def _highlight(self, tokens, start, length):
+        """Apply the tags of the lexed tokens to the length characters from index start."""
         self.text.mark_set('range_start', start)
         for t in self._syntax_highlighting_tags:
-            self.text.tag_remove(t, start, "range_start +%ic" % len(data))
-        for token, content in lex(data, PYTHON_LEX):
+            self.text.tag_remove(t, start, "range_start +%ic" % length)
+        for token, content in tokens:
             self.text.mark_set("range_end", "range_start + %ic" % len(content))
             for t in token.split():
                 self.text.tag_add(str(t), "range_start", "range_end")
@@ -673,6 +693,63 @@ class Editor(ttk.Frame):
     def parse_all(self):
         self.parse(self.text.get('1.0', 'end'), '1.0')
 
+    @staticmethod
+    def _lexer_restart(tokens):
+        """
+        Return (i, nb_lines) for the last token i > 0 starting a line outside
+        of a string, nb_lines being the number of lines before it, or None.
+
+        The lexer is in its initial state at the start of this line, so the
+        text can be lexed again from there.
+        """
+        restart = None
+        nb_lines = 0
+        linestart = False
+        for i, (token, content) in enumerate(tokens):
+            if linestart and token not in String:
+                restart = i, nb_lines
+            nb_lines += content.count('\n')
+            linestart = content.endswith('\n')
+        return restart
+
+    def parse_all_async(self, line=1, nblines=500):
+        """
+        Apply syntax highlighting by blocks of nblines without blocking the GUI.
+
+        Each block ends at the start of a line outside of a string, so that the
+        next block is lexed from the same state as if the whole text was lexed.
+        """
+        if self.filetype != 'Python':
+            return
+        try:
+            self.after_cancel(self._parse_id)
+        except ValueError:
+            pass
+        self._parse_id = ''
+        end = int(str(self.text.index('end')).split('.')[0])
+        if line >= end:
+            return
+        text = self.text.get(f'{line}.0', f'{line + nblines}.0')
+        data = text.lstrip('\n')  # leading newlines are stripped by the lexer
+        start = line + len(text) - len(data)
+        tokens = list(lex(data, PYTHON_LEX))
+        if line + nblines < end:
+            restart = self._lexer_restart(tokens)
+            if restart is None:  # the block is inside a string, take a larger one
+                self._parse_id = self.after(1, self.parse_all_async, line, 2 * nblines)
+                return
+            i, nb_lines = restart
+            tokens = tokens[:i]
+            next_line = start + nb_lines
+        else:
+            next_line = end
+        # cell comments padding must not mark the file as modified
+        modified = self.text.edit_modified()
+        self._highlight(tokens, f'{start}.0', sum(len(content) for token, content in tokens))
+        if not modified:
+            self.text.edit_modified(False)
+        self._parse_id = self.after(1, self.parse_all_async, next_line, nblines)
+
     def strip(self):
         res = self.text.search(r' +$', '1.0', regexp=True)
         while res:
@@ -783,6 +860,14 @@ class Editor(ttk.Frame):
             return False
 
     # --- autocompletion and help tooltips
+    @property
+    def kernel_completer(self):
+        """KernelCompleter of the connected Jupyter kernel, None if there is none."""
+        completer = self.master.kernel_completer
+        if self._filetype == 'Python' and completer is not None and completer.link.ready:
+            return completer
+        return None
+
     def _args_hint(self, event=None):
         index = self.text.index('insert')
         row, col = str(index).split('.')
@@ -791,25 +876,41 @@ class Editor(ttk.Frame):
             res = script.goto_definitions()
         except Exception:
             # jedi raised an exception
-            return
+            res = []
+        args = None
         if res:
             try:
                 args = res[-1].docstring().splitlines()[0]
             except Exception:
                 # usually caused by an exception raised in Jedi
-                return
-            self._tooltip.configure(text=args)
-            xb, yb, w, h = self.text.bbox('insert')
-            xr = self.text.winfo_rootx()
-            yr = self.text.winfo_rooty()
-            ht = self._tooltip.winfo_reqheight()
-            screen = get_screen(xr, yr)
-            y = yr + yb + h
-            x = xr + xb
-            if y + ht > screen[3]:
-                y = yr + yb - ht
-            self._tooltip.geometry('+%i+%i' % (x, y))
-            self._tooltip.deiconify()
+                pass
+        if args:
+            self._args_display(args)
+            return
+        completer = self.kernel_completer
+        if completer is None:
+            return
+
+        def display(sig):
+            # the parenthesis may have been inserted in between
+            if sig and self.text.index('insert') in (index, self.text.index(f'{index}+1c')):
+                self._args_display(sig)
+
+        completer.signature(self.text.get('insert linestart', 'insert'), display)
+
+    def _args_display(self, args):
+        self._tooltip.configure(text=args)
+        xb, yb, w, h = self.text.bbox('insert')
+        xr = self.text.winfo_rootx()
+        yr = self.text.winfo_rooty()
+        ht = self._tooltip.winfo_reqheight()
+        screen = get_screen(xr, yr, self.text)
+        y = yr + yb + h
+        x = xr + xb
+        if y + ht > screen[3]:
+            y = yr + yb - ht
+        self._tooltip.geometry('+%i+%i' % (x, y))
+        self._tooltip.deiconify()
 
     def _comp_display(self):
         index = self.text.index('insert wordend')
@@ -828,14 +929,38 @@ class Editor(ttk.Frame):
             comp = [PathCompletion(before_completion, path) for path in paths]
 
         # --- jedi code autocompletion
+        completer = None
         if not comp:
+            completer = self.kernel_completer
             row, col = str(self.text.index('insert')).split('.')
             try:
                 script = jedi.Script(self.text.get('1.0', 'end'), int(row), int(col), self.file)
                 comp = script.completions()
             except Exception:
                 # jedi raised an exception
+                if completer is None:
+                    return
+                comp = []
+        if completer is None:
+            self._comp_show(comp)
+            return
+
+        # --- completions of the objects of the kernel
+        index = self.text.index('insert')
+
+        def merge(matches):
+            if self.text.index('insert') != index:  # the text changed in between
                 return
+            completions = list(comp)
+            if matches:
+                names = {c.name for c in completions}
+                completions.extend(CompletionObj(name, complete)
+                                   for name, complete in matches if name not in names)
+            self._comp_show(completions)
+
+        completer.complete(line, merge)
+
+    def _comp_show(self, comp):
         self._comp.withdraw()
         if len(comp) == 1:
             self.text.insert('insert', comp[0].complete)
@@ -845,7 +970,7 @@ class Editor(ttk.Frame):
             xr = self.text.winfo_rootx()
             yr = self.text.winfo_rooty()
             hcomp = self._comp.winfo_reqheight()
-            screen = get_screen(xr, yr)
+            screen = get_screen(xr, yr, self.text)
             y = yr + yb + h
             x = xr + xb
             if y + hcomp > screen[3]:
@@ -1145,6 +1270,107 @@ class Editor(ttk.Frame):
             self.text.see("insert")
         return self.text.get(start, end)
 
+    # --- cell execution
+    # The hashes of the cells run successfully are kept for the current
+    # session of each target ('console' or 'jupyter'), a session being
+    # (target, id) with an id changing when the namespace is reset.
+    @staticmethod
+    def _cell_hash(source):
+        return sha1(source.strip().encode()).hexdigest()
+
+    def _cell_ranges(self):
+        """Return the (start, end) lines of the cells, the whole text if there is no separator."""
+        end = int(str(self.text.index('end')).split('.')[0])
+        starts = [1] + [line for line in self.cells if line > 1]
+        return list(zip(starts, starts[1:] + [end]))
+
+    def _executed_cells(self, session):
+        """Return the hashes of the cells run successfully in session."""
+        runs = self._cell_runs.get(session[0])
+        if runs is None or runs[0] != session:  # new session, nothing was run yet
+            runs = self._cell_runs[session[0]] = (session, set())
+        return runs[1]
+
+    def _show_cell_states(self):
+        """Show the execution state of the cells in the file bar and line numbers."""
+        for state in CELL_STATES:
+            self.line_nb.tag_remove(state, '1.0', 'end')
+        session = self.master.cell_session() if self.master.cell_session else None
+        if session is None:
+            return
+        executed = self._executed_cells(session)
+        running = self._cells_running[1] if self._cells_running[0] == session else set()
+        if not executed and not running:
+            return
+        for start, end in self._cell_ranges():
+            source = self.text.get(f'{start}.0', f'{end}.0')
+            if not source.strip():
+                continue
+            cell = self._cell_hash(source)
+            if cell in running:
+                state = 'cell_running'
+            elif cell in executed:
+                state = 'cell_run'
+            else:
+                state = 'cell_modified'
+            self.filebar.add_mark(start, state)
+            self.line_nb.tag_add(state, f'{start}.0', f'{end}.0')
+
+    def get_modified_cells(self, session, following=False):
+        """
+        Return the cells modified since their last successful run in session.
+
+        If following is True, all the cells after the first modified one are
+        returned. All the cells are modified if session is None.
+        """
+        self.update_cells()
+        executed = self._executed_cells(session) if session is not None else set()
+        sources = []
+        for start, end in self._cell_ranges():
+            source = self.text.get(f'{start}.0', f'{end}.0')
+            if source.strip() and ((sources and following)
+                                   or self._cell_hash(source) not in executed):
+                sources.append(source)
+        return sources
+
+    def run_cells(self, sources, session, execute):
+        """
+        Run the cells one after the other in session, stop at the first failure.
+
+        execute(source, callback) runs source and calls callback with True if
+        it succeeded.
+        """
+        if not sources:
+            return
+        executed = self._executed_cells(session)
+        if self._cells_running[0] != session:
+            self._cells_running = (session, set())
+        running = self._cells_running[1]
+        cells = [self._cell_hash(source) for source in sources]
+        running.update(cells)
+        self._show_cell_states()
+
+        def run(i):
+
+            def done(success):
+                running.discard(cells[i])
+                if success:
+                    executed.add(cells[i])
+                    if i + 1 < len(sources):
+                        run(i + 1)
+                else:
+                    running.difference_update(cells[i + 1:])
+                if self.winfo_exists():
+                    self._show_cell_states()
+
+            try:
+                execute(sources[i], done)
+            except Exception:
+                logging.exception('Failed to run the cell')
+                done(False)
+
+        run(0)
+
     # --- docstrings
     def get_docstring(self, obj):
         txt = self.text.get('1.0', 'end')
@@ -23,7 +23,9 @@ Notebook containing the code editors for each opened file
 import logging
 import os
 import re
-from tkinter import Menu, Toplevel
+from concurrent.futures import wait
+from tkinter import Menu, Toplevel, READABLE
+from tkinter.ttk import Frame
 from subprocess import Popen
 
 from tkfilebrowser import asksaveasfilename
@@ -32,12 +34,19 @@ from pytkeditorlib.gui_utils import AutoCompleteEntryListbox, Notebook
 from pytkeditorlib.dialogs import askyesnocancel, askoptions, showerror, \
     TooltipNotebookWrapper
 from pytkeditorlib.utils.constants import CONFIG
+from pytkeditorlib.utils.fileio import FileWriter
 from .editor import Editor
 
 
 class EditorNotebook(Notebook):
-    def __init__(self, master, **kw):
+    def __init__(self, master, watcher=None, loadcommand=None, **kw):
         Notebook.__init__(self, master, **kw)
+        self.watcher = watcher  # FileWatcher reporting external modifications
+        self.kernel_completer = None  # KernelCompleter of the connected Jupyter kernel
+        self.cell_session = None  # function returning the session running the cells
+        # loadcommand(tab, file) fills the editor of a lazy tab once created
+        self.loadcommand = loadcommand
+        self._placeholders = set()  # lazy tabs whose editor is not created yet
         self._closecommand = self.close
         self.files = {}      # tab: file_path
         self.wrapper = TooltipNotebookWrapper(self)
@@ -54,6 +63,11 @@ class EditorNotebook(Notebook):
                               command=self.close_tabs_left)
         self._files_mtime = {}           # file_path: mtime
         self._files_check_deletion = {}  # file_path: bool
+        self._loading = {}               # tab: token of the running load of its file
+        self._writer = FileWriter()
+        self._saving = {}                # tab: [(future, file_path, callback), ...]
+        self.tk.createfilehandler(self._writer.fileno(), READABLE,
+                                  lambda *args: self._check_saves())
 
     def _popup_menu(self, event, tab):
         self._show(tab)
@@ -62,6 +76,10 @@ class EditorNotebook(Notebook):
 
     def _check_modif(self, tab):
         """Check if file has been modified outside PyTkEditor."""
+        if tab in self._saving or tab in self._placeholders or tab in self._loading:
+            # the file is being written by PyTkEditor or not loaded yet,
+            # it is checked again once loaded
+            return
         file = self.files[tab]
         try:
             mtime = os.stat(file).st_mtime
@@ -102,6 +120,20 @@ class EditorNotebook(Notebook):
                 # the file does not exist yet
                 return
 
+    def on_file_event(self, file):
+        """Handle external modification of file reported by the watcher."""
+        for tab, path in list(self.files.items()):
+            if path == file and tab in self.files:
+                self._check_modif(tab)
+
+    def _watch(self, file):
+        if self.watcher is not None and file:
+            self.watcher.watch(file)
+
+    def _unwatch(self, file):
+        if self.watcher is not None and file and file not in self.files.values():
+            self.watcher.unwatch(file)
+
     def _menu_insert(self, tab, text):
         label = '{} - {}'.format(text, self.files.get(tab, ''))
         menu = []
@@ -123,8 +155,9 @@ class EditorNotebook(Notebook):
         return self.tab(self.current_tab, 'text')
 
     def update_style(self):
-        for editor in self._tabs.values():
-            editor.update_style()
+        for tab, editor in self._tabs.items():
+            if tab not in self._placeholders:
+                editor.update_style()
 
         fg = self.menu.option_get('foreground', '*Menu')
         bg = self.menu.option_get('background', '*Menu')
@@ -184,9 +217,13 @@ class EditorNotebook(Notebook):
             widget = self._tabs[tab]
         else:
             tab = self.index(widget)
+        if tab in self._placeholders:
+            return False
         widget.text.edit_modified(*args)
         b = widget.text.edit_modified()
-        title = self._tab_labels[tab].tab_cget('text').strip('*')
+        if tab in self._loading:
+            return b
+        title = self.tab(tab, 'text').strip('*')
         # self._tab_labels[tab].tab_configure(text=title + '*' * b)
         self.tab(tab, text=title + '*' * b)
         if generate:
@@ -270,6 +307,8 @@ class EditorNotebook(Notebook):
             options['regexp'] = True
         results = {}
         for tab in self._visible_tabs:
+            if tab in self._placeholders:
+                continue
             path = self.files[tab]
             name = self.tab(tab, 'text')
             results[tab] = f"{name} - {path}", self._tabs[tab].find_all(pattern, options)
@@ -322,6 +361,16 @@ class EditorNotebook(Notebook):
         else:
             return ''
 
+    def get_modified_cells(self, session, following=False):
+        if self._current_tab >= 0:
+            return self._tabs[self._current_tab].get_modified_cells(session, following)
+        else:
+            return []
+
+    def run_cells(self, sources, session, execute):
+        if self._current_tab >= 0:
+            self._tabs[self._current_tab].run_cells(sources, session, execute)
+
     def get_last_closed(self):
         if self.last_closed:
             return self.last_closed.pop()
@@ -344,7 +393,10 @@ class EditorNotebook(Notebook):
             del self._files_mtime[tab]
         except KeyError:
             pass
-        del self.files[tab]
+        file = self.files.pop(tab)
+        self._unwatch(file)
+        self._loading.pop(tab, None)
+        self._placeholders.discard(tab)
         self.forget(tab)
         if not self._visible_tabs:
             self.event_generate('<<NotebookEmpty>>')
@@ -390,32 +442,127 @@ class EditorNotebook(Notebook):
         for tab in self._visible_tabs[:ind]:
             self.close(tab)
 
+    # --- load
+    def load(self, tab, chunks, size, callback):
+        """
+        Insert the text chunks in tab, one chunk per event loop turn.
+
+        chunks yields (nb of bytes read, text) tuples and size is the file
+        size used to display the progress in the tab label. Once the loading
+        is over, callback(tab, error) is called, error being None on success
+        or the exception raised by chunks. The load of tab already running,
+        if any, is cancelled.
+        """
+        token = object()
+        self._loading[tab] = token
+        text = self._tabs[tab].text
+        text.configure(undo=False, state='disabled')
+        self._load_chunk(tab, token, chunks, size, callback)
+
+    def cancel_load(self, tab):
+        """Stop loading the file of tab, the text already inserted is kept."""
+        if self._loading.pop(tab, None) is not None:
+            self._tabs[tab].text.configure(undo=True, state='normal')
+            self._tab_labels[tab].tab_configure(text=self.tab(tab, 'text'))
+
+    def _load_chunk(self, tab, token, chunks, size, callback):
+        if self._loading.get(tab) is not token:
+            # the tab has been closed or its file is loaded again
+            return
+        editor = self._tabs[tab]
+        try:
+            pos, txt = next(chunks)
+        except Exception as e:
+            del self._loading[tab]
+            editor.text.configure(undo=True, state='normal')
+            editor.text.edit_reset()
+            editor.text.edit_modified(False)
+            self._tab_labels[tab].tab_configure(text=self.tab(tab, 'text'))
+            editor.parse_all_async()
+            callback(tab, None if isinstance(e, StopIteration) else e)
+            # the file may have been modified during the loading
+            self.after_idle(lambda: tab in self.files and self._check_modif(tab))
+            return
+        editor.text.configure(state='normal')
+        editor.text.insert('end-1c', txt)
+        editor.text.configure(state='disabled')
+        editor.text.edit_modified(False)
+        editor.update_nb_line()
+        progress = min(100, 100 * pos // size) if size else 100
+        self._tab_labels[tab].tab_configure(text=f"{self.tab(tab, 'text')} ({progress}%)")
+        self.after(1, self._load_chunk, tab, token, chunks, size, callback)
+
     # --- save
-    def save(self, tab=None, force=False):
+    def save(self, tab=None, force=False, callback=None):
+        """
+        Save tab content.
+
+        The text is written in a background thread and callback(tab) is
+        called once the file has been written.
+        """
         if tab is None:
             tab = self.current_tab
         if tab < 0:
             return False
+        if tab in self._loading:
+            return False
         if not self.files[tab]:
-            res = self.saveas(tab)
+            res = self.saveas(tab, callback=callback)
         else:
             if force or self.edit_modified(tab=tab):
                 file = self.files[tab]
-                try:
-                    with open(file, 'w') as f:
-                        f.write(self.get(tab))
-                except PermissionError as e:
-                    showerror("Error", f"PermissionError: {e.strerror}: {file}", parent=self)
-                self._files_mtime[tab] = os.stat(file).st_mtime
-                self._files_check_deletion[tab] = True
-                res = True
-            else:
-                res = True
+                future = self._writer.write(file, self.get(tab))
+                # the flag is restored if the writing fails
+                self.edit_modified(False, tab=tab, generate=True)
+                self._saving.setdefault(tab, []).append((future, file, callback))
+            elif callback is not None:
+                callback(tab)
+            res = True
         return res
 
-    def saveas(self, tab=None, name=None):
+    def _check_saves(self):
+        """Process the writings confirmed by the background writer."""
+        self._writer.clear()
+        for tab, saves in list(self._saving.items()):
+            while saves and saves[0][0].done():
+                self._on_saved(tab, *saves.pop(0))
+            if not saves:
+                del self._saving[tab]
+
+    def _on_saved(self, tab, future, file, callback):
+        opened = self.files.get(tab) == file
+        try:
+            mtime = future.result()
+        except Exception as e:
+            if isinstance(e, PermissionError):
+                msg = f"PermissionError: {e.strerror}: {file}"
+            else:
+                msg = f"Failed to save {file}: {e}"
+            logging.error(msg)
+            showerror("Error", msg, parent=self)
+            if opened:
+                self.edit_modified(True, tab=tab, generate=True)
+            return
+        if opened:
+            self._files_mtime[tab] = mtime
+            self._files_check_deletion[tab] = True
+            if callback is not None:
+                callback(tab)
+
+    def flush(self, tab=None):
+        """Wait for the pending writings (of tab if not None) to be done."""
+        if tab is None:
+            saves = [s for saves in self._saving.values() for s in saves]
+        else:
+            saves = self._saving.get(tab, [])
+        wait([future for future, file, callback in saves])
+        self._check_saves()
+
+    def saveas(self, tab=None, name=None, callback=None):
         if tab is None:
             tab = self.current_tab
+        if tab in self._loading:
+            return False
         if name is None:
             file = self.files.get(tab, '')
             if file:
@@ -428,11 +575,14 @@ class EditorNotebook(Notebook):
         if name:
             if self.files[tab]:
                 self._files_check_deletion[tab] = False
+            old_file = self.files[tab]
             self.files[tab] = name
+            self._unwatch(old_file)
+            self._watch(name)
             self._tabs[tab].file = name
             self.tab(tab, text=os.path.split(name)[1])
             self.wrapper.set_tooltip_text(tab, os.path.abspath(name))
-            self.save(tab, force=True)
+            self.save(tab, force=True, callback=callback)
             self._files_check_deletion[tab] = True
             return True
         else:
@@ -469,7 +619,14 @@ class EditorNotebook(Notebook):
 the external terminal configuration in the settings.",
                               parent=self)
 
-    def new(self, file=None):
+    def new(self, file=None, lazy=False):
+        """
+        Create a new tab for file.
+
+        If lazy is True, the tab is only a placeholder and it is not selected:
+        the editor is created and loadcommand called when the tab is first
+        displayed or prefetched.
+        """
         if file is None:
             new_files = [-1]
             pattern = re.compile(r"^new(\d+).py - $")
@@ -483,27 +640,78 @@ the external terminal configuration in the settings.",
         else:
             title = os.path.split(file)[-1]
 
-        editor = Editor(self, 'Python' if title.endswith('.py') else 'Text')
+        lazy = lazy and bool(file) and self.current_tab >= 0
+        if lazy:
+            widget = Frame(self)
+        else:
+            widget = Editor(self, 'Python' if title.endswith('.py') else 'Text')
         if len(self._visible_tabs) == 0:
             self.event_generate('<<NotebookFirstTab>>')
-        tab = self.add(editor, text=title)
-        editor.bind('<FocusIn>', lambda e: self._check_modif(tab))
+        tab = self.add(widget, text=title, select=not lazy)
         if file in self.last_closed:
             self.last_closed.remove(file)
         self.files[tab] = file
+        self._watch(file)
         if file:
             self._files_mtime[tab] = os.stat(file).st_mtime
             self._files_check_deletion[tab] = True
 
         self._tab_menu.entryconfigure(self._tab_menu_entries[tab],
                                       label="{} - {}".format(title, os.path.dirname(file)))
-        self._tabs[tab].file = file
         self.wrapper.add_tooltip(tab, file if file else title)
+        if lazy:
+            self._placeholders.add(tab)
+        else:
+            self._setup_editor(tab)
+
+    def _setup_editor(self, tab):
+        editor = self._tabs[tab]
+        if self.watcher is None:
+            editor.bind('<FocusIn>', lambda e: self._check_modif(tab))
+        editor.file = self.files[tab]
         editor.text.bind('<<Modified>>', lambda e: self.edit_modified(widget=editor, generate=True))
         editor.text.bind('<Control-Tab>', self._select_next)
         editor.text.bind('<Shift-Control-ISO_Left_Tab>', self._select_prev)
         editor.busy(False)
 
+    # --- lazy tabs
+    def _materialize(self, tab):
+        """Replace the placeholder of tab by an editor and load the file."""
+        self._placeholders.remove(tab)
+        placeholder = self._tabs[tab]
+        title = self.tab(tab, 'text')
+        editor = Editor(self, 'Python' if title.endswith('.py') else 'Text')
+        del self._indexes[str(placeholder)]
+        self._indexes[str(editor)] = tab
+        self._tabs[tab] = editor
+        editor.grid(in_=self._body, sticky=self._tab_options[tab]['sticky'],
+                    padx=self._tab_options[tab]['padding'],
+                    pady=self._tab_options[tab]['padding'])
+        if tab != self.current_tab:
+            editor.grid_remove()
+        placeholder.destroy()
+        self._setup_editor(tab)
+        try:
+            self._files_mtime[tab] = os.stat(self.files[tab]).st_mtime
+        except OSError:
+            pass
+        if self.loadcommand is not None:
+            self.loadcommand(tab, self.files[tab])
+
+    def _show(self, tab_id, new=False, update=False):
+        if tab_id in self._placeholders:
+            self._materialize(tab_id)
+        Notebook._show(self, tab_id, new, update)
+
+    def prefetch(self, nb):
+        """Create the editors of the nb lazy tabs following the current one."""
+        if self.current_tab < 0 or not self._placeholders:
+            return
+        ind = self._visible_tabs.index(self.current_tab)
+        for tab in self._visible_tabs[ind + 1:ind + 1 + nb]:
+            if tab in self._placeholders:
+                self._materialize(tab)
+
     def _select_next(self, event):
         self.select_next(True)
         return "break"
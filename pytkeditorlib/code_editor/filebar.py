@@ -24,6 +24,8 @@ from tkinter import Canvas
 
 from PIL import Image, ImageTk
 
+CELL_STATES = ('cell_run', 'cell_modified', 'cell_running')  # execution state of the cells
+
 
 def active_color(color, factor=3):
     """Return a lighter shade of color (RGB triplet with value max 255) in HTML format."""
@@ -41,11 +43,16 @@ class FileBar(Canvas):
     def __init__(self, master, widget, **kwargs):
         Canvas.__init__(self, master, **kwargs)
 
-        self._marks = {'warning': [], 'error': [], 'sep': []}
+        self._marks = {'warning': [], 'error': [], 'sep': [],
+                       'cell_run': [], 'cell_modified': [], 'cell_running': []}
 
         self.widget = widget
-        self.colors = {'warning': 'orange', 'error': 'red', 'sep': 'blue'}
-        self.active_colors = {'warning': '#FFC355', 'error': '#FF5555', 'sep': '#5555FF'}
+        self.colors = {'warning': 'orange', 'error': 'red', 'sep': 'blue',
+                       'cell_run': '#2EA02E', 'cell_modified': '#C050D0',
+                       'cell_running': '#3080E0'}
+        self.active_colors = {'warning': '#FFC355', 'error': '#FF5555', 'sep': '#5555FF',
+                              'cell_run': '#62B862', 'cell_modified': '#D07CDC',
+                              'cell_running': '#64A0E8'}
         self.update_idletasks()
         self._highlight_img = Image.new('RGBA', (1, 1), "#ffffff88")
         self._highlight_photoimg = ImageTk.PhotoImage(self._highlight_img, master=self)
@@ -110,5 +117,6 @@ class FileBar(Canvas):
         self._marks['error'].clear()
 
     def clear_cells(self):
-        self.delete('sep')
-        self._marks['sep'].clear()
+        for category in ('sep',) + CELL_STATES:
+            self.delete(category)
+            self._marks[category].clear()
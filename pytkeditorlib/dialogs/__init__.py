@@ -22,7 +22,9 @@ from .about import About
 from .colorpicker import ColorPicker
 from .complistbox import CompListbox
 from .config import Config
+from .diagnostics import Diagnostics
 from .help import HelpDialog
+from .history_search import HistorySearchListbox
 from .kernel_dialog import SelectKernel
 from .messagebox import showerror, showinfo, askokcancel, askyesno, askyesnocancel, askoptions
 from .print import PrintDialog
@@ -29,7 +29,7 @@ from pygments.styles import get_all_styles
 from tkcolorpicker import askcolor
 from tkfilebrowser import askopendirname
 
-from pytkeditorlib.utils.constants import CONFIG, PATH_TEMPLATE, JUPYTER
+from pytkeditorlib.utils.constants import CONFIG, PATH_TEMPLATE, JUPYTER, QTCONSOLE
 from pytkeditorlib.gui_utils import AutoCompleteCombobox
 from .messagebox import askokcancel
 
@@ -269,6 +269,14 @@ class Config(tk.Toplevel):
         # --- history
         self.history_size = ttk.Entry(frame_console, width=6)
         self.history_size.insert(0, CONFIG.get('History', 'max_size', fallback='10000'))
+        self.scrollback = ttk.Entry(frame_console, width=6)
+        self.scrollback.insert(0, CONFIG.get('Console', 'scrollback', fallback='10000'))
+        self.preload = ttk.Entry(frame_console)
+        self.preload.insert(0, CONFIG.get('Console', 'preload', fallback=''))
+        self.console_stats = ttk.Checkbutton(frame_console,
+                                             text='Show the execution time and memory use of each command')
+        self.console_stats.state(['!alternate',
+                                  '!' * (not CONFIG.getboolean('Console', 'stats', fallback=False)) + 'selected'])
 
         # --- syntax highlighting
         frame_s_h = ttk.Frame(frame_console)
@@ -291,7 +299,7 @@ class Config(tk.Toplevel):
         ttk.Label(frame_s_h, text='Unmatched bracket:').grid(row=4, column=0, columnspan=2, sticky='w', pady=(8, 0))
         self.console_unmatched_bracket.grid(row=5, column=0, columnspan=2, sticky='w', padx=4)
 
-        # --- Jupyter QtConsole
+        # --- Jupyter
         frame_qtconsole = ttk.Frame(frame_console)
         f1 = ttk.Frame(frame_qtconsole)
         f1.columnconfigure(1, weight=1)
@@ -318,7 +326,7 @@ class Config(tk.Toplevel):
         self.jupyter_options = ttk.Entry(f2)
         self.jupyter_options.pack(side='right', fill='x', expand=True, padx=(4, 0))
         self.jupyter_options.insert(0, CONFIG.get('Console', 'jupyter_options', fallback=''))
-        if not JUPYTER:
+        if not QTCONSOLE:
             self.jupyter_options.state(['disabled'])
 
         # --- placement
@@ -327,19 +335,30 @@ class Config(tk.Toplevel):
                                                                                sticky='e',
                                                                                padx=4, pady=4)
         self.history_size.grid(row=0, column=1, sticky='w', padx=4, pady=4)
-        ttk.Separator(frame_console, orient='horizontal').grid(row=1, columnspan=2,
+        ttk.Label(frame_console,
+                  text='Scrollback (max number of lines, 0 for unlimited):').grid(row=1, column=0,
+                                                                                  sticky='e',
+                                                                                  padx=4, pady=4)
+        self.scrollback.grid(row=1, column=1, sticky='w', padx=4, pady=4)
+        ttk.Label(frame_console,
+                  text='Modules imported at startup (comma separated):').grid(row=2, column=0,
+                                                                               sticky='e',
+                                                                               padx=4, pady=4)
+        self.preload.grid(row=2, column=1, sticky='ew', padx=4, pady=4)
+        self.console_stats.grid(row=3, columnspan=2, sticky='w', padx=4, pady=4)
+        ttk.Separator(frame_console, orient='horizontal').grid(row=4, columnspan=2,
                                                                sticky='ew', pady=4)
         ttk.Label(frame_console,
-                  text='Syntax Highlighting:').grid(row=2, columnspan=2,
+                  text='Syntax Highlighting:').grid(row=5, columnspan=2,
                                                     sticky='w', pady=4, padx=4)
-        frame_s_h.grid(row=3, columnspan=2, sticky='ew', pady=(4, 8), padx=12)
+        frame_s_h.grid(row=6, columnspan=2, sticky='ew', pady=(4, 8), padx=12)
 
-        ttk.Separator(frame_console, orient='horizontal').grid(row=4, columnspan=2,
+        ttk.Separator(frame_console, orient='horizontal').grid(row=7, columnspan=2,
                                                                sticky='ew', pady=4)
         ttk.Label(frame_console,
-                  text='Jupyter Qtconsole:').grid(row=5, columnspan=2,
-                                                  sticky='w', pady=4, padx=4)
-        frame_qtconsole.grid(row=6, columnspan=2, sticky='ew', pady=(4, 8), padx=12)
+                  text='Jupyter:').grid(row=8, columnspan=2,
+                                        sticky='w', pady=4, padx=4)
+        frame_qtconsole.grid(row=9, columnspan=2, sticky='ew', pady=(4, 8), padx=12)
 
 
     def _init_run(self):
@@ -370,7 +389,7 @@ class Config(tk.Toplevel):
                         variable=self.run_console).grid(row=2, column=1,
                                                         pady=4, sticky='w')
 
-        jqt = ttk.Radiobutton(frame_run, text='Jupyter QtConsole', value='qtconsole',
+        jqt = ttk.Radiobutton(frame_run, text='Jupyter kernel', value='qtconsole',
                               command=self._run_setting,
                               variable=self.run_console)
         jqt.grid(row=3, column=1, pady=4, sticky='w')
@@ -387,10 +406,16 @@ class Config(tk.Toplevel):
                         variable=self.run_cell_in).grid(row=6, column=1,
                                                         pady=4, sticky='w')
 
-        jqt2 = ttk.Radiobutton(frame_run, text='Jupyter QtConsole', value='qtconsole',
+        jqt2 = ttk.Radiobutton(frame_run, text='Jupyter kernel', value='qtconsole',
                                variable=self.run_cell_in)
         jqt2.grid(row=7, column=1, pady=4, sticky='w')
 
+        self.cells_following = ttk.Checkbutton(frame_run,
+                                               text='Run modified cells: also run all the cells after the first modified one')
+        self.cells_following.state(['!alternate',
+                                    '!' * (not CONFIG.getboolean('Run', 'cells_following', fallback=False)) + 'selected'])
+        self.cells_following.grid(row=8, columnspan=3, padx=4, pady=4, sticky='w')
+
         if not JUPYTER:
             jqt.state(['disabled'])
             jqt2.state(['disabled'])
@@ -453,6 +478,18 @@ class Config(tk.Toplevel):
             pass
         else:
             CONFIG.set('History', 'max_size', str(size))
+        # --- --- scrollback
+        try:
+            size = int(self.scrollback.get())
+            assert size >= 0
+        except (ValueError, AssertionError):
+            pass
+        else:
+            CONFIG.set('Console', 'scrollback', str(size))
+        # --- --- preloaded modules
+        modules = [m.strip() for m in self.preload.get().split(',')]
+        CONFIG.set('Console', 'preload', ','.join(m for m in modules if m))
+        CONFIG.set('Console', 'stats', str('selected' in self.console_stats.state()))
         # --- --- syntax highlighting
         cstyle = self.console_style.get()
         if cstyle:
@@ -470,6 +507,8 @@ class Config(tk.Toplevel):
         external_console = self.external_console.get()
         CONFIG.set('Run', 'external_console', external_console)
         CONFIG.set('Run', 'cell', self.run_cell_in.get())
+        CONFIG.set('Run', 'cells_following',
+                   str('selected' in self.cells_following.state()))
         if not external_console and console:
             ans = askokcancel("Warning",
                               'No external terminal is set so executing code in an external terminal will fail.',
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Diagnostics dialog showing the startup timeline
+"""
+from tkinter import Toplevel
+from tkinter.ttk import Button, Treeview, Frame
+
+from tkfilebrowser import asksaveasfilename
+
+from pytkeditorlib.gui_utils import AutoHideScrollbar
+from pytkeditorlib.utils import startup_trace
+from pytkeditorlib import __version__
+from .messagebox import showerror
+
+
+class Diagnostics(Toplevel):
+    """Display the duration of the startup phases."""
+    def __init__(self, master):
+        Toplevel.__init__(self, master, class_=master.winfo_class(), padx=4, pady=4)
+        self.title(f"Diagnostics - PyTkEditor {__version__}")
+        self.transient(master)
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.tree = Treeview(self, columns=('start', 'duration'), height=20)
+        self.tree.heading('#0', text='Startup phase', anchor='w')
+        self.tree.heading('start', text='Start (ms)', anchor='w')
+        self.tree.heading('duration', text='Duration (ms)', anchor='w')
+        self.tree.column('#0', width=250)
+        self.tree.column('start', width=90)
+        self.tree.column('duration', width=110)
+        sy = AutoHideScrollbar(self, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=sy.set)
+
+        frame = Frame(self)
+        Button(frame, text='Export trace', command=self.export).pack(side='left', padx=4)
+        Button(frame, text='Close', command=self.destroy).pack(side='left', padx=4)
+
+        self.tree.grid(row=0, column=0, sticky='ewns')
+        sy.grid(row=0, column=1, sticky='ns')
+        frame.grid(row=1, columnspan=2, pady=4)
+
+        self.populate()
+        self.tree.focus_set()
+
+    def populate(self):
+        self.tree.delete(*self.tree.get_children())
+        parents = ['']  # parents[depth] is the item containing the spans of given depth
+        for name, start, duration, depth in startup_trace.get_spans():
+            del parents[depth + 1:]
+            parent = parents[min(depth, len(parents) - 1)]
+            item = self.tree.insert(parent, 'end', text=name, open=True,
+                                    values=(f'{start * 1000:.1f}', f'{duration * 1000:.1f}'))
+            parents.append(item)
+
+    def export(self):
+        filename = asksaveasfilename(self, initialfile='startup_trace.json',
+                                     defaultext='.json',
+                                     filetypes=[('JSON', '*.json'), ('All files', '*')])
+        if filename:
+            try:
+                startup_trace.dump(filename)
+            except OSError as e:
+                showerror('Error', f'Failed to export the trace: {e}', parent=self)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Reverse incremental history search popup
+"""
+import tkinter as tk
+from tkinter import ttk
+
+from pytkeditorlib.gui_utils import AutoHideScrollbar
+
+
+class HistorySearchListbox(tk.Toplevel):
+    """Display the query and the matching history items."""
+
+    def __init__(self, master):
+        tk.Toplevel.__init__(self, master, class_='PyTkEditor')
+        self.overrideredirect(True)
+        self.attributes('-type', '_NET_WM_WINDOW_TYPE_POPUP_MENU')
+
+        frame = ttk.Frame(self, style='border.TFrame', padding=1)
+        frame.pack(fill='both')
+
+        self.label = ttk.Label(frame, padding=2)
+        self.listbox = tk.Listbox(frame, selectmode='browse', height=8, width=60,
+                                  activestyle='none', bd=0, relief='flat',
+                                  highlightthickness=0)
+        sy = AutoHideScrollbar(frame, orient='vertical', command=self.listbox.yview)
+        self.listbox.configure(yscrollcommand=sy.set)
+        self.label.pack(side='top', fill='x')
+        sy.pack(side='right', fill='y')
+        self.listbox.pack(side='left', fill='both')
+        self.withdraw()
+
+    def update(self, query, matches):
+        """Display query and matches, a list of (command, fuzzy)."""
+        self.label.configure(text=f"(reverse-i-search)`{query}':")
+        self.listbox.delete(0, 'end')
+        fg = self.listbox.cget('fg')
+        for i, (cmd, fuzzy) in enumerate(matches):
+            lines = cmd.splitlines() or ['']
+            self.listbox.insert('end', lines[0] + (' …' if len(lines) > 1 else ''))
+            if fuzzy:
+                self.listbox.itemconfigure(i, foreground='gray50')
+            else:
+                self.listbox.itemconfigure(i, foreground=fg)
+        self.listbox.configure(height=min(8, max(len(matches), 1)))
+        self.select(0)
+        self.update_idletasks()
+
+    def select(self, index):
+        self.listbox.selection_clear(0, 'end')
+        if self.listbox.size():
+            self.listbox.selection_set(index)
+            self.listbox.see(index)
@@ -23,7 +23,7 @@ from tkinter.ttk import Button, Label, Entry
 
 from tkfilebrowser import askopenfilename
 
-from pytkeditorlib.utils.constants import jupyter_runtime_dir
+from pytkeditorlib.utils.lazy_import import jupyter_paths
 
 
 class SelectKernel(Toplevel):
@@ -66,7 +66,7 @@ class SelectKernel(Toplevel):
 
     def select_file(self):
         filename = askopenfilename(self, "Select connection file",
-                                   initialdir=jupyter_runtime_dir(),
+                                   initialdir=jupyter_paths.jupyter_runtime_dir(),
                                    defaultextension='.json',
                                    filetypes=[('JSON', '*.json'), ('All files', '*')])
         if filename:
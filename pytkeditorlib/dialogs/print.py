@@ -24,9 +24,9 @@ import os
 from tempfile import mkstemp
 
 from tkfilebrowser import asksaveasfilename
-import cups
 
 from pytkeditorlib.dialogs import askyesno
+from pytkeditorlib.utils.lazy_import import cups
 
 PAPER_SIZES = ['A4', 'Letter', 'A0', 'A1', 'A2', 'A3', 'A5', 'A6', 'A7',
                'A8', 'A9', 'A10', 'B0', 'B1', 'B2', 'B3', 'B4', 'B5', 'B6', 'B7',
@@ -147,7 +147,7 @@ class TooltipTextWrapper:
         xr = self.text.winfo_rootx()
         yr = self.text.winfo_rooty()
         ht = self.tooltip.winfo_reqheight()
-        screen = get_screen(xr, yr)
+        screen = get_screen(xr, yr, self.text)
         y = yr + yb + h
         x = xr + xb + w
         if y + ht > screen[3]:
@@ -515,11 +515,13 @@ class Notebook(ttk.Frame):
             if self.current_tab >= 0:
                 self._tabs[self.current_tab].busy(False)
 
-    def add(self, widget, **kwargs):
+    def add(self, widget, select=True, **kwargs):
         """
         Add widget (or redisplay it if it was hidden) in the notebook and return
         the tab index.
 
+        If select is False, the new tab is not displayed unless it is the only one.
+
         * text: tab label
         * image: tab image
         * compound: how the tab label and image are organized
@@ -556,7 +558,17 @@ class Notebook(ttk.Frame):
             self._tab_menu_entries[ind] = self._tab_menu.index('end')
             self._tab_list.state(['!disabled'])
             self._active_tabs.append(ind)
-            self._show(self._nb_tab, new=True, update=True)
+            if select or self.current_tab < 0:
+                self._show(self._nb_tab, new=True, update=True)
+            else:
+                c, r = self._tab_frame.grid_size()
+                self._tab_labels[ind].grid(in_=self._tab_frame, row=0, column=c, sticky='s')
+                self._visible_tabs.append(ind)
+                # store grid options for when the tab will be shown
+                widget.grid(in_=self._body, sticky=sticky, padx=padding, pady=padding)
+                widget.grid_remove()
+                self.update_idletasks()
+                self._on_configure()
 
             self._nb_tab += 1
             self._menu_insert(ind, kwargs.get('text', ''))
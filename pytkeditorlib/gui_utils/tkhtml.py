@@ -48,6 +48,8 @@ class TkinterHtml(tk.Widget, tk.XView, tk.YView):
             kw["imagecmd"] = master.register(self._fetch_image)
         self.open_url_cmd = kw.pop('open_url_cmd', webOpen)
 
+        # the Tkhtml package is only loaded when needed
+        master.tk.call('package', 'require', 'Tkhtml')
         tk.Widget.__init__(self, master, 'html', cfg, kw)
 
         # make selection and copying possible
@@ -19,6 +19,14 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 Utils and scripts
 """
 from .version import __version__
-from .rst2html import doc2html
-from .syntax_check import check_file
-from . import constants
+
+
+# docutils and pyflakes are only imported when first needed
+def doc2html(*args, **kwargs):
+    from .rst2html import doc2html
+    return doc2html(*args, **kwargs)
+
+
+def check_file(*args, **kwargs):
+    from .syntax_check import check_file
+    return check_file(*args, **kwargs)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Message protocol between the TextConsole and the console process
+
+Each message is a JSON object with a 'type' key, sent as a frame made of
+the length of the UTF-8 encoded payload (4 bytes, big endian) followed by
+the payload.
+
+Messages sent by the TextConsole:
+
+    {'type': 'execute', 'code': str, 'width': int, 'stats': bool, 'namespace': bool}
+        width is the number of characters per line used to format long outputs,
+        if stats is True, the execution statistics are added to the result,
+        if namespace is True, the namespace changes are sent before the result
+    {'type': 'namespace', 'reset': bool}
+        request the namespace changes since the last namespace message, or
+        the whole namespace if reset is True
+    {'type': 'children', 'name': str, 'path': [int], 'start': int, 'count': int}
+        request the summaries of the items start to start + count of the
+        object reached from variable name by following the item positions in path
+    {'type': 'interrupt'}
+        interrupt the running code
+
+The messages other than 'execute' are handled by the console even while
+some code is running.
+
+Messages sent by the console:
+
+    {'type': 'stream', 'name': 'stdout' or 'stderr', 'text': str}
+        output, long outputs are split in several messages
+    {'type': 'result', 'more': bool, 'exit': bool, 'error': bool, 'cwd': str[, 'stats': dict]}
+        end of the execution of the code, more is True if more input is
+        needed to complete the statement, error is True if the code raised an
+        exception, was interrupted or exited the console. stats is {'wall': float, 'cpu': float,
+        'rss': int}: wall and CPU times in seconds and increase of the peak
+        resident memory in bytes.
+    {'type': 'namespace', 'changed': [summary], 'removed': [str]}
+        summaries of the new or modified variables and names of the deleted
+        ones (see namespace.summary)
+    {'type': 'children', 'name': str, 'path': [int], 'start': int, 'total': int,
+     'items': [summary][, 'error': str]}
+        requested items, total is the number of items of the object
+
+This module is also imported by the console process, so it must only
+depend on the standard library.
+"""
+import json
+import struct
+
+HEADER = struct.Struct('!I')
+MAX_CHUNK = 65536  # maximum number of characters in a stream message
+
+
+def encode(msg):
+    """Return the frame of message msg."""
+    # lone surrogates (e.g. from surrogateescape decoding) must not make the encoding fail
+    payload = json.dumps(msg, ensure_ascii=False).encode('utf-8', 'surrogatepass')
+    return HEADER.pack(len(payload)) + payload
+
+
+def encode_stream(name, text):
+    """Return the frames of the stream messages sending text, split in chunks."""
+    return b''.join(encode({'type': 'stream', 'name': name, 'text': text[i:i + MAX_CHUNK]})
+                    for i in range(0, len(text), MAX_CHUNK))
+
+
+class MessageReader:
+    """Rebuild the messages from the received bytes."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        """Add the received data and return the list of the completed messages."""
+        self._buffer += data
+        messages = []
+        start = 0
+        size = len(self._buffer)
+        while size - start >= HEADER.size:
+            length, = HEADER.unpack_from(self._buffer, start)
+            end = start + HEADER.size + length
+            if end > size:
+                break
+            payload = self._buffer[start + HEADER.size:end].decode('utf-8', 'surrogatepass')
+            messages.append(json.loads(payload))
+            start = end
+        del self._buffer[:start]
+        return messages
+
+
+class Dispatcher:
+    """Call the handler corresponding to the type of each message."""
+
+    def __init__(self, **handlers):
+        """Create the dispatcher, handlers are given as type=handler(msg)."""
+        self.handlers = handlers
+
+    def dispatch(self, messages):
+        for msg in messages:
+            try:
+                handler = self.handlers[msg['type']]
+            except KeyError:
+                raise ValueError(f'Unknown message {msg!r}') from None
+            handler(msg)
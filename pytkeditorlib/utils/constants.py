@@ -26,17 +26,16 @@ import configparser
 from glob import glob
 import re
 import logging
+import threading
 from logging.handlers import TimedRotatingFileHandler
+from importlib.util import find_spec
+from collections import deque
 
 import warnings
-from jedi import settings
 from pygments.lexers import Python3Lexer
 from pygments.token import Comment
 from pygments.styles import get_style_by_name
-from Xlib import display
-from Xlib.ext.xinerama import query_screens
 
-settings.case_insensitive_completion = False
 os.environ['PYFLAKES_BUILTINS'] = '_'
 
 APP_NAME = 'PyTkEditor'
@@ -78,30 +77,23 @@ if not os.path.exists(LOCAL_PATH):
 
 CSS_PATH = os.path.join(PATH_HTML, '{theme}.css')
 TEMPLATE_PATH = os.path.join(PATH_HTML, 'template.txt')
-HISTFILE = os.path.join(LOCAL_PATH, 'pytkeditor.history')
+HISTFILE = os.path.join(LOCAL_PATH, 'pytkeditor_history.jsonl')
+LEGACY_HISTFILE = os.path.join(LOCAL_PATH, 'pytkeditor.history')  # pickled list
 PATH_CONFIG = os.path.join(LOCAL_PATH, 'pytkeditor.ini')
 PATH_LOG = os.path.join(LOCAL_PATH, 'pytkeditor.log')
 PIDFILE = os.path.join(LOCAL_PATH, "pytkeditor.pid")
-OPENFILE_PATH = os.path.join(LOCAL_PATH, ".file")
 PATH_TEMPLATE = os.path.join(LOCAL_PATH, 'new_file_template.py')
 
 if not os.path.exists(PATH_TEMPLATE):
     with open(PATH_TEMPLATE, 'w') as file:
         file.write('# -*- coding: utf-8 -*-\n"""\nCreated on {date} by {author}\n"""\n')
 
-# --- jupyter qtconsole
+# --- jupyter kernel
 JUPYTER_KERNEL_PATH = os.path.join(LOCAL_PATH, "kernel.json")
 
-try:
-    import qtconsole  # to test whether the qtconsole is installed
-except ImportError:
-    JUPYTER = False
-else:
-    from jupyter_client.connect import ConnectionFileMixin
-    from jupyter_client import BlockingKernelClient, find_connection_file
-    from jupyter_core.paths import jupyter_runtime_dir
-    JUPYTER = True
-JUPYTER_ICON = os.path.join(PATH_IMG, 'JupyterConsole.svg')
+# test whether the jupyter client, the kernel and the qtconsole are installed without importing them
+JUPYTER = all(find_spec(name) is not None for name in ('jupyter_client', 'ipykernel', 'zmq'))
+QTCONSOLE = JUPYTER and find_spec('qtconsole') is not None
 
 # --- images
 IMAGES = {}
@@ -176,6 +168,7 @@ if not CONFIG.read(PATH_CONFIG):
     CONFIG.set('Editor', 'unmatched_bracket', '#FF0000;;bold')  # fg;bg;font formatting
     CONFIG.set('Editor', 'comment_marker', '~')
     CONFIG.set('Editor', 'toggle_comment_mode', 'line_by_line')
+    CONFIG.set('Editor', 'prefetch_tabs', '1')  # nb of lazy tabs loaded in advance
     CONFIG.add_section('Code structure')
     CONFIG.set('Code structure', 'visible', "True")
     CONFIG.add_section('Console')
@@ -187,6 +180,9 @@ if not CONFIG.read(PATH_CONFIG):
     CONFIG.set('Console', 'jupyter_config_dir', os.path.join(os.path.expanduser('~'), '.jupyter'))
     CONFIG.set('Console', 'ipython_dir', os.path.join(os.path.expanduser('~'), '.ipython'))
     CONFIG.set('Console', 'jupyter_options', '')
+    CONFIG.set('Console', 'scrollback', '10000')  # max nb of lines kept, 0 for unlimited
+    CONFIG.set('Console', 'preload', '')  # comma separated modules imported at console startup
+    CONFIG.set('Console', 'stats', 'False')  # show execution time and memory of each command
     CONFIG.add_section('History')
     CONFIG.set('History', 'max_size', "10000")
     CONFIG.set('History', 'visible', "True")
@@ -198,11 +194,18 @@ if not CONFIG.read(PATH_CONFIG):
     CONFIG.set('File browser', 'filename_filter', "README, INSTALL, LICENSE, CHANGELOG, *.npy, *.npz, *.csv, *.txt, *.jpg, *.png, *.gif, *.tif, *.pkl, *.pickle, *.json, *.py, *.ipynb, *.txt, *.rst, *.md, *.dat, *.pdf, *.png, *.svg, *.eps")
     CONFIG.set('File browser', 'visible', "True")
     CONFIG.set('File browser', 'order', "3")
+    CONFIG.add_section('Variables')
+    CONFIG.set('Variables', 'visible', "True")
+    CONFIG.set('Variables', 'order', "4")
+    CONFIG.add_section('Jupyter')
+    CONFIG.set('Jupyter', 'visible', "False")
+    CONFIG.set('Jupyter', 'order', "5")
     CONFIG.add_section('Run')
     CONFIG.set('Run', 'console', "external")
     CONFIG.set('Run', 'external_interactive', "True")
     CONFIG.set('Run', 'external_console', external_console)
     CONFIG.set('Run', 'cell', "console")
+    CONFIG.set('Run', 'cells_following', "False")
     CONFIG.add_section('Dark Theme')
     CONFIG.set('Dark Theme', 'bg', '#454545')
     CONFIG.set('Dark Theme', 'activebg', '#525252')
@@ -239,6 +242,15 @@ if not CONFIG.read(PATH_CONFIG):
     CONFIG.set('Light Theme', 'disabledfg', '#999999')
     CONFIG.set('Light Theme', 'disabledbg', '#dddddd')
     CONFIG.set('Light Theme', 'tooltip_bg', 'light yellow')
+else:  # configuration file from an older version
+    if not CONFIG.has_section('Variables'):
+        CONFIG.add_section('Variables')
+        CONFIG.set('Variables', 'visible', "True")
+        CONFIG.set('Variables', 'order', "4")
+    if not CONFIG.has_section('Jupyter'):
+        CONFIG.add_section('Jupyter')
+        CONFIG.set('Jupyter', 'visible', "False")
+        CONFIG.set('Jupyter', 'order', "5")
 
 
 def save_config():
@@ -272,19 +284,94 @@ def load_style(stylename):
 
 
 # --- screen size
-def get_screen(x, y):
-    d = display.Display()
-    screens = query_screens(d).screens
-    monitors = [(m.x, m.y, m.x + m.width, m.y + m.height) for m in screens]
-    i = 0
-    while (i < len(monitors)
-           and not (monitors[i][0] <= x <= monitors[i][2]
-                    and monitors[i][1] <= y <= monitors[i][3])):
-        i += 1
-    if i == len(monitors):
-        raise ValueError("(%i, %i) is out of screen" % (x, y))
-    else:
-        return monitors[i]
+class MonitorGeometry:
+    """
+    Cache of the monitors geometry.
+
+    The monitors are queried once with Xinerama and the cache is refreshed
+    on RandR screen change notifications (listened to in a background thread
+    with its own X connection), so placing a popup needs no X request.
+    """
+
+    def __init__(self):
+        self._monitors = None
+        self._lock = threading.Lock()
+
+    @property
+    def monitors(self):
+        """List of the monitors (x1, y1, x2, y2) rectangles."""
+        if self._monitors is None:
+            with self._lock:
+                if self._monitors is None:
+                    self._monitors = self._connect()
+        return self._monitors
+
+    def invalidate(self):
+        """Force the refresh of the monitors geometry."""
+        self._monitors = None
+
+    @staticmethod
+    def _query(d):
+        from Xlib.ext.xinerama import query_screens
+
+        return [(m.x, m.y, m.x + m.width, m.y + m.height)
+                for m in query_screens(d).screens]
+
+    def _connect(self):
+        try:
+            from Xlib import display
+            d = display.Display()
+            monitors = self._query(d)
+        except Exception as e:
+            logging.warning('Cannot get the monitors geometry: %s', e)
+            return []
+        try:
+            from Xlib.ext import randr
+            d.screen().root.xrandr_select_input(randr.RRScreenChangeNotifyMask)
+            d.flush()
+        except Exception as e:
+            # no notification: keep the cache, it can still be invalidated
+            logging.info('RandR not available: %s', e)
+            d.close()
+        else:
+            threading.Thread(target=self._watch, args=(d,), name='MonitorGeometry',
+                             daemon=True).start()
+        return monitors
+
+    def _watch(self, d):
+        """Refresh the cache when the screen configuration changes."""
+        while True:
+            try:
+                d.next_event()  # only screen change notifications are selected
+                while d.pending_events():  # coalesce bursts
+                    d.next_event()
+                self._monitors = self._query(d)
+            except Exception as e:
+                logging.warning('Stopped watching the monitors geometry: %s', e)
+                self._monitors = None  # reconnect on next access
+                try:
+                    d.close()
+                except Exception:
+                    pass
+                return
+
+
+MONITORS = MonitorGeometry()
+
+
+def get_screen(x, y, widget=None):
+    """
+    Return the (x1, y1, x2, y2) rectangle of the monitor containing (x, y).
+
+    If the geometry of the monitors is not available, return the whole
+    screen of widget (if given).
+    """
+    for monitor in MONITORS.monitors:
+        if monitor[0] <= x <= monitor[2] and monitor[1] <= y <= monitor[3]:
+            return monitor
+    if widget is not None:
+        return 0, 0, widget.winfo_screenwidth(), widget.winfo_screenheight()
+    raise ValueError("(%i, %i) is out of screen" % (x, y))
 
 
 def valide_entree_nb(d, S):
@@ -341,8 +428,10 @@ def glob_rel(pattern, locdir):
 
 
 # --- console
+# timeit_compare before timeit so that the longest command matches first
 MAGIC_COMMANDS = ['run', 'gui', 'pylab', 'magic', 'logstart', 'logstop',
-                  'logstate', 'timeit']
+                  'logstate', 'timeit_compare', 'timeit']
+CELL_MAGIC_COMMANDS = ['timeit']
 EXTERNAL_COMMANDS = ['ls', 'cat', 'mv', 'rm', 'rmdir', 'cp', 'mkdir', 'pwd']
 CONSOLE_HELP = f"""
 Interactive Python Console
@@ -369,7 +458,15 @@ Features
 * History: navigate in the command history by using the up and down arrow
   keys, only the commands matching the text between the prompt and the
   cursor will be shown. The history is persistent between sessions and its
-  length can be changed from PyTkEditor's settings.
+  length can be changed from PyTkEditor's settings. Press Ctrl+R to search the
+  history: the commands containing the typed text are shown as you type,
+  followed by approximate matches, press Ctrl+R or the up/down arrow keys to
+  go through the matches, Enter to keep the selected one and Escape to cancel.
+
+* Top level await: coroutines can be awaited directly in the console, e.g.
+  "await asyncio.sleep(1)". The asyncio event loop keeps running between
+  the commands, so the tasks started with asyncio.ensure_future() run in the
+  background (except when a GUI event loop integration is enabled).
 
 * Syntax highlighting of the input code, the style can be changed from
   PyTkEditor's settings.
@@ -378,61 +475,151 @@ Features
 """
 
 # --- --- long output formatter
-INDENT_REGEXP = re.compile(r" *")
-TAIL_REGEXP = re.compile(r"[\n ]*$")
-SPLITTER_REGEXP = re.compile(r',(?!(?:[^\(]*\)|[^\[]*\]|[^\{]*\})) ?')
-OPEN_CHAR = {"}": "{", "]": "[", ")": "("}
+# brackets, commas and string literals (skipped in one match)
+CONTAINER_REGEXP = re.compile(r"[\[\](){},]"
+                              r"|'(?:[^'\\\n]|\\.)*'"
+                              r'|"(?:[^"\\\n]|\\.)*"')
+CONTAINER_START_REGEXP = re.compile(r"[\w.]*[\[({]")
 CLOSE_CHAR = {"{": "}", "(": ")", "[": "]"}
-DICKEY_REGEXP = re.compile(r"^[^:]*:")
-
-
-def find_closing_bracket(text, open_char, open_index):
-    close_char = CLOSE_CHAR[open_char]
-    index = open_index + 1
-    close_index = text.find(close_char, index)
-    stack = 1
-    while stack > 0 and close_index > 0:
-        stack += text.count(open_char, index, close_index) - 1
-        index = close_index + 1
-        close_index = text.find(close_char, index)
-    if stack == 0:
-        return index - 1
-    else:
-        return -1
 
 
-def format_long_output(output, wrap_length, head='', indent2=''):
-    if len(output) <= wrap_length:
-        return head + output
-    indent1 = INDENT_REGEXP.match(output).group()
-    tail = TAIL_REGEXP.search(output).group()
+# brackets and quotes: the items of a container without any are split by counting commas
+SPECIAL_REGEXP = re.compile(r"[\[\](){}'\"]")
 
-    if tail:
-        text = output[len(indent1):-len(tail)]
+
+def _split_items(text, start, end, max_items):
+    """
+    Split the content of the container text[start:end] in items.
+
+    Return (head, tail, nb_items), None if the brackets are unbalanced:
+    head and tail are the first and last max_items / 2 items as
+    (start, end, child), child being the (start, end) of the container
+    ending the item or None, and nb_items is the total number of items.
+    The other items are only counted, by counting the commas if they contain
+    no container or string.
+    """
+    nb_head = max_items // 2
+    head = []
+    tail = deque(maxlen=max_items - nb_head)
+    nb_items = 0
+    stack = []  # opening brackets of the nested containers
+    stop = end - 1
+    item_start = start + 1
+    child_start = None
+    child = None  # last container of the current item
+    for match in CONTAINER_REGEXP.finditer(text, item_start, stop):
+        char = match.group()
+        if char == ',':
+            if stack:
+                continue
+            (head if len(head) < nb_head else tail).append((item_start, match.start(), child))
+            nb_items += 1
+            item_start = match.end()
+            child = None
+            if nb_items == nb_head and SPECIAL_REGEXP.search(text, item_start, stop) is None:
+                break
+        elif char in CLOSE_CHAR:
+            if not stack:
+                child_start = match.start()
+            stack.append(char)
+        elif char in ')]}':
+            if not stack or CLOSE_CHAR[stack.pop()] != char:
+                return None
+            if not stack:
+                child = (child_start, match.end())
     else:
-        text = output[len(indent1):]
-    if not head:
-        indent2 = indent1 + indent2
-        head = indent1
-    if text[0] in CLOSE_CHAR:
-        close = find_closing_bracket(text, text[0], 0)
-        if close == len(text) - 1:
-            content = SPLITTER_REGEXP.split(text[1:-1])
-            if text[0] == '{':
-                fcontent = []
-                for c in content:
-                    m = DICKEY_REGEXP.match(c)
-                    if m:
-                        h = m.group()
-                    else:
-                        h = ''
-                    fcontent.append(format_long_output(c[len(h):], wrap_length - len(indent2) + 1, h, indent2 + ' '))
-            else:
-                fcontent = [format_long_output(c, wrap_length - len(indent2) + 1, '', indent2 + ' ')
-                            for c in content]
-            if len(fcontent) > 1:
-                return f"{head}{text[0]}{fcontent[0]},\n{indent2} " + f",\n{indent2} ".join(fcontent[1:]) + text[-1] + tail
-    return head + output
+        if stack:
+            return None
+        if nb_items or text[item_start:stop].strip():
+            (head if len(head) < nb_head else tail).append((item_start, stop, child))
+            nb_items += 1
+        return head, list(tail), nb_items
+    # the remaining items are flat: find the separators of the last ones only
+    seps = []
+    pos = stop
+    while len(seps) <= tail.maxlen:
+        pos = text.rfind(',', item_start, pos)
+        if pos < 0:
+            break
+        seps.append(pos)
+    nb_items += text.count(',', item_start, stop) + 1
+    seps.reverse()
+    if len(seps) > tail.maxlen:
+        item_start = seps.pop(0) + 1
+    tail.extend((s, e, None) for s, e in zip([item_start] + [sep + 1 for sep in seps],
+                                             seps + [stop]))
+    return head, list(tail), nb_items
+
+
+def _elide(text, max_chars):
+    if len(text) <= max_chars:
+        return text
+    half = max_chars // 2
+    return f"{text[:half]} ... ({len(text) - 2 * half} characters hidden) ... {text[-half:]}"
+
+
+def format_long_output(output, wrap_length, max_depth=8, max_items=1000, max_chars=10000):
+    """
+    Split long containers' representations in output on several lines.
+
+    The items of the containers are put on separate lines, aligned after
+    the opening bracket, if the container does not fit in wrap_length.
+    The formatting is done in linear time and bounded:
+
+    * containers deeper than max_depth are not split
+    * only the first and last max_items / 2 items of a container are shown
+      (and parsed)
+    * the middle of the items longer than max_chars is elided
+    """
+    if len(output) <= wrap_length:
+        return output
+    text = output.lstrip(' ')
+    indent = len(output) - len(text)
+    stripped = text.rstrip('\n ')
+    if not (stripped and stripped[-1] in ')]}' and CONTAINER_START_REGEXP.match(stripped)):
+        return output
+    tail = text[len(stripped):]
+    prefix_len = stripped.index(CONTAINER_START_REGEXP.match(stripped).group()[-1])
+    text = stripped[prefix_len:]
+    if CLOSE_CHAR[text[0]] != text[-1]:
+        return output
+
+    def render_item(item, col, depth):
+        start, end, child = item
+        content = text[start:end]
+        start += len(content) - len(content.lstrip())
+        end -= len(content) - len(content.rstrip())
+        if child is not None and child[1] == end:
+            # the item ends with a container, e.g. "key: {...}" or "array([...])"
+            head = _elide(text[start:child[0]], max_chars)
+            return head + render(*child, col + len(head), depth)
+        return _elide(text[start:end], max_chars)
+
+    def render(start, end, col, depth):
+        """Return the formatted container text[start:end], None if it is unbalanced."""
+        if end - start <= wrap_length - col or depth >= max_depth:
+            return _elide(text[start:end], max_chars)
+        items = _split_items(text, start, end, max_items)
+        if items is None:
+            return None
+        head, tail, nb_items = items
+        open_char, close_char = text[start], text[end - 1]
+        if nb_items == 0:
+            return _elide(text[start:end], max_chars)
+        if nb_items == 1:
+            return open_char + render_item((head + tail)[0], col + 1, depth + 1) + close_char
+        lines = [render_item(item, col + 1, depth + 1) + ',' for item in head + tail]
+        lines[-1] = lines[-1][:-1]
+        nb_hidden = nb_items - len(head) - len(tail)
+        if nb_hidden > 0:
+            lines.insert(len(head), f"... ({nb_hidden} items hidden) ...")
+        return open_char + f"\n{' ' * (col + 1)}".join(lines) + close_char
+
+    col = indent + prefix_len
+    formatted = render(0, len(text), col, 0)
+    if formatted is None:
+        return output
+    return ' ' * indent + stripped[:prefix_len] + formatted + tail
 
 
 # --- --- ANSI format parser
@@ -440,60 +627,144 @@ ANSI_COLORS_DARK = ['black', 'red', 'green', 'yellow', 'royal blue', 'magenta',
                     'cyan', 'light gray']
 ANSI_COLORS_LIGHT = ['dark gray', 'tomato', 'light green', 'light goldenrod', 'light blue',
                      'pink', 'light cyan', 'white']
-ANSI_FORMAT = {0: 'reset',
-               1: 'bold',
-               3: 'italic',
-               4: 'underline',
-               9: 'overstrike',
-               #~21: 'reset bold',
-               #~23: 'reset italic',
-               #~24: 'reset underline',
-               #~29: 'reset overstrike',
-               39: 'foreground default',
-               49: 'background default'}
+# 256-color palette: 16 named colors, 6x6x6 color cube and 24 grays
+ANSI_COLORS_256 = ANSI_COLORS_DARK + ANSI_COLORS_LIGHT
+_levels = [0, 95, 135, 175, 215, 255]
+ANSI_COLORS_256 += ['#%02x%02x%02x' % (_levels[i // 36], _levels[i // 6 % 6], _levels[i % 6])
+                    for i in range(216)]
+ANSI_COLORS_256 += ['#%02x%02x%02x' % ((8 + 10 * i,) * 3) for i in range(24)]
 
-for i in range(8):
-    ANSI_FORMAT[30 + i] = 'foreground ' + ANSI_COLORS_DARK[i]
-    ANSI_FORMAT[90 + i] = 'foreground ' + ANSI_COLORS_LIGHT[i]
-    ANSI_FORMAT[40 + i] = 'background ' + ANSI_COLORS_DARK[i]
-    ANSI_FORMAT[100 + i] = 'background ' + ANSI_COLORS_LIGHT[i]
+# CSI sequences (only SGR ones, ending with 'm', change the format), other escapes
+ANSI_REGEXP = re.compile(r"\x1b\[([0-9;:]*)([@-~])|\x1b[^\[]?")
+ANSI_INCOMPLETE_REGEXP = re.compile(r"\x1b(\[[0-9;:]*)?$")
 
 
-ANSI_REGEXP = re.compile(r"\x1b\[((\d+;)*\d+)m")
+class AnsiParser:
+    """
+    Streaming parser of the ANSI escape sequences.
 
+    The format state is kept between the chunks of text, and so are the
+    escape sequences split between two chunks. Standard, 256 and true colors
+    are supported as well as bold, italic, underline and overstrike.
 
-def parse_ansi(text, line_offset=1):
-    """
-    Parse ANSI formatting in text.
+    feed() returns the text stripped from the escape sequences and the ranges
+    of each tag as {tag: [start1, end1, start2, end2, ...]}, the positions
+    being character offsets in the stripped text. There is one range per run
+    of an attribute, so applying the format takes one tag_add per tag.
 
-    Return a dictionary of tag ranges (for a tkinter Text widget)
-    and the text stripped from the ANSI escape sequences.
+    The tags are 'foreground <color>', 'background <color>', 'bold',
+    'italic', 'bold italic', 'underline' and 'overstrike'.
     """
-    res = []
-    lines = text.splitlines()
-    for l, line in enumerate(lines, line_offset):
-        delta = 0
-        for match in ANSI_REGEXP.finditer(line):
-            codes = [int(c) for c in match.groups()[0].split(';')]
-            start, end = match.span()
-            res.append(((l, start - delta), codes))
-            delta += end - start
-    stripped_text = ANSI_REGEXP.sub('', text)
-    tag_ranges = {}
-    opened_tags = []
-    for pos, codes in res:
-        for code in codes:
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # format attributes (tag or None)
+        self._state = {'foreground': None, 'background': None, 'font': None,
+                       'underline': None, 'overstrike': None}
+        self._bold = False
+        self._italic = False
+        self._pending = ''   # incomplete escape sequence
+        self._ranges = {}
+        self._opened = {}  # opened tag: start
+
+    def _set(self, attr, tag, pos):
+        old = self._state[attr]
+        if old == tag:
+            return
+        if old is not None:
+            start = self._opened.pop(old)
+            if pos > start:
+                self._ranges.setdefault(old, []).extend((start, pos))
+        if tag is not None:
+            self._opened[tag] = pos
+        self._state[attr] = tag
+
+    def _set_font(self, pos):
+        tag = ' '.join(name for name, on in (('bold', self._bold), ('italic', self._italic)) if on)
+        self._set('font', tag or None, pos)
+
+    @staticmethod
+    def _extended_color(codes):
+        """Return the color given by 38/48;5;n or 38/48;2;r;g;b codes (consumed)."""
+        mode = codes.pop(0) if codes else None
+        if mode == 5 and codes:
+            n = codes.pop(0)
+            return ANSI_COLORS_256[n] if 0 <= n < 256 else None
+        if mode == 2 and len(codes) >= 3:
+            r, g, b = (min(max(codes.pop(0), 0), 255) for i in range(3))
+            return f'#{r:02x}{g:02x}{b:02x}'
+        return None
+
+    def _apply(self, params, pos):
+        codes = [int(c) if c else 0 for c in params.replace(':', ';').split(';')]
+        while codes:
+            code = codes.pop(0)
             if code == 0:
-                for tag in opened_tags:
-                    tag_ranges[tag].append('%i.%i' % pos)
-                opened_tags.clear()
-            else:
-                tag = ANSI_FORMAT[code]
-                if tag not in tag_ranges:
-                    tag_ranges[tag] = []
-                tag_ranges[tag].append('%i.%i' % pos)
-                opened_tags.append(tag)
-    for tag in opened_tags:
-        tag_ranges[tag].append('end')
-
-    return tag_ranges, stripped_text
+                for attr in self._state:
+                    self._set(attr, None, pos)
+                self._bold = self._italic = False
+            elif code in (1, 22):
+                self._bold = code == 1
+                self._set_font(pos)
+            elif code in (3, 23):
+                self._italic = code == 3
+                self._set_font(pos)
+            elif code in (4, 24):
+                self._set('underline', 'underline' if code == 4 else None, pos)
+            elif code in (9, 29):
+                self._set('overstrike', 'overstrike' if code == 9 else None, pos)
+            elif 30 <= code <= 37:
+                self._set('foreground', 'foreground ' + ANSI_COLORS_DARK[code - 30], pos)
+            elif 90 <= code <= 97:
+                self._set('foreground', 'foreground ' + ANSI_COLORS_LIGHT[code - 90], pos)
+            elif 40 <= code <= 47:
+                self._set('background', 'background ' + ANSI_COLORS_DARK[code - 40], pos)
+            elif 100 <= code <= 107:
+                self._set('background', 'background ' + ANSI_COLORS_LIGHT[code - 100], pos)
+            elif code in (38, 48):
+                color = self._extended_color(codes)
+                if color is not None:
+                    attr = 'foreground' if code == 38 else 'background'
+                    self._set(attr, f'{attr} {color}', pos)
+            elif code == 39:
+                self._set('foreground', None, pos)
+            elif code == 49:
+                self._set('background', None, pos)
+
+    def feed(self, text):
+        """Parse the chunk text, return (stripped text, tag ranges)."""
+        if self._pending:
+            text = self._pending + text
+            self._pending = ''
+        if '\x1b' not in text:
+            if not self._opened:
+                return text, {}
+            stripped = text
+        else:
+            incomplete = ANSI_INCOMPLETE_REGEXP.search(text)
+            if incomplete:
+                self._pending = incomplete.group()
+                text = text[:incomplete.start()]
+            parts = []
+            last = 0
+            pos = 0  # position in stripped text
+            for match in ANSI_REGEXP.finditer(text):
+                start, end = match.span()
+                parts.append(text[last:start])
+                pos += start - last
+                last = end
+                if match.group(2) == 'm':
+                    self._apply(match.group(1), pos)
+            parts.append(text[last:])
+            stripped = ''.join(parts)
+        # close the ranges at the end of the chunk, they are reopened in the next one
+        end = len(stripped)
+        ranges = self._ranges
+        for tag, start in self._opened.items():
+            if end > start:
+                ranges.setdefault(tag, []).extend((start, end))
+        self._opened = dict.fromkeys(self._opened, 0)
+        self._ranges = {}
+        return stripped, ranges
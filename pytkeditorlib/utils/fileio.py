@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+File reading and writing helpers
+"""
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait
+
+CHUNK_SIZE = 262144  # number of characters inserted in the editor at once
+
+# file creation mode mask, needed to give new files the usual permissions
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def iter_file_chunks(path, chunksize=CHUNK_SIZE):
+    """
+    Read text file by chunks.
+
+    The file is decoded incrementally as UTF-8 (with universal newlines),
+    so a multibyte character split between two reads is never lost.
+    Yield (nb of bytes read so far, text) tuples.
+    """
+    with open(path, encoding='utf-8') as f:
+        while True:
+            txt = f.read(chunksize)
+            if not txt:
+                return
+            yield f.buffer.tell(), txt
+
+
+def atomic_write(path, text):
+    """
+    Write text in path atomically and return the new modification time.
+
+    The text is written in a temporary file of the same folder, synced to the
+    disk and then renamed to path so that a crash never leaves path truncated.
+    """
+    path = os.path.realpath(path)
+    folder, name = os.path.split(path)
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=folder)
+    try:
+        with open(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    # make the rename itself durable
+    try:
+        dirfd = os.open(folder, os.O_RDONLY)
+        try:
+            os.fsync(dirfd)
+        finally:
+            os.close(dirfd)
+    except OSError:
+        pass
+    return os.stat(path).st_mtime
+
+
+class FileWriter:
+    """
+    Write files atomically in background threads.
+
+    A byte is written in a pipe each time a write is done, so that the GUI
+    can watch fileno() with a file handler instead of polling the futures.
+    """
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='FileWriter')
+        self._pending = {}  # path: future of the last write
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+
+    @staticmethod
+    def _write(path, text, previous):
+        if previous is not None:
+            # successive writes of the same file must be done in order
+            wait([previous])
+        return atomic_write(path, text)
+
+    def _notify(self, future):
+        try:
+            os.write(self._wakeup_w, b'\0')
+        except BlockingIOError:
+            pass  # the pipe is full, the GUI has not read the previous notifications yet
+
+    def fileno(self):
+        """Return the file descriptor readable once a write is done."""
+        return self._wakeup_r
+
+    def clear(self):
+        """Consume the notifications of the writes done."""
+        try:
+            while os.read(self._wakeup_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def write(self, path, text):
+        """Schedule the writing of text in path and return the corresponding future."""
+        self._pending = {p: f for p, f in self._pending.items() if not f.done()}
+        future = self._executor.submit(self._write, path, text, self._pending.get(path))
+        self._pending[path] = future
+        future.add_done_callback(self._notify)
+        return future
+
+    def shutdown(self):
+        """Wait for the pending writes and stop the threads."""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Watch files and folders for external modifications
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import queue
+import select
+import struct
+import threading
+import time
+
+# --- inotify constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o0004000
+
+DIR_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+            | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def _load_inotify():
+    """Return libc if it provides inotify, None otherwise."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch, libc.inotify_rm_watch
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+class FileWatcher:
+    """
+    Watch files and folders for external modifications.
+
+    Watching a file reports its modification or deletion, watching a folder
+    reports changes in its content. inotify is used when available, otherwise
+    all watched paths are polled with os.stat every interval seconds.
+
+    The changes are put in the events queue as (path, kind) tuples, kind being
+    'modified' or 'deleted' for files and 'changed' for folders. The events
+    of a burst are coalesced so that each path is reported only once, and a
+    byte is then written in a pipe so that the GUI can watch fileno() with a
+    file handler.
+
+    When a watched folder (or the folder of a watched file) is deleted or
+    moved, its paths are polled until they exist again and then watched with
+    inotify again.
+    """
+
+    def __init__(self, interval=1, delay=0.1):
+        """
+        Create a watcher.
+
+        * interval: polling interval in seconds when inotify is not available
+        * delay: time to wait for the end of a burst of events before reporting it
+        """
+        self.interval = interval
+        self.delay = delay
+        self.events = queue.Queue()
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._files = {}    # folder: set of watched file names
+        self._folders = set()
+        self._wds = {}      # folder: inotify watch descriptor
+        self._paths = {}    # inotify watch descriptor: folder
+        self._stats = {}    # polled path: mtime (None if it does not exist)
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+
+        self._libc = _load_inotify()
+        self._fd = None
+        if self._libc is not None:
+            fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                logging.warning('inotify not available: %s', os.strerror(ctypes.get_errno()))
+            else:
+                self._fd = fd
+        self._thread = threading.Thread(target=self._run, name='FileWatcher',
+                                        daemon=True)
+
+    @property
+    def polling(self):
+        """Whether the watcher fell back to polling."""
+        return self._fd is None
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def fileno(self):
+        """Return the file descriptor readable once events are put in the queue."""
+        return self._wakeup_r
+
+    def clear(self):
+        """Consume the notifications of the events put in the queue."""
+        try:
+            while os.read(self._wakeup_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    # --- watch list
+    def watch(self, path, folder=False):
+        """Start watching path, folder=True to watch the content of a folder."""
+        path = os.path.abspath(path)
+        with self._lock:
+            if folder:
+                self._folders.add(path)
+                directory = path
+            else:
+                directory, name = os.path.split(path)
+                self._files.setdefault(directory, set()).add(name)
+            if not self._add_watch(directory):
+                self._stats[path] = self._mtime(path)
+
+    def unwatch(self, path, folder=False):
+        """Stop watching path."""
+        path = os.path.abspath(path)
+        with self._lock:
+            if folder:
+                self._folders.discard(path)
+                directory = path
+            else:
+                directory, name = os.path.split(path)
+                names = self._files.get(directory, set())
+                names.discard(name)
+                if not names:
+                    self._files.pop(directory, None)
+            self._stats.pop(path, None)
+            if directory not in self._folders and directory not in self._files:
+                self._rm_watch(directory)
+
+    def _add_watch(self, directory):
+        """Watch directory with inotify, return False if it is not possible."""
+        if self._fd is None:
+            return False
+        if directory in self._wds:
+            return True
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), DIR_MASK)
+        if wd < 0:
+            logging.warning('Cannot watch %s: %s', directory,
+                            os.strerror(ctypes.get_errno()))
+            return False
+        self._wds[directory] = wd
+        self._paths[wd] = directory
+        return True
+
+    def _rm_watch(self, directory):
+        wd = self._wds.pop(directory, None)
+        if wd is not None:
+            del self._paths[wd]
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _watched_paths(self, directory):
+        """Return the watched paths whose changes are reported by the watch of directory."""
+        paths = [os.path.join(directory, name) for name in self._files.get(directory, ())]
+        if directory in self._folders:
+            paths.append(directory)
+        return paths
+
+    # --- change detection
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def _poll(self):
+        """Stat all polled paths at once and return the changes."""
+        with self._lock:
+            paths = list(self._stats)
+        changes = set()
+        directories = set()  # folders of the paths that exist
+        for path in paths:
+            mtime = self._mtime(path)
+            with self._lock:
+                if path not in self._stats or self._stats[path] == mtime:
+                    continue
+                self._stats[path] = mtime
+                if path in self._folders:
+                    changes.add((path, 'changed'))
+                else:
+                    changes.add((path, 'deleted' if mtime is None else 'modified'))
+                if mtime is not None:
+                    directories.add(path if path in self._folders else os.path.dirname(path))
+        with self._lock:
+            for directory in directories:
+                if self._add_watch(directory):
+                    # the folder is back, inotify reports its changes again
+                    for path in self._watched_paths(directory):
+                        self._stats.pop(path, None)
+        return changes
+
+    def _read_events(self):
+        """Read and decode the pending inotify events."""
+        changes = set()
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return changes
+        i = 0
+        with self._lock:
+            while i < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, i)
+                i += EVENT_HEADER.size
+                name = os.fsdecode(data[i:i + length].rstrip(b'\0'))
+                i += length
+                if mask & IN_Q_OVERFLOW:
+                    # events were lost, report everything
+                    for directory, names in self._files.items():
+                        changes.update((os.path.join(directory, n), 'modified') for n in names)
+                    changes.update((folder, 'changed') for folder in self._folders)
+                    continue
+                directory = self._paths.get(wd)
+                if directory is None:
+                    continue
+                if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    # the folder itself is gone: poll its paths until it is back
+                    changes.update((os.path.join(directory, n), 'deleted')
+                                   for n in self._files.get(directory, ()))
+                    self._rm_watch(directory)
+                    for path in self._watched_paths(directory):
+                        self._stats[path] = self._mtime(path)
+                    continue
+                if name in self._files.get(directory, ()):
+                    path = os.path.join(directory, name)
+                    if mask & (IN_DELETE | IN_MOVED_FROM):
+                        changes.add((path, 'deleted'))
+                    else:
+                        changes.add((path, 'modified'))
+                if directory in self._folders and mask & (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO):
+                    changes.add((directory, 'changed'))
+        return changes
+
+    def _wait_events(self):
+        """Wait for inotify events and return them once the burst is over."""
+        ready = select.select([self._fd], [], [], self.interval)[0]
+        changes = set()
+        end = time.monotonic() + self.interval
+        while ready and not self._stop.is_set():
+            changes |= self._read_events()
+            if time.monotonic() > end:
+                # never hold back events for too long during a continuous burst
+                break
+            ready = select.select([self._fd], [], [], self.delay)[0]
+        return changes
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._fd is None:
+                self._stop.wait(self.interval)
+                changes = set()
+            else:
+                changes = self._wait_events()
+            changes |= self._poll()
+            for change in changes:
+                self.events.put(change)
+            if changes:
+                try:
+                    os.write(self._wakeup_w, b'\0')
+                except BlockingIOError:
+                    pass  # the pipe is full, the GUI has not read the previous notifications yet
+        if self._fd is not None:
+            os.close(self._fd)
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Console history storage
+
+The history is a journal with one JSON encoded command per line, or
+{"cmd": command, "stats": execution statistics} when the statistics of the
+command were recorded (see format_stats). Each command
+is appended to the file as soon as it is executed, under a file lock so that
+several sessions can share the same history file. The file is compacted to
+the maximum history size when the console is closed.
+
+The substring search uses a trigram index of the distinct commands. Since
+building it for a large history takes a while, it is built progressively,
+from the most recent commands, by calling index_step() when idle; the part of
+the history that is not indexed yet is searched linearly.
+"""
+import fcntl
+import json
+import logging
+import os
+import pickle
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from contextlib import contextmanager
+from heapq import nlargest
+
+
+def format_stats(stats):
+    """Return a short description of the execution statistics of a command."""
+    def duration(t):
+        return f'{t * 1000:.0f} ms' if t < 1 else f'{t:.2f} s'
+
+    txt = f"{duration(stats['wall'])} (CPU {duration(stats['cpu'])})"
+    if stats.get('rss', 0) > 0:
+        txt += f", peak memory +{stats['rss'] / 1048576:.1f} MB"
+    return txt
+
+
+@contextmanager
+def _locked(lockfile):
+    with open(lockfile, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+class HistoryStore:
+    """
+    Command history with a prefix index.
+
+    The commands of the previous sessions are loaded at startup, the commands
+    executed by other sessions in the meantime are not visible until the next
+    session.
+    """
+
+    FUZZY_GRAMS = 6  # number of trigrams of the query used for the fuzzy search
+
+    def __init__(self, histfile, maxsize=10000, legacy_histfile=None):
+        """
+        Load the history from histfile.
+
+        If histfile does not exist, the history is imported from
+        legacy_histfile, the pickled list used by older versions.
+        """
+        self.histfile = histfile
+        self.maxsize = maxsize
+        self._lockfile = histfile + '.lock'
+        self._file_length = 0  # number of commands in the file, as far as we know
+        if not os.path.exists(histfile) and legacy_histfile and os.path.exists(legacy_histfile):
+            self._import_legacy(legacy_histfile)
+        records = self._read()[-maxsize:]
+        self.history = [rec if isinstance(rec, str) else rec['cmd'] for rec in records]
+        # execution statistics: {position: {'wall': s, 'cpu': s, 'rss': bytes}}
+        self.stats = {i: rec['stats'] for i, rec in enumerate(records) if isinstance(rec, dict)}
+        self._session_start = len(self.history)
+        self._index = []  # (command, position) sorted
+        self._build_index()
+        # cached matches of the last searched prefix
+        self._match_prefix = None
+        self._matches = []
+        # --- search index
+        self._ids = {}  # command: id
+        self._lower = []  # lowercase command of each id
+        self._last_use = []  # last position of each id
+        self._grams = {}  # trigram: ids of the commands containing it
+        self._unindexed = len(self.history)  # positions below are not indexed
+
+    def _import_legacy(self, legacy_histfile):
+        try:
+            with open(legacy_histfile, 'rb') as file:
+                hist = pickle.load(file)
+        except (pickle.UnpicklingError, EOFError, OSError) as e:
+            logging.error(f'Failed to import history {legacy_histfile}: {e}')
+            return
+        with _locked(self._lockfile):
+            self._write(hist)
+
+    def _read(self):
+        """Return the records stored in the file, skip the corrupted lines."""
+        hist = []
+        try:
+            with open(self.histfile, encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:  # truncated line after a crash
+                        continue
+                    if isinstance(rec, str) or (isinstance(rec, dict) and 'cmd' in rec):
+                        hist.append(rec)
+        except FileNotFoundError:
+            pass
+        self._file_length = len(hist)
+        return hist
+
+    def _write(self, hist):
+        """Replace the history file content by the records hist atomically."""
+        tmp = self.histfile + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as file:
+            file.writelines(json.dumps(rec) + '\n' for rec in hist)
+        os.replace(tmp, self.histfile)
+        self._file_length = len(hist)
+
+    def _build_index(self):
+        self._index = sorted((cmd, i) for i, cmd in enumerate(self.history))
+
+    # --- access
+    def __len__(self):
+        return len(self.history)
+
+    def __getitem__(self, pos):
+        return self.history[pos]
+
+    def get_session_hist(self):
+        return self.history[self._session_start:]
+
+    def new_session(self):
+        self._session_start = len(self.history)
+
+    def matches(self, prefix):
+        """Return the sorted positions of the commands starting with prefix."""
+        if not prefix:
+            return range(len(self.history))
+        start = bisect_left(self._index, (prefix,))
+        end = bisect_left(self._index, (prefix + '\U0010ffff',), start)
+        return sorted(pos for cmd, pos in self._index[start:end] if cmd.startswith(prefix))
+
+    def find(self, prefix, pos, backwards=True):
+        """
+        Return the position of the closest command before (or after) pos
+        starting with prefix, None if there is none.
+        """
+        if prefix != self._match_prefix:
+            self._matches = self.matches(prefix)
+            self._match_prefix = prefix
+        if backwards:
+            i = bisect_left(self._matches, pos) - 1
+            return self._matches[i] if i >= 0 else None
+        i = bisect_right(self._matches, pos)
+        return self._matches[i] if i < len(self._matches) else None
+
+    # --- search
+    def _index_command(self, cmd, pos):
+        i = self._ids.get(cmd)
+        if i is not None:
+            self._last_use[i] = max(self._last_use[i], pos)
+            return
+        i = self._ids[cmd] = len(self._lower)
+        low = cmd.lower()
+        self._lower.append(low)
+        self._last_use.append(pos)
+        grams = self._grams
+        for g in {low[k:k + 3] for k in range(len(low) - 2)}:
+            try:
+                grams[g].append(i)
+            except KeyError:
+                grams[g] = [i]
+
+    def _reset_search_index(self):
+        self._ids.clear()
+        self._lower.clear()
+        self._last_use.clear()
+        self._grams.clear()
+        self._unindexed = len(self.history)
+
+    def index_step(self, count=2000):
+        """
+        Index the next count commands (going backward in time).
+
+        Return True if there are still commands to index.
+        """
+        stop = max(self._unindexed - count, 0)
+        for pos in range(self._unindexed - 1, stop - 1, -1):
+            self._index_command(self.history[pos], pos)
+        self._unindexed = stop
+        return stop > 0
+
+    def search(self, query, limit=50):
+        """
+        Return the commands matching query (case insensitive) as a list of (command, fuzzy).
+
+        The commands containing query come first, the most recent first,
+        followed by the fuzzy matches sharing most of the trigrams of query.
+        """
+        q = query.lower()
+        grams = {q[k:k + 3] for k in range(len(q) - 2)}
+        if not grams:  # short query: the most recent commands match
+            res = []
+            seen = set()
+            for cmd in reversed(self.history):
+                if q in cmd.lower() and cmd not in seen:
+                    seen.add(cmd)
+                    res.append((cmd, False))
+                    if len(res) == limit:
+                        break
+            return res
+        postings = sorted((self._grams.get(g, []) for g in grams), key=len)
+        if postings[0]:
+            ids = set(postings[0]).intersection(*postings[1:])
+            ids = [i for i in ids if q in self._lower[i]]
+        else:
+            ids = []
+        ids.sort(key=self._last_use.__getitem__, reverse=True)
+        res = [(self.history[self._last_use[i]], False) for i in ids[:limit]]
+        if len(res) < limit and self._unindexed:
+            seen = self._ids
+            found = set()
+            for pos in range(self._unindexed - 1, -1, -1):
+                cmd = self.history[pos]
+                if cmd not in seen and cmd not in found and q in cmd.lower():
+                    found.add(cmd)
+                    res.append((cmd, False))
+                    if len(res) == limit:
+                        break
+        if len(res) < limit and len(grams) > 1:
+            # fuzzy matches: at least half of the rarest trigrams in common
+            rarest = [p for p in postings if p][:self.FUZZY_GRAMS]
+            counts = Counter()
+            for p in rarest:
+                counts.update(p)
+            threshold = len(rarest) / 2
+            matched = set(ids)
+            fuzzy = nlargest(limit - len(res),
+                             (i for i, n in counts.items() if n >= threshold and i not in matched),
+                             key=lambda i: (counts[i], self._last_use[i]))
+            res.extend((self.history[self._last_use[i]], True) for i in fuzzy)
+        return res
+
+    # --- modification
+    def append(self, cmd, stats=None):
+        """Add cmd, with its execution statistics if any, to the history and to the file."""
+        self._index_command(cmd, len(self.history))
+        insort(self._index, (cmd, len(self.history)))
+        if stats:
+            self.stats[len(self.history)] = stats
+            rec = {'cmd': cmd, 'stats': stats}
+        else:
+            rec = cmd
+        self.history.append(cmd)
+        self._match_prefix = None
+        try:
+            with _locked(self._lockfile):
+                with open(self.histfile, 'a+b') as file:
+                    if file.tell() > 0:
+                        file.seek(-1, os.SEEK_END)
+                        if file.read(1) != b'\n':
+                            # end the line truncated by a crash
+                            file.write(b'\n')
+                    file.write(json.dumps(rec).encode('utf-8') + b'\n')
+        except OSError as e:
+            logging.error(f'Failed to save history: {e}')
+        else:
+            self._file_length += 1
+
+    def replace(self, pos, cmd):
+        """Replace the command at pos (in memory only)."""
+        old = self.history[pos]
+        del self._index[bisect_left(self._index, (old, pos))]
+        insort(self._index, (cmd, pos))
+        self.history[pos] = cmd
+        self.stats.pop(pos, None)
+        self._match_prefix = None
+        self._reset_search_index()
+
+    def remove(self, pos):
+        """Remove the command at pos (in memory only)."""
+        del self.history[pos]
+        self.stats = {i if i < pos else i - 1: st for i, st in self.stats.items() if i != pos}
+        if pos < self._session_start:
+            self._session_start -= 1
+        self._build_index()
+        self._match_prefix = None
+        self._reset_search_index()
+
+    def compact(self):
+        """Keep only the last maxsize commands in the file."""
+        if self._file_length <= self.maxsize:
+            return
+        try:
+            with _locked(self._lockfile):
+                hist = self._read()
+                if len(hist) > self.maxsize:
+                    self._write(hist[-self.maxsize:])
+        except OSError as e:
+            logging.error(f'Failed to compact history: {e}')
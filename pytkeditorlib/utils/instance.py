@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Single instance handling
+
+The first instance listens on a Unix domain socket, the next launches send it
+the files to open and wait for its acknowledgement. This module only uses the
+standard library so that the launcher can hand the files over before
+importing the rest of PyTkEditor.
+"""
+import fcntl
+import os
+import socket
+
+# same as constants.LOCAL_PATH, constants is not imported because it is slow
+PATH = os.path.dirname(os.path.dirname(__file__))
+if os.access(PATH, os.W_OK) and os.path.exists(os.path.join(PATH, "images")):
+    LOCAL_PATH = os.path.join(PATH, 'config')
+else:
+    LOCAL_PATH = os.path.join(os.path.expanduser("~"), ".pytkeditor")
+
+SOCKET_PATH = os.path.join(LOCAL_PATH, 'pytkeditor.sock')
+LOCK_PATH = os.path.join(LOCAL_PATH, 'pytkeditor.lock')
+
+SEP = b'\0'  # file path separator
+ACK = b'ok'
+
+_server_id = None  # identifier of the socket file created by this instance
+
+
+def encode_files(files):
+    return SEP.join(os.fsencode(f) for f in files)
+
+
+def decode_files(data):
+    return [os.fsdecode(f) for f in data.split(SEP) if f]
+
+
+def _connect():
+    """Return a socket connected to the running instance, None if there is none."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(SOCKET_PATH)
+    except OSError:  # no socket or nobody listening (stale socket)
+        client.close()
+        return None
+    return client
+
+
+def _listen():
+    """Return the listening socket of the new instance, None if it cannot be created."""
+    global _server_id
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        if os.path.exists(SOCKET_PATH):
+            os.remove(SOCKET_PATH)  # left by an instance that crashed
+        server.bind(SOCKET_PATH)
+        os.chmod(SOCKET_PATH, 0o600)
+        server.listen(16)
+    except OSError as e:
+        print(f'Cannot create {SOCKET_PATH}: {e}')
+        server.close()
+        return None
+    _server_id = _socket_id()
+    return server
+
+
+def _socket_id():
+    """Return an identifier of the current socket file, None if there is none."""
+    try:
+        st = os.stat(SOCKET_PATH)
+    except OSError:
+        return None
+    # the inode of a removed socket can be reused by the next one
+    return st.st_dev, st.st_ino, st.st_ctime_ns
+
+
+def claim(files, timeout=30):
+    """
+    Hand files over to the running instance or become the running instance.
+
+    Return (primary, server):
+
+    * (False, None) if the files were handed over to the running instance
+    * (True, server) otherwise, server being the socket to give to the App
+      (it is None if the socket could not be created)
+
+    If the running instance does not acknowledge the files within timeout
+    seconds (e.g. it is frozen), its socket is considered stale and this
+    launch becomes the running instance.
+
+    The check and the creation of the socket are done under a file lock so
+    that simultaneous launches do not start several instances. Since the
+    socket starts listening immediately, the files sent while the instance
+    is still starting are queued and opened once it is ready.
+    """
+    os.makedirs(LOCAL_PATH, exist_ok=True)
+    with open(LOCK_PATH, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        client = _connect()
+        if client is None:
+            return True, _listen()
+        socket_id = _socket_id()
+    try:
+        with client:
+            client.settimeout(timeout)
+            client.sendall(encode_files(files))
+            client.shutdown(socket.SHUT_WR)
+            ack = client.recv(len(ACK))
+        if ack != ACK:
+            raise ConnectionError('the running instance did not acknowledge the request')
+    except OSError as e:
+        print(f'The running instance does not answer ({e}), starting a new one.')
+        with open(LOCK_PATH, 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if _socket_id() == socket_id:
+                return True, _listen()  # replace the stale socket
+        # another launch replaced the socket in the meantime
+        return claim(files, timeout)
+    return False, None
+
+
+def release(server):
+    """
+    Close the instance socket.
+
+    The socket file is only removed if it is still the one of this instance:
+    it may have been replaced by a new instance if this one was frozen.
+    """
+    server.close()
+    try:
+        with open(LOCK_PATH, 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if _server_id is not None and _socket_id() == _server_id:
+                os.remove(SOCKET_PATH)
+    except OSError:
+        pass
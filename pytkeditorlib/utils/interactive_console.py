@@ -22,31 +22,47 @@ Python interpreter to execute the commands from the TextConsole
 """
 
 from code import InteractiveConsole
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from contextlib import redirect_stdout, redirect_stderr
 from io import StringIO
+import asyncio
+import queue
 import socket
 import ssl
 import sys
 import signal
+import threading
+import resource
 import tkinter
-import time
 import timeit
+import tokenize
+import re
+import statistics
+from ast import literal_eval, PyCF_ALLOW_TOP_LEVEL_AWAIT
+from inspect import CO_COROUTINE
+from math import exp, log, sqrt
 from datetime import datetime
 from os import chdir, getcwd
 from os.path import dirname, expanduser, join
-from tempfile import mkstemp
 from subprocess import run
 from textwrap import dedent
+from time import perf_counter, process_time
 import logging
 from logging import handlers
 import argparse
 
 
-from constants import CLIENT_CERT, SERVER_CERT, CONSOLE_HELP
+from constants import CLIENT_CERT, SERVER_CERT, CONSOLE_HELP, format_long_output
+from console_protocol import MessageReader, Dispatcher, encode, encode_stream
+from namespace import NamespaceWatcher, children, resolve, summary
+
+# unit of ru_maxrss in bytes
+RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
 
 GUI = ['', 'tk']
 try:
     from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QEventLoop, QSocketNotifier
 except ImportError:
     pass
 else:
@@ -54,7 +70,7 @@ else:
 try:
     import gi
     gi.require_version('Gtk', '3.0')
-    from gi.repository import Gtk
+    from gi.repository import Gtk, GLib
 except ImportError:
     pass
 else:
@@ -82,11 +98,105 @@ class OutputFilter(logging.Filter):
 
 
 class Stdout:
-    def __init__(self, send_cmd, *args):
-        self.send_cmd = send_cmd
+    """
+    Buffer the outputs and send them by batches.
 
-    def write(self, line):
-        self.send_cmd(line)
+    The buffer is sent when it contains more than max_size characters
+    or delay seconds after the first write. Long containers' representations
+    are split on several lines to fit in width. When the buffer was sent
+    because it was full, the writer waits for the data to be actually sent
+    (drain()) so that a flooding output does not fill the memory.
+    """
+
+    def __init__(self, send_cmd, drain=None, max_size=65536, delay=0.05):
+        self.send_cmd = send_cmd
+        self.drain = drain
+        self.width = 80
+        self.max_size = max_size
+        self.delay = delay
+        self._buffer = []
+        self._size = 0
+        self._timer = None
+        self._lock = threading.RLock()
+
+    def write(self, text):
+        length = len(text)
+        text = format_long_output(text, self.width)
+        full = False
+        with self._lock:
+            self._buffer.append(text)
+            self._size += len(text)
+            if self._size >= self.max_size:
+                self.flush()
+                full = True
+            elif self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full and self.drain is not None:
+            self.drain()
+        return length
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._buffer:
+                text = ''.join(self._buffer)
+                self._buffer.clear()
+                self._size = 0
+                self.send_cmd(text)
+
+
+# --- timeit helpers
+TIMEIT_OPTION = re.compile(r'\s*-([nrs])\s*(\d+|"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|\S+)')
+# 0.975 quantile of Student's t distribution by degrees of freedom
+T_975 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365,
+         8: 2.306, 9: 2.262, 10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086,
+         30: 2.042, 60: 2.000}
+
+
+def format_time(t):
+    """Format duration t (in seconds) with 3 significant digits."""
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if t >= scale:
+            return f'{t / scale:.3g} {unit}'
+    return f'{t / 1e-9:.3g} ns'
+
+
+def t_quantile(df):
+    """Return the 0.975 quantile of Student's t distribution (df degrees of freedom)."""
+    if df > 60:
+        return 1.96
+    return T_975[max(k for k in T_975 if k <= df)]
+
+
+def split_statements(code):
+    """Split code on the ';' that are not inside brackets or strings."""
+    lines = code.splitlines(True)
+    starts = [0]
+    for line in lines:
+        starts.append(starts[-1] + len(line))
+    parts = []
+    start = 0
+    depth = 0
+    try:
+        for tok in tokenize.generate_tokens(iter(lines).__next__):
+            if tok.type != tokenize.OP:
+                continue
+            if tok.string in '([{':
+                depth += 1
+            elif tok.string in ')]}':
+                depth -= 1
+            elif tok.string == ';' and depth == 0:
+                pos = starts[tok.start[0] - 1] + tok.start[1]
+                parts.append(code[start:pos])
+                start = pos + 1
+    except tokenize.TokenError:  # unclosed bracket, let the compilation report it
+        pass
+    parts.append(code[start:])
+    return [p.strip() for p in parts if p.strip()]
 
 
 class ConsoleMethods:
@@ -176,6 +286,22 @@ class ConsoleMethods:
 
             Set working directory to filename's directory and run filename.
 
+        * %timeit [-n N] [-r R] [-s SETUP] statement
+
+            Time the execution of statement (N loops per run, R runs) and
+            print the minimum, median and standard deviation of the time
+            per loop.
+
+        * %%timeit [-n N] [-r R] [-s SETUP]
+
+            Cell mode of %timeit: time the code following the first line,
+            e.g. when running an editor cell starting with %%timeit.
+
+        * %timeit_compare [-n N] [-r R] [-s SETUP] statement1 ; statement2
+
+            Compare the execution time of the statements, with 95% confidence
+            intervals for the relative speed.
+
         """
         print(dedent(self.magic.__doc__))
 
@@ -220,12 +346,124 @@ class ConsoleMethods:
         self.locals['plt'] = plt
         self.locals['np'] = numpy
 
-    def timeit(self, code):
-        """Benchmark a single line statement."""
-        locs = self.locals.copy()
-        timer = timeit.Timer(lambda: exec(code, locs, locs))
-        nb, t_tot = timer.autorange()
-        print(f"average time {t_tot/nb} s over {nb} executions")
+    # --- --- timeit
+    @staticmethod
+    def _parse_timeit(arg):
+        """Return (number, repeat, setup, statement) from the %timeit arguments."""
+        number, repeat, setup = 0, 7, []
+        pos = 0
+        match = TIMEIT_OPTION.match(arg)
+        while match:
+            opt, val = match.groups()
+            if opt == 's':
+                setup.append(literal_eval(val) if val[0] in '\'"' else val)
+            else:
+                try:
+                    val = int(val)
+                    assert val > 0
+                except (ValueError, AssertionError):
+                    raise ValueError(f'-{opt} expects a positive integer') from None
+                if opt == 'n':
+                    number = val
+                else:
+                    repeat = val
+            pos = match.end()
+            match = TIMEIT_OPTION.match(arg, pos)
+        return number, repeat, '\n'.join(setup), arg[pos:].strip()
+
+    def _timer(self, stmt, setup='pass'):
+        """Return a Timer running stmt in the console namespace."""
+        # the statement is executed inside a function so it does not change the namespace
+        return timeit.Timer(stmt, setup or 'pass', globals=self.locals)
+
+    @staticmethod
+    def _calibrate(timer, number):
+        """Return the number of loops so that one run takes at least 0.2 s."""
+        if number:
+            return number
+        number, _ = timer.autorange()
+        return number
+
+    @staticmethod
+    def _print_timings(times, number):
+        tmin = min(times)
+        print(f'min {format_time(tmin)}, median {format_time(statistics.median(times))}, '
+              f'std. dev. {format_time(statistics.pstdev(times))} per loop '
+              f'({len(times)} run{"s" * (len(times) > 1)}, {number} loop{"s" * (number > 1)} each)')
+        if max(times) > 4 * tmin and tmin > 0:
+            print(f'The slowest run took {max(times) / tmin:.2f} times longer than the fastest. '
+                  'This could mean that an intermediate result is being cached.')
+
+    def timeit(self, arg, cell=None):
+        """
+        %timeit [-n N] [-r R] [-s SETUP] statement
+
+        Time the execution of a statement.
+
+        The statement is executed N times per run, in R runs (7 by default) and
+        the minimum, median and standard deviation of the time per loop
+        over the runs are reported. If N is not given, it is chosen so that a
+        run takes at least 0.2 s. SETUP is executed once before each run
+        (use quotes if it contains spaces), -s can be given several times.
+
+        %%timeit [-n N] [-r R] [-s SETUP]
+        code
+
+            Cell mode: time the execution of the code following the first line.
+        """
+        number, repeat, setup, stmt = self._parse_timeit(arg)
+        if cell is not None:
+            if stmt:  # setup code on the first line
+                setup = '\n'.join([setup, stmt]) if setup else stmt
+            stmt = cell
+        if not stmt.strip():
+            raise ValueError('no statement to time')
+        timer = self._timer(stmt, setup)
+        number = self._calibrate(timer, number)
+        times = [t / number for t in timer.repeat(repeat, number)]
+        self._print_timings(times, number)
+
+    def timeit_compare(self, arg):
+        """
+        %timeit_compare [-n N] [-r R] [-s SETUP] statement1 ; statement2 [; ...]
+
+        Compare the execution time of several statements.
+
+        The runs of the statements are interleaved so that they are equally
+        affected by the variations of the machine load. The speed of each
+        statement relative to the first one is given with a 95% confidence
+        interval, computed from the times per loop, assumed log-normal.
+        """
+        number, repeat, setup, stmt = self._parse_timeit(arg)
+        stmts = split_statements(stmt)
+        if len(stmts) < 2:
+            raise ValueError('at least two statements separated by ; are expected')
+        if repeat < 2:
+            raise ValueError('at least 2 runs are needed to compute confidence intervals')
+        timers = [self._timer(s, setup) for s in stmts]
+        numbers = [self._calibrate(timer, number) for timer in timers]
+        times = [[] for s in stmts]
+        for r in range(repeat):
+            for timer, nb, t in zip(timers, numbers, times):
+                t.append(timer.timeit(nb) / nb)
+        for i, (s, t, nb) in enumerate(zip(stmts, times, numbers)):
+            print(f'[{i}] {s}')
+            print('    ', end='')
+            self._print_timings(t, nb)
+        logs = [[log(x) for x in t] for t in times]
+        ref = logs[0]
+        half_width_0 = statistics.variance(ref) / len(ref)
+        q = t_quantile(repeat - 1)
+        for i, l in enumerate(logs[1:], 1):
+            diff = statistics.mean(l) - statistics.mean(ref)
+            half_width = q * sqrt(half_width_0 + statistics.variance(l) / len(l))
+            ratio, low, high = exp(diff), exp(diff - half_width), exp(diff + half_width)
+            if ratio >= 1:
+                print(f'[{i}] is {ratio:.3g}x slower than [0] '
+                      f'(95% CI {low:.3g}x - {high:.3g}x)')
+            else:
+                print(f'[{i}] is {1 / ratio:.3g}x faster than [0] '
+                      f'(95% CI {1 / high:.3g}x - {1 / low:.3g}x)')
 
     def run(self, filename):
         """Set working directory to filename's directory and run filename."""
@@ -323,9 +561,25 @@ Timestamp  : {args.timestamps}"""
 
 
 class SocketConsole(InteractiveConsole):
+    """
+    Console executing the code sent by the TextConsole.
+
+    The code is executed in the main thread while the connection is handled
+    by an asyncio event loop in the I/O thread: the outputs are sent while
+    the code runs and the other requests (namespace, interrupt, ...) are
+    answered without waiting for the end of the execution. The I/O thread
+    passes the code to execute to the main thread through a queue.
+
+    Coroutines can be awaited at top level, they run in the asyncio event loop
+    of the main thread. This loop also runs between two commands (unless
+    a GUI event loop integration is enabled), so that the background tasks
+    keep running.
+    """
+
     def __init__(self, hostname, port, locals=None, filename='<console>'):
         InteractiveConsole.__init__(self, locals, filename)
-        self.stdout = Stdout(self.send_cmd)
+        self.compile.compiler.flags |= PyCF_ALLOW_TOP_LEVEL_AWAIT
+        self.stdout = Stdout(self.send_cmd, self.drain)
         self.stderr = StringIO()
 
         self.cm = ConsoleMethods(self.locals)
@@ -336,19 +590,35 @@ class SocketConsole(InteractiveConsole):
         self.locals['_getcwd'] = getcwd
         self.locals['_cwd'] = getcwd()
         self._initial_locals = self.locals.copy()
+        self._watcher = NamespaceWatcher(hidden=self._initial_locals)
+        self._namespace_lock = threading.Lock()  # namespace requested from both threads
+        self._executing = False
+        self._error = False  # the executed code raised an exception
         signal.signal(signal.SIGINT, self.interrupt)
-        context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH, cafile=SERVER_CERT)
-        context.load_cert_chain(certfile=CLIENT_CERT)
-        context.load_verify_locations(SERVER_CERT)
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # asyncio event loop running the top level coroutines
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        # --- connection
         self.port = port
         self.host = hostname
-        self.socket = context.wrap_socket(sock, server_side=False,
-                                          server_hostname='PyTkEditor_Server')
-        self.socket.connect((self.host, self.port))
+        self._requests = queue.Queue()  # execute messages, None when disconnected
+        # the main thread waits for requests on _wakeup_r (see _wait_input)
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._writer = None
+        self._connection_error = None
+        self._connected = threading.Event()
+        self._io_loop = asyncio.new_event_loop()
+        self._io_thread = threading.Thread(target=self._run_io, name='console I/O', daemon=True)
+        self._io_thread.start()
+        self._connected.wait()
+        if self._connection_error is not None:
+            raise self._connection_error
 
     def interrupt(self, *args):
-        raise KeyboardInterrupt
+        if self._executing:
+            raise KeyboardInterrupt
 
     def _exit(self):
         self.resetbuffer()
@@ -363,14 +633,36 @@ class SocketConsole(InteractiveConsole):
                 self._log_output += "\n#      " + '\n#      '.join(lines[1:])
         self.stderr.write(data)
 
+    def showtraceback(self):
+        self._error = True
+        InteractiveConsole.showtraceback(self)
+
+    def showsyntaxerror(self, filename=None, **kwargs):
+        self._error = True
+        InteractiveConsole.showsyntaxerror(self, filename, **kwargs)
+
     def runcode(self, code):
         try:
-            exec(code, self.locals)
+            if isinstance(code, str):  # several statements
+                code = compile(code, '<input>', 'exec', PyCF_ALLOW_TOP_LEVEL_AWAIT)
+            if code.co_flags & CO_COROUTINE:  # top level await
+                self.run_coroutine(eval(code, self.locals))
+            else:
+                exec(code, self.locals)
         except (SystemExit, KeyboardInterrupt):
             raise
         except Exception:
             self.showtraceback()
 
+    def run_coroutine(self, coro):
+        """Run coro in the asyncio event loop until it completes."""
+        task = self.loop.create_task(coro)
+        try:
+            return self.loop.run_until_complete(task)
+        except KeyboardInterrupt:
+            task.cancel()
+            raise
+
     def runsource(self, source, filename="<input>", symbol="single"):
         try:
             code = self.compile(source, filename, symbol)
@@ -397,72 +689,258 @@ class SocketConsole(InteractiveConsole):
                 self._log_output += f"\n#[Out] {lines[0]}\n#      " + '\n#      '.join(lines[1:])
             elif lines[0].strip():
                 self._log_output += f"\n#[Out] {lines[0]}"
-        msg = 'False, {!r}, "", True, {!r}'.format(line + '\n', self.locals["_cwd"])
-        if len(msg) > 16300:
-            fileno, filename = mkstemp(text=True)
-            with open(filename, 'w') as tmpfile:
-                tmpfile.write(msg)
-                msg = f'False, {filename!r}, "Too long", True, {self.locals["_cwd"]!r}'
-        self.socket.send(msg.encode())
-
-    def _gui_loop(self):
-        gui = self.locals['_console'].current_gui
-        if gui == 'tk':
-            if tkinter._default_root is not None:
-                tkinter._default_root.update()
+        self.send(encode_stream('stdout', line))
+
+    # --- connection
+    def _run_io(self):
+        """Run the I/O event loop (I/O thread)."""
+        # SIGINT must interrupt the main thread, even when it is blocked in a system call
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT})
+        asyncio.set_event_loop(self._io_loop)
+        try:
+            self._io_loop.run_until_complete(self._serve())
+        finally:
+            self._io_loop.close()
+
+    async def _serve(self):
+        """Connect to the TextConsole and handle its messages (I/O thread)."""
+        context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH, cafile=SERVER_CERT)
+        context.load_cert_chain(certfile=CLIENT_CERT)
+        context.load_verify_locations(SERVER_CERT)
+        try:
+            stream, self._writer = await asyncio.open_connection(self.host, self.port, ssl=context,
+                                                                 server_hostname='PyTkEditor_Server')
+        except OSError as e:
+            self._connection_error = e
+            return
+        finally:
+            self._connected.set()
+        reader = MessageReader()
+        dispatcher = Dispatcher(execute=self._queue_request,
+                                namespace=self.send_namespace,
+                                children=self.send_children,
+                                interrupt=self._on_interrupt)
+        try:
+            while True:
+                data = await stream.read(65536)
+                if not data:  # the TextConsole was closed
+                    break
+                dispatcher.dispatch(reader.feed(data))
+        except OSError:
+            pass
+        finally:
+            self._queue_request(None)
+            self._writer.close()
+
+    def _queue_request(self, msg):
+        """Pass msg to the main thread (I/O thread)."""
+        self._requests.put(msg)
+        try:
+            self._wakeup_w.send(b'\0')
+        except BlockingIOError:  # the main thread has not woken up yet
+            pass
+
+    def _on_interrupt(self, msg):
+        """Interrupt the running code (I/O thread)."""
+        if self._executing:
+            signal.pthread_kill(threading.main_thread().ident, signal.SIGINT)
+
+    def send(self, data):
+        """Send data to the TextConsole (thread safe, the data is sent in call order)."""
+        try:
+            self._io_loop.call_soon_threadsafe(self._writer.write, data)
+        except RuntimeError:  # the connection is closed
+            pass
+
+    def drain(self):
+        """Wait until the sent data is flushed to the socket."""
+        if threading.current_thread() is self._io_thread:
+            return
+        try:
+            future = asyncio.run_coroutine_threadsafe(self._writer.drain(), self._io_loop)
+        except RuntimeError:  # the connection is closed
+            return
+        while self._io_thread.is_alive():
+            try:
+                future.result(0.5)
+            except FutureTimeoutError:
+                continue
+            except ConnectionError:
+                pass
+            return
+
+    def execute(self, msg):
+        """Execute the code received from the TextConsole and send the result."""
+        line = msg['code']
+        self.stdout.width = msg.get('width', 80)
+        if self.buffer:
+            self.resetbuffer()
+        exit = False
+        self._error = False
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        wall = perf_counter()
+        cpu = process_time()
+        try:
+            self._executing = True
+            with redirect_stderr(self.stderr):
+                res = self.push(line)
+        except SystemExit:
+            exit = True
+            res = False
+        except KeyboardInterrupt:
+            self.write('KeyboardInterrupt\n')
+            self._error = True
+            res = False
+        finally:
+            self._executing = False
+        stats = {'wall': perf_counter() - wall, 'cpu': process_time() - cpu,
+                 'rss': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) * RSS_UNIT}
+        self.stdout.flush()
+        err = self.stderr.getvalue()
+        if not res:
+            if line.strip():
+                self.cm.logger.info(line.strip())
+            if self._log_output[1:]:
+                self.cm.logger.info(self._log_output[1:])
+            self._log_output = ""
+        if not res and not err:
+            self.push('_cwd = _getcwd()')
+        if err and not exit:
+            self.send(encode_stream('stderr', err))
+        if msg.get('namespace') and not res:
+            self.send_namespace()
+        result = {'type': 'result', 'more': res, 'exit': exit,
+                  'error': self._error or exit, 'cwd': self.locals["_cwd"]}
+        if msg.get('stats') and not res:
+            result['stats'] = stats
+        self.send(encode(result))
+        self.stderr.close()
+        self.stderr = StringIO()
+
+    # --- variable explorer
+    def send_namespace(self, msg=None):
+        """Send the changes of the namespace since the last call."""
+        with self._namespace_lock:
+            if msg is not None and msg.get('reset'):
+                self._watcher.reset()
+            changed, removed = self._watcher.diff(self.locals)
+            self.send(encode({'type': 'namespace', 'changed': changed, 'removed': removed}))
+
+    def send_children(self, msg):
+        """Send the summaries of a page of items of a variable."""
+        reply = {'type': 'children', 'name': msg['name'], 'path': msg['path'],
+                 'start': msg['start'], 'total': 0, 'items': []}
+        try:
+            obj = resolve(self.locals, msg['name'], msg['path'])
+            total, items = children(obj, msg['start'], msg['count'])
+        except Exception as e:
+            reply['error'] = repr(e)
+        else:
+            reply['total'] = total
+            reply['items'] = [summary(label, item) for label, item in items]
+        self.send(encode(reply))
+
+    # --- input hooks: run the GUI event loop until the next command arrives
+    def _wait_asyncio(self):
+        ready = self.loop.create_future()
+        self.loop.add_reader(self._wakeup_r, lambda: ready.done() or ready.set_result(None))
+        try:
+            self.loop.run_until_complete(ready)
+        finally:
+            self.loop.remove_reader(self._wakeup_r)
+
+    def _wait_tk(self, root):
+        root.tk.createfilehandler(self._wakeup_r, tkinter.READABLE, lambda *args: root.quit())
+        try:
+            root.mainloop()
+        finally:
+            root.tk.deletefilehandler(self._wakeup_r)
+
+    def _wait_gtk(self):
+        loop = GLib.MainLoop()
+
+        def on_input(*args):
+            loop.quit()
+            return True
+
+        source = GLib.io_add_watch(self._wakeup_r.fileno(), GLib.PRIORITY_DEFAULT,
+                                   GLib.IO_IN, on_input)
+        try:
+            loop.run()
+        finally:
+            GLib.source_remove(source)
+
+    def _wait_qt(self, app):
+        loop = QEventLoop()
+        notifier = QSocketNotifier(self._wakeup_r.fileno(), QSocketNotifier.Read)
+        notifier.activated.connect(loop.quit)
+        try:
+            loop.exec_()
+        finally:
+            notifier.setEnabled(False)
+
+    def _wait_input(self):
+        """Wait for a request, running the GUI or asyncio event loop meanwhile."""
+        gui = self.cm.current_gui
+        if gui == 'tk' and tkinter._default_root is not None:
+            self._wait_tk(tkinter._default_root)
         elif gui == 'gtk':
-            while Gtk.events_pending():
-                Gtk.main_iteration()
-        elif gui == 'qt':
-            app = QApplication.instance()
-            if app:
-                app.processEvents()
+            self._wait_gtk()
+        elif gui == 'qt' and QApplication.instance():
+            self._wait_qt(QApplication.instance())
+        else:
+            self._wait_asyncio()
+
+    def _next_request(self):
+        """Return the next execute message, None if the TextConsole was closed."""
+        while True:
+            try:
+                return self._requests.get_nowait()
+            except queue.Empty:
+                pass
+            self._wait_input()
+            try:
+                while self._wakeup_r.recv(4096):
+                    pass
+            except BlockingIOError:
+                pass
 
     def interact(self):
-        self.socket.setblocking(False)
         with redirect_stdout(self.stdout):
             while True:
                 try:
-                    line = self.socket.recv(65536).decode()
-                    if self.buffer:
-                        self.resetbuffer()
-                    try:
-                        with redirect_stderr(self.stderr):
-                            res = self.push(line)
-                    except SystemExit:
-                        self.write('SystemExit\n')
-                        res = False
-                    except KeyboardInterrupt:
-                        self.write('KeyboardInterrupt\n')
-                        res = False
-                    err = self.stderr.getvalue()
-                    if not res:
-                        if line.strip():
-                            self.cm.logger.info(line.strip())
-                        if self._log_output[1:]:
-                            self.cm.logger.info(self._log_output[1:])
-                        self._log_output = ""
-                    if not res and not err:
-                        self.push('_cwd = _getcwd()')
-                    msg = f'{res}, "", {err!r}, False, {self.locals["_cwd"]!r}'
-                    if len(msg) > 16300:
-                        fileno, filename = mkstemp(text=True)
-                        with open(filename, 'w') as tmpfile:
-                            tmpfile.write(msg)
-                        msg = f'{res}, {filename!r}, "Too long", True, {self.locals["_cwd"]!r}'
-                    self.socket.send(msg.encode())
-                    self.stderr.close()
-                    self.stderr = StringIO()
-                except BrokenPipeError:
-                    self.socket.close()
+                    msg = self._next_request()
+                except KeyboardInterrupt:  # nothing to interrupt
+                    continue
+                if msg is None:
                     break
-                except socket.error as e:
-                    if e.errno != 2:
-                        print('%r' % e, type(e), e)
-                    self._gui_loop()
-                    time.sleep(0.05)
+                self.execute(msg)
+        self.loop.close()
+
+
+def preload(modules):
+    """Import the comma separated modules, return the error messages."""
+    errors = []
+    for name in modules.split(','):
+        name = name.strip()
+        if not name:
+            continue
+        try:
+            __import__(name)
+        except Exception as e:
+            errors.append(f'Failed to preload {name}: {e!r}\n')
+    return ''.join(errors)
 
 
 if __name__ == '__main__':
-    c = SocketConsole(sys.argv[1], int(sys.argv[2]))
+    parser = argparse.ArgumentParser(description='PyTkEditor console process')
+    parser.add_argument('host')
+    parser.add_argument('port', type=int)
+    parser.add_argument('--preload', default='',
+                        help='comma separated modules to import before connecting')
+    args = parser.parse_args()
+    errors = preload(args.preload)
+    c = SocketConsole(args.host, args.port)
+    if errors:
+        c.send(encode_stream('stderr', errors))
     c.interact()
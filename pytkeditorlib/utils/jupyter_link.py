@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Client of a Jupyter kernel integrated in the Tk event loop
+
+The kernel is either started by PyTkEditor or an existing one. The zmq
+sockets are watched with Tk file handlers, so there is no thread and no Qt
+frontend. The file descriptor of a zmq socket only signals new events, so a
+socket is read until it has no more messages, and checked again after each
+send.
+
+The code can be sent as soon as the kernel is launched: it is queued until
+the kernel answers a kernel_info_request and its IOPub messages are received
+(otherwise the first outputs could be lost), and then executed in order.
+
+The IOPub messages are passed to the output callback by batches of at most
+BATCH messages and the remaining ones are read once the GUI is idle: the
+messages the GUI cannot keep up with stay in the zmq queue, which drops them
+beyond its high water mark. The end of a kernel started by PyTkEditor is
+detected when its stderr is closed.
+"""
+import logging
+import os
+import signal
+import tkinter as tk
+from subprocess import Popen, PIPE
+
+from .lazy_import import jupyter_client, zmq
+
+
+class JupyterLink:
+    """Connection to a Jupyter kernel."""
+
+    TIMEOUT = 60  # maximum time (s) to wait for the kernel to answer
+    BATCH = 200  # maximum number of messages read from a socket at once
+
+    def __init__(self, widget, on_output, on_error):
+        """
+        Create the link.
+
+        widget: widget whose event loop watches the sockets and the kernel process
+        on_output: function called with the lists of IOPub messages
+        on_error: function called as on_error(message, details) when the kernel fails
+        """
+        self.widget = widget
+        self.on_output = on_output
+        self.on_error = on_error
+        self.process = None  # kernel process if started by PyTkEditor
+        self.connection_file = ''
+        self.session = None
+        self.ready = False
+        self.executing = False  # the kernel is running code
+        self.executions = 0  # changes each time the kernel namespace may change
+        self._sockets = {}  # channel: zmq socket
+        self._read_ids = {}  # channel: after id of the next read
+        self._replies = {}  # msg_id: callback called with the reply
+        self._queue = []  # (code, callback) sent before the kernel was ready
+        self._execute_ids = set()  # msg_id of the executions waiting for their reply
+        self._answered = False  # the kernel answered the kernel_info_request
+        self._iopub = False  # IOPub messages are received
+        self._timeout_id = ''
+
+    def is_running(self):
+        return self.session is not None
+
+    def start(self, cmd, env, connection_file):
+        """Launch the kernel with cmd and connect to it through connection_file."""
+        self.close()
+        self.process = process = Popen(cmd, stderr=PIPE, env=env)
+        stderr = []
+        self.widget.tk.createfilehandler(process.stderr, tk.READABLE,
+                                         lambda *args: self._on_stderr(process, stderr))
+        self._connect(connection_file)
+
+    def connect(self, connection_file):
+        """Connect to the existing kernel of connection_file."""
+        self.close()
+        self._connect(connection_file)
+
+    def _connect(self, connection_file):
+        self.connection_file = connection_file
+        self.executions += 1
+        client = jupyter_client.BlockingKernelClient(connection_file=connection_file,
+                                                     context=zmq.Context.instance())
+        client.load_connection_file()
+        self.session = client.session
+        self._sockets = {'shell': client.connect_shell(),
+                         'iopub': client.connect_iopub(),
+                         'control': client.connect_control()}
+        for channel, sock in self._sockets.items():
+            self.widget.tk.createfilehandler(sock.getsockopt(zmq.FD), tk.READABLE,
+                                             lambda *args, c=channel: self._read(c))
+        self._timeout_id = self.widget.after(self.TIMEOUT * 1000, self._on_timeout)
+        self.request('kernel_info_request', {}, self._on_kernel_info)
+
+    def close(self):
+        """Disconnect from the kernel, shut it down if it was started by PyTkEditor."""
+        cancelled = self._pop_executions()
+        self._replies.clear()
+        if self._timeout_id:
+            self.widget.after_cancel(self._timeout_id)
+            self._timeout_id = ''
+        for after_id in self._read_ids.values():
+            self.widget.after_cancel(after_id)
+        self._read_ids.clear()
+        process = self.process
+        self.process = None
+        self.session = None
+        self.ready = False
+        self.executing = False
+        self._answered = False
+        self._iopub = False
+        for sock in self._sockets.values():
+            self.widget.tk.deletefilehandler(sock.getsockopt(zmq.FD))
+            sock.close(linger=0)
+        self._sockets.clear()
+        if process is not None and process.poll() is None:
+            process.terminate()
+        for callback in cancelled:
+            callback(None)
+
+    # --- sockets
+    def _read(self, channel):
+        """Process the messages received on channel."""
+        self._read_ids.pop(channel, None)
+        sock = self._sockets.get(channel)
+        outputs = []
+        for i in range(self.BATCH):
+            if sock is None or sock is not self._sockets.get(channel):  # link closed
+                return
+            if not sock.getsockopt(zmq.EVENTS) & zmq.POLLIN:
+                break
+            try:
+                idents, msg = self.session.recv(sock, mode=zmq.NOBLOCK)
+            except Exception:  # e.g. invalid signature
+                logging.exception('Invalid message from the Jupyter kernel')
+                continue
+            if msg is None:
+                break
+            if channel == 'iopub':
+                outputs.append(msg)
+                continue
+            try:
+                self._on_reply(msg)
+            except Exception:
+                logging.exception('Error while processing the Jupyter message %s',
+                                  msg['msg_type'])
+        else:
+            # the file descriptor will not signal the remaining messages
+            self._schedule_read(channel)
+        if outputs:
+            self._on_iopub(outputs)
+
+    def _schedule_read(self, channel):
+        if channel not in self._read_ids:
+            self._read_ids[channel] = self.widget.after_idle(self._read, channel)
+
+    def _send(self, channel, msg_type, content):
+        msg = self.session.send(self._sockets[channel], msg_type, content)
+        # sending may consume the event signaling received messages
+        self._schedule_read(channel)
+        return msg['header']['msg_id']
+
+    def request(self, msg_type, content, callback=None):
+        """Send a request on the shell channel, callback is called with the reply."""
+        msg_id = self._send('shell', msg_type, content)
+        if callback is not None:
+            self._replies[msg_id] = callback
+        return msg_id
+
+    def _on_reply(self, msg):
+        msg_id = msg['parent_header'].get('msg_id')
+        self._execute_ids.discard(msg_id)
+        callback = self._replies.pop(msg_id, None)
+        if callback is not None:
+            callback(msg)
+
+    def _on_iopub(self, messages):
+        for msg in messages:
+            if (msg['msg_type'] == 'status'
+                    and msg['parent_header'].get('msg_type') == 'execute_request'):
+                self.executing = msg['content']['execution_state'] != 'idle'
+                if self.executing:
+                    self.executions += 1
+        try:
+            self.on_output(messages)
+        except Exception:
+            logging.exception('Error while displaying the Jupyter outputs')
+        if not self._iopub:
+            self._iopub = True
+            self._check_ready()
+
+    # --- readiness
+    def _on_kernel_info(self, msg):
+        self._answered = True
+        if not self._iopub:
+            # the subscription was not active yet when the kernel published the
+            # status of the request: ask again to check that IOPub works
+            self.widget.after(100, lambda: self.session is not None and self.request(
+                'kernel_info_request', {}, self._on_kernel_info))
+        self._check_ready()
+
+    def _check_ready(self):
+        if self.ready or not (self._answered and self._iopub):
+            return
+        self.ready = True
+        self.widget.after_cancel(self._timeout_id)
+        self._timeout_id = ''
+        self._flush()
+
+    def _on_timeout(self):
+        self._timeout_id = ''
+        if self.ready or self.session is None:
+            return
+        cancelled = self._pop_executions()
+        self.on_error('The Jupyter kernel did not answer.',
+                      f'No answer from the kernel after {self.TIMEOUT} s.')
+        for callback in cancelled:
+            callback(None)
+
+    def _on_stderr(self, process, chunks):
+        """Collect the errors of the kernel, report its failure when it exits."""
+        data = os.read(process.stderr.fileno(), 65536)
+        if data:
+            chunks.append(data)
+            return
+        self.widget.tk.deletefilehandler(process.stderr)
+        process.stderr.close()
+        returncode = process.wait()
+        if process is not self.process:  # closed by PyTkEditor
+            return
+        err = b''.join(chunks).decode(errors='replace')
+        if err:
+            logging.error(err)
+        self.close()
+        if returncode:
+            self.on_error('Error in the Jupyter kernel.', err)
+
+    # --- execution
+    def _pop_executions(self):
+        """Remove the queued and sent executions, return their callbacks."""
+        callbacks = [callback for code, callback in self._queue]
+        callbacks.extend(self._replies.pop(msg_id, None) for msg_id in self._execute_ids)
+        self._queue.clear()
+        self._execute_ids.clear()
+        return [callback for callback in callbacks if callback is not None]
+
+    def _flush(self):
+        pending = self._queue[:]
+        self._queue.clear()
+        for code, callback in pending:
+            self.execute(code, callback)
+
+    def execute(self, code, callback=None):
+        """
+        Execute code in the kernel, or queue it if the kernel is not ready yet.
+
+        callback is called with the execute_reply, or with None if the link
+        is closed or the kernel does not answer before.
+        """
+        if not self.ready:
+            self._queue.append((code, callback))
+            return
+        msg_id = self.request('execute_request',
+                              {'code': code, 'silent': False, 'store_history': True,
+                               'user_expressions': {}, 'allow_stdin': False,
+                               'stop_on_error': True},
+                              callback)
+        self._execute_ids.add(msg_id)
+
+    def interrupt(self):
+        """Interrupt the code running in the kernel."""
+        if self.process is not None and self.process.poll() is None:
+            self.process.send_signal(signal.SIGINT)
+        elif self.session is not None:
+            self._send('control', 'interrupt_request', {})
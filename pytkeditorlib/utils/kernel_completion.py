@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Completions and call signatures from the Jupyter kernel
+
+jedi only knows the objects defined in the file, the kernel also knows the
+ones created by the executed code. The complete_request and inspect_request
+are asynchronous (see utils/jupyter_link.py): the callback is called with
+the answer, or with None if the kernel does not answer within the latency
+budget (e.g. because it is running code), so typing is never delayed more
+than that. Late answers are only cached.
+
+The answers are cached by code prefix until the kernel executes code. The
+completions of a prefix extended by identifier characters are filtered from
+the cached completions of the prefix.
+"""
+import re
+from collections import OrderedDict
+
+from .constants import ANSI_REGEXP
+
+RE_WORD = re.compile(r'\w*$')
+RE_FIELD = re.compile(r'[A-Z][\w ]*:')  # field of the inspect_request answer
+SIGNATURES = ('Signature:', 'Init signature:', 'Call signature:')
+_MISSING = object()
+
+
+class KernelCompleter:
+    """Completion backend querying the Jupyter kernel."""
+
+    BUDGET = 300  # maximum time (ms) to wait for an answer
+    CACHE_SIZE = 256
+
+    def __init__(self, link):
+        """Create the completer using the JupyterLink link."""
+        self.link = link
+        self._cache = OrderedDict()  # (kind, code): answer
+        self._executions = link.executions  # kernel state the cache corresponds to
+        self._pending = {}  # kind: (msg_id, after id) of the request waiting for its answer
+
+    @property
+    def available(self):
+        """Whether the kernel can answer now."""
+        return self.link.ready and not self.link.executing
+
+    # --- cache
+    def _check_cache(self):
+        if self._executions != self.link.executions:  # the namespace may have changed
+            self._executions = self.link.executions
+            self._cache.clear()
+
+    def _get(self, key):
+        value = self._cache.get(key, _MISSING)
+        if value is not _MISSING:
+            self._cache.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def _cached_completions(self, code):
+        matches = self._get(('complete', code))
+        if matches is not _MISSING:
+            return matches
+        word = RE_WORD.search(code).group()
+        for i in range(1, len(word) + 1):
+            matches = self._get(('complete', code[:-i]))
+            if matches is not _MISSING:
+                extra = code[-i:]
+                return [(name, complete[i:]) for name, complete in matches
+                        if complete.startswith(extra) and len(complete) > i]
+        return None
+
+    # --- requests
+    def _cancel(self, kind):
+        msg_id, after_id = self._pending.pop(kind, (None, ''))
+        if after_id:
+            self.link.widget.after_cancel(after_id)
+
+    def _abandon(self, kind, msg_id, callback):
+        if self._pending.get(kind, (None,))[0] == msg_id:
+            del self._pending[kind]
+            callback(None)
+
+    def _request(self, kind, msg_type, content, key, callback, parse):
+        """Send the request, only the last request of each kind is answered."""
+        self._cancel(kind)
+        executions = self._executions
+
+        def on_reply(msg):
+            value = parse(key[1], msg['content'])
+            if executions == self.link.executions:
+                self._store(key, value)
+            if self._pending.get(kind, (None,))[0] == msg_id:
+                self._cancel(kind)
+                callback(value)
+
+        msg_id = self.link.request(msg_type, content, on_reply)
+        after_id = self.link.widget.after(self.BUDGET,
+                                          lambda: self._abandon(kind, msg_id, callback))
+        self._pending[kind] = msg_id, after_id
+
+    def complete(self, code, callback):
+        """
+        Get the completions of the end of code.
+
+        callback is called with [(name, complete), ...], complete being the
+        text to insert, or None if the kernel did not answer.
+        """
+        self._check_cache()
+        matches = self._cached_completions(code)
+        if matches is not None:
+            callback(matches)
+        elif self.available:
+            self._request('complete', 'complete_request',
+                          {'code': code, 'cursor_pos': len(code)},
+                          ('complete', code), callback, self._parse_completions)
+        else:
+            callback(None)
+
+    def signature(self, code, callback):
+        """
+        Get the call signature of the object at the end of code.
+
+        callback is called with the signature, or None if it is unknown.
+        """
+        self._check_cache()
+        sig = self._get(('signature', code))
+        if sig is not _MISSING:
+            callback(sig)
+        elif self.available:
+            self._request('signature', 'inspect_request',
+                          {'code': code, 'cursor_pos': len(code), 'detail_level': 0},
+                          ('signature', code), callback, self._parse_signature)
+        else:
+            callback(None)
+
+    @staticmethod
+    def _parse_completions(code, content):
+        if content.get('status') != 'ok':
+            return []
+        typed = code[content['cursor_start']:content['cursor_end']]
+        word = RE_WORD.search(code).group()
+        completions = {}
+        for match in content['matches']:
+            if match.startswith(typed) and len(match) > len(typed):
+                complete = match[len(typed):]
+                completions[word + complete] = complete
+        return list(completions.items())
+
+    @staticmethod
+    def _parse_signature(code, content):
+        if content.get('status') != 'ok' or not content.get('found'):
+            return None
+        text = ANSI_REGEXP.sub('', content['data'].get('text/plain', ''))
+        lines = text.splitlines()
+        for i, line in enumerate(lines):
+            if line.startswith(SIGNATURES):
+                # long signatures are split on the next lines, until the next field
+                sig = [line.split(':', 1)[1].strip()]
+                for line in lines[i + 1:]:
+                    if RE_FIELD.match(line):
+                        break
+                    sig.append(line.strip())
+                sig = ' '.join(sig).replace('( ', '(').replace(' )', ')').replace(',)', ')')
+                return sig.strip() or None
+        return None
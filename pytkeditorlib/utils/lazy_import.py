@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Deferred import of the modules that are not needed to display the main window
+"""
+import importlib
+import logging
+import threading
+
+_LAZY_MODULES = []
+
+
+class LazyModule:
+    """Module proxy importing the module the first time one of its attributes is accessed."""
+
+    def __init__(self, name, setup=None):
+        """
+        Create the proxy of module name.
+
+        setup(module) is called once the module is imported.
+        """
+        self._name = name
+        self._setup = setup
+        self._module = None
+        self._lock = threading.Lock()
+        _LAZY_MODULES.append(self)
+
+    def __repr__(self):
+        return f"<LazyModule {self._name!r}{' (loaded)' if self._module else ''}>"
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def load(self):
+        """Import the module if needed and return it."""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    module = importlib.import_module(self._name)
+                    if self._setup is not None:
+                        self._setup(module)
+                    self._module = module
+        return self._module
+
+
+def warm_up(*names):
+    """
+    Import the deferred modules in a background thread.
+
+    names are the names of extra modules to import.
+    """
+
+    def run():
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                logging.info('Failed to import %s: %s', name, e)
+        for module in list(_LAZY_MODULES):
+            try:
+                module.load()
+            except Exception as e:
+                logging.info('Failed to import %s: %s', module._name, e)
+
+    threading.Thread(target=run, name='WarmUp', daemon=True).start()
+
+
+def _setup_jedi(jedi):
+    jedi.settings.case_insensitive_completion = False
+
+
+# --- deferred modules
+jedi = LazyModule('jedi', _setup_jedi)
+pdfkit = LazyModule('pdfkit')
+cups = LazyModule('cups')
+jupyter_client = LazyModule('jupyter_client')
+jupyter_paths = LazyModule('jupyter_core.paths')
+zmq = LazyModule('zmq')
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Summaries of the console namespace for the variable explorer
+
+A summary is a dict with the keys:
+
+    name, type, size (len), shape, dtype, memory (bytes), preview (short repr)
+    and expandable (whether the object has items to display)
+
+This module is imported by the console process, so it must only depend on
+the standard library: numpy and pandas objects are recognized without
+importing these modules. Only the displayed items are read, array rows are
+views and previews are built from a few elements.
+"""
+import reprlib
+import sys
+import types
+from itertools import islice
+
+# objects not displayed in the explorer
+EXCLUDED_TYPES = (types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                  types.MethodType, type)
+# modules of the types whose repr is cheap enough to be used as preview
+REPR_MODULES = {'builtins', 'collections', 'datetime', 'decimal', 'fractions',
+                'pathlib', 'numpy'}
+SEQUENCES = (list, tuple)
+
+
+def _is_instance(obj, module, name):
+    """Check whether obj is an instance of module.name, without importing module."""
+    mod = sys.modules.get(module)
+    return mod is not None and isinstance(obj, getattr(mod, name))
+
+
+def is_array(obj):
+    return _is_instance(obj, 'numpy', 'ndarray')
+
+
+def is_dataframe(obj):
+    return _is_instance(obj, 'pandas', 'DataFrame')
+
+
+def is_series(obj):
+    return _is_instance(obj, 'pandas', 'Series')
+
+
+class PreviewRepr(reprlib.Repr):
+    """Short repr of the objects, reading only a few items of containers."""
+
+    def __init__(self):
+        reprlib.Repr.__init__(self)
+        self.maxlevel = 2
+        self.maxstring = 60
+        self.maxother = 60
+        self.maxlist = self.maxtuple = self.maxset = self.maxfrozenset = 6
+        self.maxdeque = self.maxdict = 6
+
+    def repr_ndarray(self, obj, level):
+        items = obj.flat[:self.maxlist + 1].tolist()
+        txt = ', '.join(self.repr1(x, level - 1) for x in items[:self.maxlist])
+        if len(items) > self.maxlist:
+            txt += ', ...'
+        return f'[{txt}]'
+
+    def repr_DataFrame(self, obj, level):
+        columns = [str(c) for c in obj.columns[:self.maxlist + 1]]
+        txt = ', '.join(columns[:self.maxlist])
+        if len(columns) > self.maxlist:
+            txt += ', ...'
+        return f'columns: {txt}'
+
+    def repr_Series(self, obj, level):
+        return self.repr_ndarray(obj.values[:self.maxlist + 1], level)
+
+    # containers of the builtins: only the displayed items are read, without sorting
+    def repr_dict(self, obj, level):
+        if not obj:
+            return '{}'
+        if level <= 0:
+            return '{...}'
+        pieces = [f'{self.repr1(k, level - 1)}: {self.repr1(v, level - 1)}'
+                  for k, v in islice(obj.items(), self.maxdict)]
+        if len(obj) > self.maxdict:
+            pieces.append('...')
+        return '{%s}' % ', '.join(pieces)
+
+    def repr_set(self, obj, level):
+        if not obj:
+            return 'set()'
+        return self._repr_iterable(obj, level, '{', '}', self.maxset)
+
+    def repr_frozenset(self, obj, level):
+        if not obj:
+            return 'frozenset()'
+        return self._repr_iterable(obj, level, 'frozenset({', '})', self.maxfrozenset)
+
+    def repr_bytes(self, obj, level):
+        txt = repr(bytes(obj[:self.maxstring]))
+        return txt + '...' if len(obj) > self.maxstring else txt
+
+    def repr_bytearray(self, obj, level):
+        return f'bytearray({self.repr_bytes(obj, level)})'
+
+    def repr_range(self, obj, level):
+        return repr(obj)
+
+    def repr_int(self, obj, level):
+        if obj.bit_length() > 4 * self.maxother:  # the conversion to decimal is quadratic
+            return '<int object>'
+        return reprlib.Repr.repr_int(self, obj, level)
+
+    def repr_instance(self, obj, level):
+        name = type(obj).__name__
+        if type(obj).__module__.split('.')[0] not in REPR_MODULES:
+            return f'<{name} object>'
+        if is_array(obj):
+            return self.repr_ndarray(obj, level)
+        for base in (dict, set, frozenset, bytes, bytearray):
+            if isinstance(obj, base):  # e.g. OrderedDict, Counter
+                return f'{name}({getattr(self, "repr_" + base.__name__)(obj, level)})'
+        if hasattr(obj, '__len__'):  # container whose repr would read all the items
+            return f'<{name} object>'
+        return reprlib.Repr.repr_instance(self, obj, level)
+
+
+_repr = PreviewRepr()
+
+
+def summary(name, obj):
+    """Return the summary of obj, displayed as name."""
+    summ = {'name': name, 'type': type(obj).__name__, 'size': None, 'shape': None,
+            'dtype': None, 'memory': None, 'preview': '', 'expandable': False}
+    try:
+        if is_array(obj) or is_dataframe(obj) or is_series(obj):
+            summ['shape'] = list(obj.shape)
+            summ['size'] = len(obj) if obj.ndim else None
+            if is_dataframe(obj):
+                summ['memory'] = int(obj.memory_usage(index=True, deep=False).sum())
+                dtypes = {str(dt) for dt in obj.dtypes}
+                summ['dtype'] = dtypes.pop() if len(dtypes) == 1 else 'mixed'
+            else:
+                summ['memory'] = int(obj.nbytes)
+                summ['dtype'] = str(obj.dtype)
+            summ['expandable'] = bool(summ['size'])
+        else:
+            summ['memory'] = sys.getsizeof(obj)
+            if isinstance(obj, (str, bytes, bytearray)):
+                summ['size'] = len(obj)
+            elif hasattr(obj, '__len__'):
+                summ['size'] = len(obj)
+                summ['expandable'] = summ['size'] > 0 and hasattr(obj, '__iter__')
+            elif type(obj).__module__ != 'builtins':
+                summ['expandable'] = bool(getattr(obj, '__dict__', None))
+        summ['preview'] = _repr.repr(obj)
+    except Exception as e:  # broken __len__, __repr__, ...
+        summ['preview'] = f'<error: {e!r}>'
+    return summ
+
+
+def children(obj, start, count):
+    """Return (total, [(label, item), ...]) for the items start to start + count of obj."""
+    if is_array(obj):
+        total = len(obj)
+        return total, [(f'[{i}]', obj[i]) for i in range(start, min(start + count, total))]
+    if is_dataframe(obj) or is_series(obj):
+        total = len(obj)
+        index = obj.index[start:start + count]
+        return total, [(str(label), obj.iloc[i]) for i, label in enumerate(index, start)]
+    if isinstance(obj, dict):
+        return len(obj), [(_repr.repr(k), v) for k, v in islice(obj.items(), start, start + count)]
+    if isinstance(obj, SEQUENCES):
+        total = len(obj)
+        return total, [(f'[{i}]', obj[i]) for i in range(start, min(start + count, total))]
+    if hasattr(obj, '__len__') and hasattr(obj, '__iter__'):  # sets, deques, ...
+        return len(obj), [(f'[{i}]', x) for i, x in enumerate(islice(obj, start, start + count), start)]
+    attrs = getattr(obj, '__dict__', {})
+    return len(attrs), list(islice(attrs.items(), start, start + count))
+
+
+def resolve(namespace, name, path):
+    """Return the object reached from namespace[name] by following the item positions in path."""
+    obj = namespace[name]
+    for pos in path:
+        total, items = children(obj, pos, 1)
+        if not items:
+            raise KeyError(f'{name}: item {pos} does not exist anymore')
+        obj = items[0][1]
+    return obj
+
+
+class NamespaceWatcher:
+    """Compute the changes of the namespace since the last call."""
+
+    def __init__(self, hidden=()):
+        self.hidden = set(hidden)  # names never displayed
+        self._sent = {}  # name: last sent summary
+
+    def reset(self):
+        self._sent.clear()
+
+    def diff(self, namespace):
+        """Return (changed summaries, removed names)."""
+        current = {}
+        changed = []
+        for name, obj in list(namespace.items()):
+            if name.startswith('_') or name in self.hidden or isinstance(obj, EXCLUDED_TYPES):
+                continue
+            summ = summary(name, obj)
+            current[name] = summ
+            if self._sent.get(name) != summ:
+                changed.append(summ)
+        removed = [name for name in self._sent if name not in current]
+        self._sent = current
+        return changed, removed
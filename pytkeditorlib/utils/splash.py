@@ -34,7 +34,7 @@ class Splash(Tk):
             self.attributes('-type', 'splash')
         except TclError:
             self.overrideredirect(True)
-        x1, y1, x2, y2 = get_screen(*self.winfo_pointerxy())
+        x1, y1, x2, y2 = get_screen(*self.winfo_pointerxy(), self)
         x = (x1 + x2)//2
         y = (y1 + y2)//2
         self.geometry(f'+{x - 233}+{y - 144}')
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Startup phases timing
+
+This module must stay importable without importing the rest of PyTkEditor
+so that the import of the library itself can be timed.
+"""
+import json
+import os
+from contextlib import contextmanager
+from time import perf_counter
+
+T0 = perf_counter()  # time origin
+
+_spans = []  # recorded spans: (name, start, duration, depth)
+_stack = []  # opened spans: [name, start, is_phase]
+
+
+def now():
+    """Return time elapsed since the time origin in seconds."""
+    return perf_counter() - T0
+
+
+def record(name, start, end, depth=None):
+    """Record span name from start to end (relative times)."""
+    if depth is None:
+        depth = len(_stack)
+    _spans.append((name, start, end - start, depth))
+
+
+def begin(name, phase=False):
+    """Open span name."""
+    _stack.append([name, now(), phase])
+
+
+def end():
+    """Close the last opened span."""
+    name, start, phase = _stack.pop()
+    record(name, start, now())
+
+
+def phase(name=None):
+    """
+    End the current phase and start phase name (if not None).
+
+    Phases are spans that are closed by the next phase, so that successive
+    steps of a function can be timed without nesting them in with blocks.
+    """
+    if _stack and _stack[-1][2]:
+        end()
+    if name is not None:
+        begin(name, True)
+
+
+@contextmanager
+def span(name):
+    """Time the content of the with block."""
+    begin(name)
+    depth = len(_stack)
+    try:
+        yield
+    finally:
+        # close the phases left open inside the block
+        while len(_stack) > depth:
+            end()
+        end()
+
+
+def get_spans():
+    """Return the recorded spans, sorted by start time, parents first."""
+    return sorted(_spans, key=lambda s: (s[1], s[3]))
+
+
+def to_chrome_trace():
+    """Return the spans in Chrome trace event format."""
+    pid = os.getpid()
+    events = [{'name': name, 'cat': 'startup', 'ph': 'X', 'pid': pid, 'tid': 1,
+               'ts': round(start * 1e6), 'dur': round(duration * 1e6)}
+              for name, start, duration, depth in get_spans()]
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def dump(path):
+    """Save the spans in path as a Chrome trace (JSON)."""
+    with open(path, 'w') as file:
+        json.dump(to_chrome_trace(), file, indent=1)
@@ -23,4 +23,6 @@ from .help import Help
 from .history import HistoryFrame
 from .textconsole import ConsoleFrame
 from .codestructure import CodeStructure
+from .variables import VariableExplorer
+from .jupyter_output import JupyterOutput
 from .base_widget import WidgetNotebook
@@ -19,6 +19,8 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 Base widgets
 """
+import re
+from bisect import bisect_left
 from tkinter import BooleanVar, Text, TclError
 from tkinter.ttk import Frame
 
@@ -77,6 +79,7 @@ class RichText(Text):
         Text.__init__(self, master, **kw)
 
         self._syntax_highlighting_tags = []
+        self._ansi_tags = set()  # tags of the 256 and true colors
         self.update_style()
         self._autoclose = {'(': ')', '[': ']', '{': '}', '"': '"', "'": "'"}
 
@@ -139,9 +142,36 @@ class RichText(Text):
             self.tag_configure('background ' + c, background=c)
         self.tag_configure('bold', font=FONT + ('bold',))
         self.tag_configure('italic', font=FONT + ('italic',))
+        self.tag_configure('bold italic', font=FONT + ('bold', 'italic'))
+        for tag in self._ansi_tags:
+            self._configure_ansi_tag(tag)
 
         self.tag_raise('sel')
 
+    def insert_ansi(self, index, text, tag, tag_ranges):
+        """Insert text at index and apply the ANSI format tag_ranges."""
+        line, col = map(int, self.index(index).split('.'))
+        self.insert(index, text, tag)
+        if not tag_ranges:
+            return
+        newlines = [m.start() for m in re.finditer('\n', text)]
+
+        def to_index(offset):
+            i = bisect_left(newlines, offset)  # nb of newlines before offset
+            if i == 0:
+                return f'{line}.{col + offset}'
+            return f'{line + i}.{offset - newlines[i - 1] - 1}'
+
+        for t, ranges in tag_ranges.items():
+            if t not in self._ansi_tags and '#' in t:
+                self._configure_ansi_tag(t)
+            self.tag_add(t, *map(to_index, ranges))
+
+    def _configure_ansi_tag(self, tag):
+        option, color = tag.split(' ', 1)
+        self.tag_configure(tag, **{option: color})
+        self._ansi_tags.add(tag)
+
     def _clear_highlight(self, event=None):
         self.tag_remove('matching_brackets', '1.0', 'end')
         self.tag_remove('unmatched_bracket', '1.0', 'end')
@@ -32,7 +32,7 @@ from .base_widget import BaseWidget
 
 
 class Filebrowser(BaseWidget):
-    def __init__(self, master, callback, **kw):
+    def __init__(self, master, callback, watcher=None, **kw):
         BaseWidget.__init__(self, master, 'File browser', padding=2, **kw)
         self.rowconfigure(1, weight=1)
         self.columnconfigure(0, weight=1)
@@ -40,6 +40,9 @@ class Filebrowser(BaseWidget):
         self.history = []
         self.history_index = -1
 
+        self.watcher = watcher
+        self._watched = set()  # folders whose content is watched
+
         self.load_filters()
         # --- browsing buttons
         frame_btn = ttk.Frame(self)
@@ -75,6 +78,7 @@ class Filebrowser(BaseWidget):
         self.filetree.tag_bind('file', '<Double-1>', self._on_db_click_file)
         self.filetree.tag_bind('folder', '<Double-1>', self._on_db_click_folder)
         self.filetree.tag_bind('folder', '<<TreeviewOpen>>', self._on_folder_open)
+        self.filetree.tag_bind('folder', '<<TreeviewClose>>', self._on_folder_close)
 
         self.filetree.bind('<1>', self._on_click)
 
@@ -162,8 +166,48 @@ class Filebrowser(BaseWidget):
             self.b_forward.state(['disabled'])
 
     def clear(self, event=None):
+        self._unwatch_all()
         self.filetree.delete(*self.filetree.get_children())
 
+    # --- watch folders
+    def _watch(self, path):
+        if self.watcher is not None and path not in self._watched:
+            self._watched.add(path)
+            self.watcher.watch(path, folder=True)
+
+    def _unwatch(self, path):
+        if path in self._watched:
+            self._watched.remove(path)
+            self.watcher.unwatch(path, folder=True)
+
+    def _unwatch_all(self):
+        for path in list(self._watched):
+            self._unwatch(path)
+
+    def _get_opened_folders(self, item):
+        """Return the opened subfolders of item, parents first."""
+        opened = []
+        for child in self.filetree.get_children(item):
+            if self.filetree.item(child, 'open'):
+                opened.append(child)
+                opened.extend(self._get_opened_folders(child))
+        return opened
+
+    def refresh(self, path):
+        """Update the content of folder path, opened subfolders stay opened."""
+        if not self.filetree.exists(path):
+            return
+        opened = self._get_opened_folders(path)
+        self.filetree.delete(*self.filetree.get_children(path))
+        self._lazy_populate(path)
+        for item in opened:
+            if self.filetree.exists(item):
+                self.filetree.delete(*self.filetree.get_children(item))
+                self._lazy_populate(item)
+                self.filetree.item(item, open=True)
+            else:
+                self._unwatch(item)
+
     @staticmethod
     def _key_sort_files(item):
         return item.is_file(), item.name.lower()
@@ -173,6 +217,14 @@ class Filebrowser(BaseWidget):
         item = self.filetree.focus()
         self.filetree.delete(*self.filetree.get_children(item))
         self._lazy_populate(item)
+        self._watch(item)
+
+    def _on_folder_close(self, event):
+        """Stop watching folder and its subfolders when closed by user."""
+        item = self.filetree.focus()
+        self._unwatch(item)
+        for folder in self._get_opened_folders(item):
+            self._unwatch(folder)
 
     def _lazy_populate(self, path):
         """
@@ -202,11 +254,12 @@ class Filebrowser(BaseWidget):
         self._sx.timer = self._sx.threshold + 1
         self._sy.timer = self._sy.threshold + 1
 
-        self.filetree.delete(*self.filetree.get_children())
+        self.clear()
         p = os.path.abspath(path)
         self.filetree.insert('', 0, p, text=p, image='img_folder', open=True)
 
         self._lazy_populate(p)
+        self._watch(p)
 
         self.configure(cursor='')
         if reset:
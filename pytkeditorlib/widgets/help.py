@@ -76,13 +76,24 @@ class Help(BaseWidget):
         ttk.Label(top_bar, text='Object').pack(side='left', padx=4, pady=4)
         self.entry.pack(side='left', padx=4, pady=4, fill='x', expand=True)
 
-        self.html = HtmlFrame(self)
+        self._html = None  # created when first needed to defer Tkhtml loading
         self.update_style()
         self._source.set('Console')
 
         # --- placement
         top_bar.pack(fill='x')
-        self.html.pack(fill='both', expand=True)
+        self.bind('<Map>', lambda e: self.html, True)
+
+    @property
+    def html(self):
+        if self._html is None:
+            self._html = HtmlFrame(self)
+            self._html.pack(fill='both', expand=True)
+            try:
+                self._html.set_style(self.stylesheet)
+            except tk.TclError:
+                pass
+        return self._html
 
     def focus_set(self):
         self.entry.focus_set()
@@ -90,8 +101,10 @@ class Help(BaseWidget):
     def update_style(self):
         with open(CSS_PATH.format(theme=CONFIG.get('General', 'theme'))) as f:
             self.stylesheet = f.read()
+        if self._html is None:
+            return
         try:
-            self.html.set_style(self.stylesheet)
+            self._html.set_style(self.stylesheet)
         except tk.TclError:
             pass
 
@@ -22,46 +22,57 @@ Console history with text display
 """
 import tkinter as tk
 from tkinter import ttk
-import pickle
+from bisect import bisect_right
 
 from pygments import lex
 from pygments.lexers import Python3Lexer
 
-from pytkeditorlib.utils.constants import CONFIG, HISTFILE
+from pytkeditorlib.utils.constants import CONFIG, HISTFILE, LEGACY_HISTFILE
+from pytkeditorlib.utils.history_store import HistoryStore, format_stats
 from pytkeditorlib.gui_utils import AutoHideScrollbar
 from pytkeditorlib.dialogs import showinfo
 from .base_widget import BaseWidget, RichText
 
 
 class History(RichText):
-    """Python console command history."""
+    """
+    Python console command history.
+
+    The text is only inserted once the widget is mapped and the syntax
+    highlighting is done by chunks of entries as they scroll into view.
+    """
+
+    CHUNK = 50  # number of entries highlighted at once
 
     def __init__(self, master=None, histfile=HISTFILE, current_session=False, **kw):
         """ Crée un historique vide """
         kw.setdefault('width', 1)
-        RichText.__init__(self, master, **kw)
+        self._yscrollcommand = kw.pop('yscrollcommand', None)
+        RichText.__init__(self, master, yscrollcommand=self._on_yscroll, **kw)
 
         self.histfile = histfile
         self.maxsize = CONFIG.getint('History', 'max_size', fallback=10000)
-        self.history = []
         self.current_session = current_session
 
+        self._starts = []  # first line of each displayed entry
+        self._offset = 0  # position in history of the first displayed entry
+        self._lexed = set()  # highlighted chunks
+        self._populated = False
+        self._highlight_id = ''
+        self._index_id = ''
+
         # --- bindings
         self.bind('<1>', lambda e: self.focus_set())
         self.bind('<Control-a>', self.select_all)
+        self.bind('<Map>', self._on_map)
 
         # --- load previous session history
-        try:
-            with open(histfile, 'rb') as file:
-                dp = pickle.Unpickler(file)
-                self.history = dp.load()
-            self._session_start = len(self.history)
-        except (FileNotFoundError, pickle.UnpicklingError, EOFError):
-            self._session_start = 0
+        self.history = HistoryStore(histfile, self.maxsize, LEGACY_HISTFILE)
         self.reset_text(init=True)
+        self._index_id = self.after(1000, self._index_history)
 
     def new_session(self):
-        self._session_start = len(self.history)
+        self.history.new_session()
 
     def select_all(self, event):
         self.tag_add('sel', '1.0', 'end')
@@ -70,68 +81,157 @@ class History(RichText):
     def update_style(self):
         RichText.update_style(self)
         self.maxsize = CONFIG.getint('History', 'max_size', fallback=10000)
+        self.history.maxsize = self.maxsize
+
+    # --- lazy display
+    def _on_map(self, event):
+        if not self._populated:
+            self._populate()
+
+    def _on_yscroll(self, first, last):
+        if self._yscrollcommand is not None:
+            self._yscrollcommand(first, last)
+        if not self._highlight_id:
+            self._highlight_id = self.after_idle(self._highlight_visible)
+
+    def _populate(self):
+        """Insert the displayed entries in the text, without highlighting."""
+        self._offset = len(self.history) - len(self.history.get_session_hist()) if self.current_session else 0
+        entries = [self._entry_text(pos) for pos in range(self._offset, len(self.history))]
+        self._starts.clear()
+        line = 1
+        for txt in entries:
+            self._starts.append(line)
+            line += txt.count('\n')
+        self._lexed.clear()
+        self.configure(state='normal')
+        self.delete('1.0', 'end')
+        self.insert('1.0', ''.join(entries))
+        self.configure(state='disabled')
+        self._populated = True
+        self.see('end')
 
-    def parse(self, start='1.0'):
-        data = self.get(start, 'end')
-        while data and '\n' == data[0]:
-            start = self.index('%s+1c' % start)
-            data = data[1:]
-        self.mark_set('range_start', start)
+    def _entry_text(self, pos):
+        """Return the displayed text of the history item at pos."""
+        stats = self.history.stats.get(pos)
+        if stats:
+            return f'{self.history[pos]}  # {format_stats(stats)}\n'
+        return self.history[pos] + '\n'
+
+    def _entry_range(self, i, j):
+        """Return the text range of the displayed entries i to j (excluded)."""
+        return f'{self._starts[i]}.0', f'{self._starts[j]}.0' if j < len(self._starts) else 'end-1c'
+
+    def _highlight_visible(self):
+        self._highlight_id = ''
+        if not self._starts:
+            return
+        first = int(self.index('@0,0').split('.')[0])
+        last = int(self.index(f'@0,{self.winfo_height()}').split('.')[0])
+        start = max(bisect_right(self._starts, first) - 1, 0) // self.CHUNK
+        end = (bisect_right(self._starts, last) - 1) // self.CHUNK
+        for chunk in range(start, end + 1):
+            if chunk not in self._lexed:
+                self._lexed.add(chunk)
+                self._highlight(chunk * self.CHUNK, min((chunk + 1) * self.CHUNK, len(self._starts)))
+
+    def _highlight(self, i, j):
+        """Highlight the displayed entries i to j (excluded)."""
+        start, end = self._entry_range(i, j)
         for t in self._syntax_highlighting_tags:
-            self.tag_remove(t, start, "range_start +%ic" % len(data))
-        for token, content in lex(data, Python3Lexer()):
-            self.mark_set("range_end", "range_start + %ic" % len(content))
+            self.tag_remove(t, start, end)
+        line, col = self._starts[i], 0
+        ranges = {}
+        for token, content in lex(self.get(start, end), Python3Lexer()):
+            nb_lines = content.count('\n')
+            if nb_lines:
+                end_line, end_col = line + nb_lines, len(content) - content.rfind('\n') - 1
+            else:
+                end_line, end_col = line, col + len(content)
+            r = ranges.setdefault(str(token), [])
+            r.append(f'{line}.{col}')
+            r.append(f'{end_line}.{end_col}')
+            line, col = end_line, end_col
+        for token, r in ranges.items():
             for t in token.split():
-                self.tag_add(str(t), "range_start", "range_end")
-            self.mark_set("range_start", "range_end")
+                self.tag_add(t, *r)
+
+    def _index_history(self):
+        """Build the search index progressively."""
+        if self.history.index_step():
+            self._index_id = self.after(10, self._index_history)
+        else:
+            self._index_id = ''
+
+    def _entry_lines(self, i):
+        """Return the number of lines of the displayed entry i."""
+        if i + 1 < len(self._starts):
+            return self._starts[i + 1] - self._starts[i]
+        return int(self.index('end-1c').split('.')[0]) - self._starts[i]
+
+    def _shift(self, i, delta):
+        """Shift the first line of the entries following entry i by delta."""
+        starts = self._starts
+        for k in range(i + 1, len(starts)):
+            starts[k] += delta
 
+    # --- edition
     def save(self):
-        try:
-            with open(self.histfile, 'rb') as file:
-                dp = pickle.Unpickler(file)
-                prev = dp.load()
-        except (FileNotFoundError, pickle.UnpicklingError, EOFError):
-            prev = []
-        with open(self.histfile, 'wb') as file:
-            pick = pickle.Pickler(file)
-            hist = prev + self.history[self._session_start:]
-            l = len(hist)
-            if l > self.maxsize:
-                hist = hist[l - self.maxsize:]
-            pick.dump(hist)
-
-    def add_history(self, line):
-        self.history.append(line)
+        """Compact the history file, the commands are saved as they are added."""
+        self.history.compact()
+
+    def add_history(self, line, stats=None):
+        self.history.append(line, stats)
+        if not self._populated:
+            return
         index = self.index('end-1c')
+        self._starts.append(int(index.split('.')[0]))
         self.configure(state='normal')
-        self.insert('end', line + '\n')
-        self.parse(index)
+        self.insert('end-1c', self._entry_text(len(self.history) - 1))
+        self._highlight(len(self._starts) - 1, len(self._starts))
         self.configure(state='disabled')
         self.see('end')
 
     def reset_text(self, init=False):
-        if not init:
-            self.winfo_toplevel().busy(True)
-        self.update_idletasks()
-        self.configure(state='normal')
-        self.delete('1.0', 'end')
-        if self.current_session:
-            self.insert('1.0', '\n'.join(self.history[self._session_start:]))
-        else:
-            self.insert('1.0', '\n'.join(self.history))
-        self.parse()
-        self.configure(state='disabled')
-        if not init:
-            self.winfo_toplevel().busy(False)
+        """Display the history again, the text is inserted when the widget is mapped."""
+        self._populated = False
+        if self.winfo_ismapped():
+            self._populate()
 
     def replace_history_item(self, pos, line):
-        self.history[pos] = line
-
-        self.reset_text()
+        self.history.replace(pos, line)
+        if not self._index_id:
+            self._index_id = self.after(10, self._index_history)
+        i = pos - self._offset
+        if not self._populated or i < 0:
+            return
+        start, end = self._entry_range(i, i + 1)
+        delta = line.count('\n') + 1 - self._entry_lines(i)
+        self.configure(state='normal')
+        self.delete(start, end)
+        self.insert(start, self._entry_text(pos))
+        self._shift(i, delta)
+        self._highlight(i, i + 1)
+        self.configure(state='disabled')
 
     def remove_history_item(self, pos):
-        del self.history[pos]
-        self.reset_text()
+        i = pos - self._offset
+        if self._populated and i >= 0:
+            start, end = self._entry_range(i, i + 1)
+            nb_lines = self._entry_lines(i)
+            self.configure(state='normal')
+            self.delete(start, end)
+            self.configure(state='disabled')
+            self._shift(i, -nb_lines)
+            del self._starts[i]
+            # the chunks following the entry changed
+            self._lexed = {c for c in self._lexed if c < i // self.CHUNK}
+            self._on_yscroll(*self.yview())
+        elif i < 0:
+            self._offset -= 1
+        self.history.remove(pos)
+        if not self._index_id:
+            self._index_id = self.after(10, self._index_history)
 
     def get_history_item(self, pos):
         try:
@@ -139,11 +239,23 @@ class History(RichText):
         except IndexError:
             return None
 
+    def find_history_item(self, prefix, pos, backwards=True):
+        """
+        Return the position of the closest item before (or after) pos
+        starting with prefix, None if there is none.
+        """
+        return self.history.find(prefix, pos, backwards)
+
+    def search_history(self, query, limit=50):
+        """Return the items matching query as a list of (item, fuzzy), see HistoryStore.search."""
+        return self.history.search(query, limit)
+
     def get_length(self):
         return len(self.history)
 
     def get_session_hist(self):
-        return self.history[self._session_start:]
+        return self.history.get_session_hist()
+
 
 class HistoryFrame(BaseWidget):
 
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+GUI widget displaying the outputs of the Jupyter kernel
+
+The IOPub messages are displayed as they are received (see
+utils/jupyter_link.py): inputs, streams, results, errors and rich outputs,
+PNG images being embedded and the other outputs displayed as text. Only the
+last lines are kept, like in the console.
+"""
+import tkinter as tk
+
+from pygments import lex
+from pygments.lexers import Python3Lexer
+
+from pytkeditorlib.utils.constants import CONFIG, AnsiParser
+from pytkeditorlib.gui_utils import AutoHideScrollbar
+from .base_widget import BaseWidget, RichText
+
+
+class JupyterOutput(BaseWidget):
+    """Outputs of the code executed in the Jupyter kernel."""
+
+    def __init__(self, master, interrupt, restart, **kw):
+        """
+        Create the output pane.
+
+        interrupt: function interrupting the kernel
+        restart: function restarting the kernel
+        """
+        BaseWidget.__init__(self, master, 'Jupyter', **kw)
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        sy = AutoHideScrollbar(self, orient='vertical')
+        self.text = RichText(self, yscrollcommand=sy.set, relief='flat', borderwidth=0,
+                             highlightthickness=0, wrap='word', state='disabled')
+        sy.configure(command=self.text.yview)
+        sy.grid(row=0, column=1, sticky='ns')
+        self.text.grid(row=0, column=0, sticky='nswe')
+        self.text.mark_set('output_start', '1.0')  # start of the outputs of the last input
+        self.text.mark_gravity('output_start', 'left')
+
+        self._ansi = {}  # stream name: AnsiParser
+        self._images = {}  # embedded image name: PhotoImage
+        self._clear_wait = False  # clear the outputs when the next one is received
+
+        self.text.bind('<1>', lambda e: self.text.focus_set())
+        self.text.bind("<Control-Tab>", self.traversal_next)
+        self.text.bind('<Shift-Control-ISO_Left_Tab>', self.traversal_prev)
+
+        self.menu = tk.Menu(self)
+        self.menu.add_command(label='Clear', command=self.clear)
+        self.menu.add_command(label='Interrupt kernel', command=interrupt)
+        self.menu.add_command(label='Restart kernel', command=restart)
+
+        self.update_style()
+
+    def focus_set(self):
+        self.text.focus_set()
+
+    def update_style(self):
+        self.text.update_style()
+        self.scrollback = CONFIG.getint('Console', 'scrollback', fallback=10000)
+
+    def clear(self):
+        self.text.configure(state='normal')
+        self.text.delete('1.0', 'end')
+        self.text.configure(state='disabled')
+        self._images.clear()
+        self._ansi.clear()
+        self._clear_wait = False
+
+    def info(self, text):
+        """Display an information about the kernel (e.g. restarted)."""
+        self.text.configure(state='normal')
+        self._newline()
+        self.text.insert('end', f'[{text}]\n', 'Token.Comment')
+        self.text.mark_set('output_start', 'end-1c')
+        self.text.configure(state='disabled')
+        self.text.see('end')
+
+    # --- kernel messages
+    def display(self, messages):
+        """Display the list of IOPub messages sent by the kernel."""
+        self.text.configure(state='normal')
+        i = 0
+        while i < len(messages):
+            msg = messages[i]
+            i += 1
+            content = msg['content']
+            if msg['msg_type'] == 'stream':
+                # insert the consecutive outputs of the same stream at once
+                texts = [content['text']]
+                while (i < len(messages) and messages[i]['msg_type'] == 'stream'
+                       and messages[i]['content']['name'] == content['name']):
+                    texts.append(messages[i]['content']['text'])
+                    i += 1
+                self._on_stream(content['name'], ''.join(texts))
+            else:
+                handler = getattr(self, f"_on_{msg['msg_type']}", None)
+                if handler is not None:
+                    handler(content)
+        self._trim()
+        self.text.configure(state='disabled')
+        self.text.see('end')
+
+    def _on_status(self, content):
+        self.busy(content['execution_state'] == 'busy')
+
+    def _on_execute_input(self, content):
+        self._clear_wait = False
+        self._newline()
+        if self.text.compare('end-1c', '>', '1.0'):
+            self.text.insert('end', '\n')
+        self.text.insert('end', f"In [{content['execution_count']}]: ", 'prompt')
+        for token, value in lex(content['code'].rstrip('\n'), Python3Lexer()):
+            self.text.insert('end', value, tuple(str(t) for t in token.split()))
+        self.text.mark_set('output_start', 'end-1c')
+        self._ansi.clear()
+
+    def _on_stream(self, name, text):
+        self._apply_clear_wait()
+        parser = self._ansi.setdefault(name, AnsiParser())
+        text, tag_ranges = parser.feed(text)
+        self._insert(text, 'Token.Error' if name == 'stderr' else 'output', tag_ranges)
+
+    def _on_execute_result(self, content):
+        self._apply_clear_wait()
+        self._newline()
+        self.text.insert('end', f"Out[{content['execution_count']}]: ", 'prompt')
+        self._insert_data(content['data'])
+
+    def _on_display_data(self, content):
+        self._apply_clear_wait()
+        self._newline()
+        self._insert_data(content['data'])
+
+    def _on_error(self, content):
+        self._apply_clear_wait()
+        self._newline()
+        text, tag_ranges = AnsiParser().feed('\n'.join(content['traceback']) + '\n')
+        self._insert(text, 'output', tag_ranges)
+
+    def _on_clear_output(self, content):
+        if content.get('wait'):
+            self._clear_wait = True
+        else:
+            self._clear_outputs()
+
+    # --- display
+    def _newline(self):
+        """Start a new line if the last one is not empty."""
+        if self.text.get('end-2c', 'end-1c') not in ('', '\n'):
+            self.text.insert('end', '\n')
+
+    def _apply_clear_wait(self):
+        if self._clear_wait:
+            self._clear_wait = False
+            self._clear_outputs()
+
+    def _clear_outputs(self):
+        self.text.delete('output_start', 'end')
+        self._ansi.clear()
+
+    def _insert_data(self, data):
+        """Insert the mime bundle data."""
+        png = data.get('image/png')
+        if png is not None:
+            try:
+                image = tk.PhotoImage(master=self, data=png.replace('\n', ''))
+            except tk.TclError:
+                pass  # display the text representation instead
+            else:
+                name = self.text.image_create('end', image=image)
+                self._images[name] = image
+                self.text.insert('end', '\n')
+                return
+        text, tag_ranges = AnsiParser().feed(data.get('text/plain', '') + '\n')
+        self._insert(text, 'output', tag_ranges)
+
+    def _insert(self, text, tag, tag_ranges):
+        """Insert text at the end and apply the ANSI format tag_ranges."""
+        self.text.insert_ansi('end-1c', text, tag, tag_ranges)
+
+    def _trim(self):
+        """Remove the oldest lines by blocks when the scrollback limit is exceeded."""
+        if self.scrollback <= 0:
+            return
+        nb_lines = int(self.text.index('end-1c').split('.')[0])
+        if nb_lines <= self.scrollback + max(100, self.scrollback // 10):
+            return
+        self.text.delete('1.0', f'{nb_lines - self.scrollback}.0')
+        names = set(self.text.image_names())
+        self._images = {name: im for name, im in self._images.items() if name in names}
@@ -23,8 +23,12 @@ Python console text widget
 import tkinter as tk
 from tkinter.font import Font
 import sys
+import logging
 import re
-from os import kill, remove, getcwd
+from collections import deque
+from time import perf_counter
+from tempfile import TemporaryFile
+from os import kill, getcwd
 from os.path import join, dirname, sep, expanduser
 from glob import glob
 import socket
@@ -34,16 +38,119 @@ import signal
 
 from pygments import lex
 from pygments.lexers import Python3Lexer
-import jedi
-
-from pytkeditorlib.utils.constants import SERVER_CERT, CLIENT_CERT, \
-    MAGIC_COMMANDS, EXTERNAL_COMMANDS, get_screen, PathCompletion, glob_rel, \
-    magic_complete, parse_ansi, format_long_output
-from pytkeditorlib.dialogs import askyesno, Tooltip, CompListbox
+from tkfilebrowser import asksaveasfilename
+
+from pytkeditorlib.utils.lazy_import import jedi
+from pytkeditorlib.utils.constants import SERVER_CERT, CLIENT_CERT, CONFIG, \
+    MAGIC_COMMANDS, CELL_MAGIC_COMMANDS, EXTERNAL_COMMANDS, get_screen, PathCompletion, glob_rel, \
+    magic_complete, AnsiParser
+from pytkeditorlib.utils.history_store import format_stats
+from pytkeditorlib.utils.console_protocol import MessageReader, Dispatcher, encode
+from pytkeditorlib.dialogs import askyesno, showerror, Tooltip, CompListbox, \
+    HistorySearchListbox
 from pytkeditorlib.gui_utils import AutoHideScrollbar
 from .base_widget import BaseWidget, RichText
 
 
+class ConsoleProcess:
+    """
+    Interactive console process.
+
+    The process is started immediately and the connection is accepted
+    without blocking the GUI, callback(process) is called once the process is
+    connected or, with process.client being None, if it exited before.
+    """
+
+    def __init__(self, widget, callback, preload=''):
+        self.widget = widget
+        self.callback = callback
+        self.preload = preload  # comma separated modules imported before connecting
+        self.client = None  # TLS socket, once connected
+
+        self._context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        self._context.verify_mode = ssl.CERT_REQUIRED
+        self._context.load_cert_chain(certfile=SERVER_CERT)
+        self._context.load_verify_locations(CLIENT_CERT)
+        self._tls = None
+
+        self._server = socket.socket()
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(1)
+        self._server.setblocking(False)
+        host, port = self._server.getsockname()
+        cmd = ['python', join(dirname(dirname(__file__)), 'utils', 'interactive_console.py'),
+               host, str(port)]
+        if preload:
+            cmd.extend(['--preload', preload])
+        self.process = Popen(cmd)
+        self.pid = self.process.pid
+        self.widget.tk.createfilehandler(self._server, tk.READABLE, self._accept)
+        self._check_id = self.widget.after(500, self._check)
+
+    def _check(self):
+        """Detect the process exiting before connecting."""
+        if self.process.poll() is None:
+            self._check_id = self.widget.after(500, self._check)
+        else:
+            self._check_id = ''
+            self.close(terminate=False)
+            self.callback(self)
+
+    def _accept(self, *args):
+        try:
+            client, addr = self._server.accept()
+        except BlockingIOError:
+            return
+        self.widget.tk.deletefilehandler(self._server)
+        self._server.close()
+        self._server = None
+        client.setblocking(False)
+        self._tls = self._context.wrap_socket(client, server_side=True,
+                                              do_handshake_on_connect=False)
+        self.widget.tk.createfilehandler(self._tls, tk.READABLE, self._handshake)
+        self._handshake()
+
+    def _handshake(self, *args):
+        try:
+            self._tls.do_handshake()
+        except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+            return
+        except OSError as e:
+            logging.error(f'Console connection failed: {e}')
+            self.close()
+            return
+        self.widget.tk.deletefilehandler(self._tls)
+        self._tls.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            self.widget.after_cancel(self._check_id)
+        except ValueError:
+            pass
+        self._check_id = ''
+        self.client = self._tls
+        self.callback(self)
+
+    def close(self, terminate=True):
+        """Close the connection and terminate the process."""
+        try:
+            self.widget.after_cancel(self._check_id)
+        except ValueError:
+            pass
+        for sock in (self._server, self._tls):
+            if sock is None:
+                continue
+            try:
+                self.widget.tk.deletefilehandler(sock)
+                sock.close()
+            except (OSError, ValueError, tk.TclError):
+                pass
+        self._server = self._tls = self.client = None
+        if terminate:
+            try:
+                self.process.terminate()
+            except OSError:
+                pass
+
+
 class TextConsole(RichText):
 
     def __init__(self, master, history, **kw):
@@ -80,6 +187,10 @@ class TextConsole(RichText):
         self._re_console_run = re.compile(r"^_console.run\('(.*)'\)$")
         self._re_console_external = re.compile(rf'^({ext_cmds}) ?(.*)\n*$')
         self._re_console_magic = re.compile(rf'^%({magic_cmds}) ?(.*)\n*$')
+        # cell magic, possibly after comments (e.g. cell delimiter)
+        cell_magic_cmds = "|".join(CELL_MAGIC_COMMANDS)
+        self._re_console_cell_magic = re.compile(rf'^(?:[ \t]*(?:#[^\n]*)?\n)*%%({cell_magic_cmds})[ \t]*([^\n]*)\n?(.*)$',
+                                                 re.DOTALL)
         self._re_help = re.compile(r'([.\w]*)(\?{1,2})$')
         self._re_expanduser = re.compile(r'(~\w*)')
         self._re_trailing_spaces = re.compile(r' *$', re.MULTILINE)
@@ -95,7 +206,31 @@ class TextConsole(RichText):
                                 titlestyle='args.title.tooltip.TLabel')
         self._tooltip.withdraw()
 
+        # --- reverse history search
+        self._search = HistorySearchListbox(self)
+        self._search_tag = f'{self}_search'  # bindtag added during the search
+        self._search_query = ''
+        self._search_matches = []  # (command, fuzzy)
+        self._search_pos = 0
+        self._search_input = ''  # input before the search
+
+        # --- output
+        self._pending = deque()  # messages waiting to be displayed
+        self._display_id = ''
+        self._hidden = 0         # number of lines removed because of the scrollback limit
+        self._spool = None       # file containing the removed lines
+
         # --- shell socket
+        # 'exited' is not sent by the console, it is queued when the connection is closed
+        self._dispatcher = Dispatcher(stream=self._on_stream, result=self._on_result,
+                                      namespace=self._on_namespace,
+                                      children=self._on_children,
+                                      exited=self._on_shell_exited)
+        self.explorer = None  # VariableExplorer fed by the console
+        self._shell = None  # ConsoleProcess in use
+        self._standby = None  # ConsoleProcess kept ready for the next restart
+        self.session = 0  # changes each time the console namespace is reset
+        self._result_callback = None  # called with the success of the executed code
         self._init_shell()
 
         # --- initialization
@@ -107,8 +242,6 @@ class TextConsole(RichText):
         self.mark_set('input_end', 'insert')
         self.mark_gravity('input_end', 'right')
 
-        self._poll_id = ""
-
         # --- bindings
         self.bind('<parenleft>', self._args_hint)
         self.bind('<Control-Return>', self.on_ctrl_return)
@@ -147,10 +280,24 @@ class TextConsole(RichText):
         self.bind("<braceright>", self.close_brackets)
         self.bind("<Configure>", self._on_configure)
         self.bind("<Shift-Escape>", lambda e: self.delete("input", "input_end"))
+        self.bind('<Control-r>', self.reverse_search)
+        self.bind_class(self._search_tag, '<KeyPress>', self._on_search_key)
+        self.bind_class(self._search_tag, '<Control-r>', lambda e: self._search_cycle(1))
+        self.bind_class(self._search_tag, '<KeyRelease>', lambda e: 'break')
+        self.bind_class(self._search_tag, '<ButtonPress>', lambda e: self._search_stop())
+        self.bind_class(self._search_tag, '<FocusOut>', lambda e: self._search_stop())
+        self.tag_bind('truncated', '<Button-1>', lambda e: self.save_output())
+        self.tag_bind('truncated', '<Enter>', lambda e: self.configure(cursor='hand1'))
+        self.tag_bind('truncated', '<Leave>', lambda e: self.configure(cursor='xterm'))
 
     def update_style(self):
         RichText.update_style(self)
         self._line_height = Font(self, self.cget('font')).metrics('linespace')
+        self.tag_configure('truncated', underline=True, foreground='gray60')
+        self.tag_configure('stats', justify='right',
+                           foreground=self.tag_cget('Token.Comment', 'foreground') or 'gray60')
+        self.show_stats = CONFIG.getboolean('Console', 'stats', fallback=False)
+        self.scrollback = CONFIG.getint('Console', 'scrollback', fallback=10000)
 
     def parse(self):
         data = self.get('input', 'input_end')
@@ -172,34 +319,92 @@ class TextConsole(RichText):
 
     # --- remote python interpreter
     def _init_shell(self):
-        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-        context.verify_mode = ssl.CERT_REQUIRED
-        context.load_cert_chain(certfile=SERVER_CERT)
-        context.load_verify_locations(CLIENT_CERT)
-
-        self.shell_socket = socket.socket()
-        self.shell_socket.bind(('127.0.0.1', 0))
-        host, port = self.shell_socket.getsockname()
-        self.shell_socket.listen(5)
-
-        p = Popen(['python',
-                   join(dirname(dirname(__file__)), 'utils', 'interactive_console.py'),
-                   host, str(port)])
-        self.shell_pid = p.pid
-        client, addr = self.shell_socket.accept()
-        self.shell_client = context.wrap_socket(client, server_side=True)
-        self.shell_client.setblocking(False)
+        """Switch to the standby console process, or start a new one."""
+        self._reader = MessageReader()
+        self._ansi = {'stdout': AnsiParser(), 'stderr': AnsiParser()}
+        self._execution = None  # (auto_indent, code, index, add_to_hist) of the running code
+        self._read_id = ''
+        self._outbox = []  # frames sent before the process is connected
+        self.shell_client = None
+        self.session += 1
+        preload = CONFIG.get('Console', 'preload', fallback='')
+        standby = self._standby
+        self._standby = None
+        if standby is not None and (standby.preload != preload or standby.process.poll() is not None):
+            standby.close()
+            standby = None
+        if standby is None:
+            standby = ConsoleProcess(self, self._on_shell_connected, preload)
+        self._shell = standby
+        self.shell_pid = standby.pid
+        if self.explorer is not None:
+            self.explorer.clear()
+            if self.explorer.winfo_ismapped():
+                self.request({'type': 'namespace'})
+        if standby.client is not None:
+            self._on_shell_connected(standby)
+        else:
+            standby.callback = self._on_shell_connected
+
+    def _on_shell_connected(self, process):
+        if process.client is None:  # the process exited
+            self._on_shell_exited({'type': 'exited'})
+            return
+        self.shell_client = process.client
+        self.tk.createfilehandler(self.shell_client, tk.READABLE, self._process_messages)
+        if self._outbox:
+            self.shell_client.setblocking(True)
+            try:
+                self.shell_client.sendall(b''.join(self._outbox))
+            finally:
+                self.shell_client.setblocking(False)
+            self._outbox.clear()
+        self.after_idle(self._start_standby)
+
+    def _start_standby(self):
+        """Start the process used at the next restart."""
+        if self._standby is None:
+            preload = CONFIG.get('Console', 'preload', fallback='')
+            self._standby = ConsoleProcess(self, self._on_standby_connected, preload)
+
+    def _on_standby_connected(self, process):
+        if process.client is None and self._standby is process:  # the process exited
+            self._standby = None
+
+    def _close_shell(self):
+        for after_id in (self._read_id, self._display_id):
+            try:
+                self.after_cancel(after_id)
+            except ValueError:
+                pass
+        self._pending.clear()
+        self._finish_execution(False)
+        if self._shell is not None:
+            try:
+                self.shell_client.shutdown(socket.SHUT_RDWR)
+            except (OSError, AttributeError):
+                pass
+            self._shell.close(terminate=False)
+            self._shell = None
+        self.shell_client = None
+
+    def _on_shell_exited(self, msg):
+        """Report the end of the console process, e.g. killed while running code."""
+        self._execution = None
+        self._outbox.clear()
+        self._close_shell()
+        self.configure(state='normal')
+        self.insert('input linestart', 'The console process exited unexpectedly, '
+                    'restart the console.\n', 'Token.Error')
 
     def restart_shell(self):
         rep = askyesno('Confirmation', 'Do you really want to restart the console?')
         if rep:
-            kill(self.shell_pid, signal.SIGTERM)
             try:
-                self.shell_client.shutdown(socket.SHUT_RDWR)
-                self.shell_client.close()
-                self.shell_socket.close()
-            except OSError:
+                kill(self.shell_pid, signal.SIGTERM)
+            except ProcessLookupError:
                 pass
+            self._close_shell()
             self.configure(state='normal')
             self._jedi_comp_extra = ''
             self.history.new_session()
@@ -207,6 +412,10 @@ class TextConsole(RichText):
             self._init_shell()
 
     def shell_clear(self, event=None):
+        self._hidden = 0
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
         self.delete('banner.last', 'end')
         self.insert('insert', '\n')
         self.prompt()
@@ -250,7 +459,7 @@ class TextConsole(RichText):
             xr = self.winfo_rootx()
             yr = self.winfo_rooty()
             ht = self._tooltip.winfo_reqheight()
-            screen = get_screen(xr, yr)
+            screen = get_screen(xr, yr, self)
             y = yr + yb + h
             x = xr + xb
             if y + ht > screen[3]:
@@ -312,6 +521,89 @@ class TextConsole(RichText):
             self._comp.geometry('+%i+%i' % (x, y))
             self._comp.deiconify()
 
+    # --- reverse history search
+    def reverse_search(self, event=None):
+        """Start the reverse incremental search in the history."""
+        if self._execution is not None:
+            return 'break'
+        self._comp.withdraw()
+        self._tooltip.withdraw()
+        self._search_input = self.get('input', 'input_end')
+        self._search_query = ''
+        self.bindtags((self._search_tag,) + self.bindtags())
+        self._search_update()
+        return 'break'
+
+    def _search_update(self):
+        self._search_matches = self.history.search_history(self._search_query)
+        self._search.update(self._search_query, self._search_matches)
+        self._search_show(0)
+        bbox = self.bbox('input')
+        if bbox:
+            xb, yb, w, h = bbox
+            xr = self.winfo_rootx()
+            yr = self.winfo_rooty()
+            hsearch = self._search.winfo_reqheight()
+            y = yr + yb + h
+            if y + hsearch > self.winfo_screenheight():
+                y = yr + yb - hsearch
+            self._search.geometry('+%i+%i' % (xr + xb, y))
+        self._search.deiconify()
+
+    def _search_show(self, pos):
+        """Put the match at pos in the input."""
+        self._search_pos = pos
+        self._search.select(pos)
+        if self._search_matches:
+            self.insert_cmd(self._search_matches[pos][0])
+        else:
+            self.insert_cmd(self._search_input)
+        self.parse()
+
+    def _search_cycle(self, step):
+        """Show the next older (step=1) or more recent (step=-1) match."""
+        pos = min(max(self._search_pos + step, 0), len(self._search_matches) - 1)
+        if pos >= 0 and pos != self._search_pos:
+            self._search_show(pos)
+        return 'break'
+
+    def _search_stop(self, cancel=False):
+        """Leave the search, keep the current match in the input unless cancel is True."""
+        tags = list(self.bindtags())
+        if self._search_tag not in tags:
+            return
+        tags.remove(self._search_tag)
+        self.bindtags(tags)
+        self._search.withdraw()
+        if cancel:
+            self.insert_cmd(self._search_input)
+        self.mark_set('insert', 'input_end')
+        self._hist_item = self.history.get_length()
+        self.parse()
+
+    def _on_search_key(self, event):
+        if event.keysym in ('Return', 'KP_Enter'):
+            self._search_stop()
+        elif event.keysym == 'Escape' or (event.keysym == 'g' and event.state & 4):
+            self._search_stop(cancel=True)
+        elif event.keysym == 'BackSpace':
+            self._search_query = self._search_query[:-1]
+            self._search_update()
+        elif event.keysym == 'Up':
+            self._search_cycle(1)
+        elif event.keysym == 'Down':
+            self._search_cycle(-1)
+        elif event.char and event.char.isprintable() and not event.state & 4:
+            self._search_query += event.char
+            self._search_update()
+        elif not event.char and event.keysym.endswith(('_L', '_R', '_Lock', '_Shift')):
+            pass  # modifier
+        else:
+            # leave the search and process the key normally
+            self._search_stop()
+            return
+        return 'break'
+
     # --- bindings
     def _on_configure(self, event):
         nb_lines = event.height // self._line_height - 1
@@ -342,16 +634,10 @@ class TextConsole(RichText):
 
     def quit(self, event=None):
         self.history.save()
-        try:
-            self.after_cancel(self._poll_id)
-        except ValueError:
-            pass
-        try:
-            self.shell_client.shutdown(socket.SHUT_RDWR)
-            self.shell_client.close()
-            self.shell_socket.close()
-        except OSError:
-            pass
+        self._close_shell()
+        if self._standby is not None:
+            self._standby.close()
+            self._standby = None
 
     def _on_focusout(self, event):
         self._comp.withdraw()
@@ -384,7 +670,7 @@ class TextConsole(RichText):
             self.clipboard_append('\n'.join(lines))
         except tk.TclError:
             if self.cget('state') == 'disabled':
-                kill(self.shell_pid, signal.SIGINT)
+                self._send({'type': 'interrupt'})
         return 'break'
 
     def on_cut(self, event):
@@ -468,18 +754,12 @@ class TextConsole(RichText):
         elif self.index('input linestart') == self.index('insert linestart'):
             line = self.get('input', 'insert')
             self._hist_match = line
-            hist_item = self._hist_item
-            self._hist_item -= 1
-            item = self.history.get_history_item(self._hist_item)
-            while self._hist_item >= 0 and not item.startswith(line):
-                self._hist_item -= 1
-                item = self.history.get_history_item(self._hist_item)
-            if self._hist_item >= 0:
+            pos = self.history.find_history_item(line, self._hist_item)
+            if pos is not None:
+                self._hist_item = pos
                 index = self.index('insert')
-                self.insert_cmd(item)
+                self.insert_cmd(self.history.get_history_item(pos))
                 self.mark_set('insert', index)
-            else:
-                self._hist_item = hist_item
             self.parse()
             return 'break'
 
@@ -495,13 +775,10 @@ class TextConsole(RichText):
             return 'break'
         elif self.compare('insert lineend', '==', 'input_end'):
             line = self._hist_match
-            self._hist_item += 1
-            item = self.history.get_history_item(self._hist_item)
-            while item is not None and not item.startswith(line):
-                self._hist_item += 1
-                item = self.history.get_history_item(self._hist_item)
-            if item is not None:
-                self.insert_cmd(item)
+            pos = self.history.find_history_item(line, self._hist_item, backwards=False)
+            if pos is not None:
+                self._hist_item = pos
+                self.insert_cmd(self.history.get_history_item(pos))
                 self.mark_set('insert', 'input+%ic' % len(self._hist_match))
             else:
                 self._hist_item = self.history.get_length()
@@ -701,12 +978,34 @@ class TextConsole(RichText):
             return None
 
     # --- execute
-    def execute(self, cmd):
+    def execute(self, cmd, callback=None):
+        """
+        Execute cmd as if typed in the console.
+
+        callback is called with True once cmd is executed if it is complete
+        and did not raise an exception, False otherwise. cmd is not executed
+        (and callback is called with False) if some code is already running
+        or if the console process exited.
+        """
+        if self._execution is not None or self._shell is None:
+            if callback is not None:
+                callback(False)
+            return
+        self._result_callback = callback
         self.delete('input', 'input_end')
         self.insert_cmd(cmd)
         self.parse()
         self.focus_set()
         self.eval_current()
+        if self._execution is None:  # nothing was sent
+            self._finish_execution(False)
+
+    def _finish_execution(self, success):
+        """Call the callback of the executed command with success."""
+        callback = self._result_callback
+        self._result_callback = None
+        if callback is not None:
+            callback(success)
 
     def eval_current(self, auto_indent=False):
         index = self.index('input')
@@ -746,7 +1045,14 @@ class TextConsole(RichText):
                 else:
                     # magic cmds
                     match = self._re_console_magic.match(code)
-                    if match:
+                    cell_match = self._re_console_cell_magic.match(code)
+                    if cell_match:
+                        self.history.add_history(code)
+                        self._hist_item = self.history.get_length()
+                        cmd, arg, cell = cell_match.groups()
+                        code = f"_console.{cmd}({arg.strip()!r}, {cell!r})"
+                        add_to_hist = False
+                    elif match:
                         self.history.add_history(code)
                         self._hist_item = self.history.get_length()
                         cmd, arg = match.groups()
@@ -776,115 +1082,211 @@ class TextConsole(RichText):
 
             self.insert('insert', '\n')
             try:
-                self.shell_client.send(code.encode())
+                self._send({'type': 'execute', 'code': code, 'width': self['width'],
+                            'stats': self.show_stats,
+                            'namespace': self.explorer is not None and self.explorer.winfo_ismapped()})
                 self.configure(state='disabled')
-            except SystemExit:
-                self.history.new_session()
-                self.shell_clear()
-                return
             except Exception as e:
-                print(e)
+                logging.error(f'Failed to send the code to the console: {e}')
                 return
-            try:
-                self.after_cancel(self._poll_id)
-            except ValueError:
-                pass
-            self.after(1, self._check_result, auto_indent, code, index, add_to_hist)
+            self._execution = auto_indent, code, index, add_to_hist
         else:
             self.insert('insert', '\n')
             self.prompt()
 
-    def _poll_output(self):
-        """Get outputs coming in between """
+    # --- console messages
+    def _send(self, msg):
+        """Send message to the console."""
+        if self.shell_client is None:  # the process is still starting
+            self._outbox.append(encode(msg))
+            return
+        self.shell_client.setblocking(True)
         try:
-            cmd = self.shell_client.recv(65536).decode()
-        except socket.error:
-            self._poll_id = self.after(100, self._poll_output)
-        else:
-            if cmd:
-                res, output, err, wait, cwd = eval(cmd)
-                index = self.index('input linestart -1c')
-                if output.strip():
-                    output = format_long_output(output, self["width"])
-                    if '\x1b' in output:  # ansi formatting
-                        offset = int(index.split('.')[0]) + 1
-                        tag_ranges, text = parse_ansi(output, offset)
-                        self.insert(f'{index}+1c', text, 'output')
-                        for tag, r in tag_ranges.items():
-                            self.tag_add(tag, *r)
-                    else:
-                        self.insert(f'{index}+1c', output, 'output')
-                    self.see('input_end')
-            self._poll_id = self.after(10, self._poll_output)
-
-    def _check_result(self, auto_indent, code, index, add_to_hist=True):
+            self.shell_client.sendall(encode(msg))
+        finally:
+            self.shell_client.setblocking(False)
+
+    def request(self, msg):
+        """Send a request (e.g. from the variable explorer) to the console."""
+        if self._shell is not None:
+            self._send(msg)
+
+    def set_explorer(self, explorer):
+        """Set the VariableExplorer displaying the console namespace."""
+        self.explorer = explorer
+
+    def _receive(self, max_size=1048576):
+        """
+        Return the messages received from the console.
+
+        Return also whether some data remains to be read.
+        """
+        messages = []
+        size = 0
+        while size < max_size:
+            try:
+                data = self.shell_client.recv(65536)
+            except (ssl.SSLWantReadError, BlockingIOError):
+                return messages, False
+            except OSError:  # the console was closed
+                return messages, False
+            if not data:  # the console process exited
+                self.tk.deletefilehandler(self.shell_client)
+                messages.append({'type': 'exited'})
+                return messages, False
+            size += len(data)
+            messages.extend(self._reader.feed(data))
+        return messages, True
+
+    def _process_messages(self, *args):
+        """Process the messages sent by the console (called when the socket is readable)."""
+        self._read_id = ''
+        messages, remaining = self._receive()
+        if remaining:
+            # do not block the GUI if the console floods the socket
+            self._read_id = self.after_idle(self._process_messages)
+        self._pending.extend(messages)
+        if self._pending and not self._display_id:
+            self._display_id = self.after_idle(self._display)
+
+    def _display(self, time_slice=0.02, max_size=262144):
+        """Display the pending messages by time slices to keep the GUI responsive."""
+        self._display_id = ''
+        pending = self._pending
+        deadline = perf_counter() + time_slice
+        while pending and perf_counter() < deadline:
+            msg = pending.popleft()
+            if msg['type'] == 'stream':
+                # insert the consecutive outputs of the same stream at once
+                name = msg['name']
+                texts = [msg['text']]
+                size = len(texts[0])
+                while (pending and size < max_size and pending[0]['type'] == 'stream'
+                       and pending[0]['name'] == name):
+                    texts.append(pending.popleft()['text'])
+                    size += len(texts[-1])
+                msg = {'type': 'stream', 'name': name, 'text': ''.join(texts)}
+            self._dispatcher.dispatch([msg])
+        self._trim()
+        if pending:
+            self._display_id = self.after(1, self._display)
+
+    # --- scrollback
+    def _trim(self):
+        """Remove the oldest lines by blocks when the scrollback limit is exceeded."""
+        if self.scrollback <= 0:
+            return
+        start = 'truncated.last' if self._hidden else 'banner.last'
+        first = int(self.index(start).split('.')[0])
+        nb_lines = int(self.index('input').split('.')[0]) - first
+        if nb_lines <= self.scrollback + max(100, self.scrollback // 10):
+            return
+        nb_lines -= self.scrollback
+        end = f'{first + nb_lines}.0'
+        state = self.cget('state')
+        self.configure(state='normal')
+        if self._spool is None:
+            self._spool = TemporaryFile('w+', encoding='utf-8')
+        self._spool.write(self.get(start, end))
+        self.delete(start, end)
+        if self._hidden:
+            self.delete('truncated.first', 'truncated.last')
+        self._hidden += nb_lines
+        self.insert('banner.last',
+                    f'[output truncated, {self._hidden} lines hidden - click to save the full output]\n',
+                    'truncated')
+        self.configure(state=state)
+
+    def save_output(self):
+        """Save the full console output, including the lines removed from the scrollback."""
+        filename = asksaveasfilename(self, initialfile='console_output.txt',
+                                     defaultext='.txt',
+                                     filetypes=[('Text', '*.txt'), ('All files', '*')])
+        if not filename:
+            return
+        start = 'truncated.last' if self._hidden else 'banner.last'
         try:
-            cmd = self.shell_client.recv(65536).decode()
-        except socket.error:
-            self.after(10, self._check_result, auto_indent, code, index, add_to_hist)
+            with open(filename, 'w', encoding='utf-8') as file:
+                if self._spool is not None:
+                    self._spool.seek(0)
+                    while True:
+                        chunk = self._spool.read(1048576)
+                        if not chunk:
+                            break
+                        file.write(chunk)
+                    self._spool.seek(0, 2)
+                file.write(self.get(start, 'input_end'))
+        except OSError as e:
+            showerror('Error', f'Failed to save the console output: {e}', parent=self)
+
+    def _on_stream(self, msg):
+        """Display output."""
+        text, tag_ranges = self._ansi[msg['name']].feed(msg['text'])
+        tag = 'Token.Error' if msg['name'] == 'stderr' else 'output'
+        if self._execution is None:
+            # output coming in between commands (e.g. from a thread): display it before the prompt
+            if not text.endswith('\n'):
+                text += '\n'
+            self.insert_ansi('input linestart', text, tag, tag_ranges)
         else:
-            if not cmd:
-                return
-            res, output, err, wait, cwd = eval(cmd)
-
-            if err == "Too long":
-                filename = output
-                with open(filename) as tmpfile:
-                    res, output, err, wait, cwd = eval(tmpfile.read())
-                remove(filename)
-            self.cwd = cwd
-            if wait:
-                if output.strip():
-                    output = format_long_output(output, self["width"])
-                    if '\x1b' in output:  # ansi formatting
-                        offset = int(self.index('input_end').split('.')[0]) - 1
-                        tag_ranges, text = parse_ansi(output, offset)
-                        self.configure(state='normal')
-                        self.insert('input_end', text, 'output')
-                        for tag, r in tag_ranges.items():
-                            self.tag_add(tag, *r)
-                    else:
-                        self.configure(state='normal')
-                        self.insert('input_end', output, 'output')
-                    self.mark_set('input', 'input_end')
-                    self.see('input_end')
-                self.configure(state='disabled')
-                self.after(1, self._check_result, auto_indent, code, index, add_to_hist)
-                return
-
             self.configure(state='normal')
+            self.insert_ansi('input_end', text, tag, tag_ranges)
+            self.mark_set('input', 'input_end')
+            self.configure(state='disabled')
+        self.see('input_end')
 
-            if err.strip():
-                if err == 'SystemExit\n':
-                    self.history.new_session()
-                    self.shell_clear()
-                    return
-                else:
-                    self.insert('input_end', err, 'Token.Error')
+    def _on_namespace(self, msg):
+        if self.explorer is not None:
+            self.explorer.update_namespace(msg)
 
-            if not res and self.compare('insert linestart', '>', 'insert'):
-                self.insert('insert', '\n')
-            self.prompt(res)
-            if res and auto_indent and code:
-                lines = code.splitlines()
-                indent = re.search(r'^( )*', lines[-1]).group()
-                line = lines[-1].strip()
-                if line and line[-1] == ':':
-                    indent = indent + '    '
-                self.insert('insert', indent)
-            self.see('input_end')
-            if res:
-                self.mark_set('input', index)
-            elif code:
-                match = self._re_console_run.match(code.strip())
-                if match:
-                    path = match.groups()[0]
-                    with open(path) as file:
-                        self._jedi_comp_extra += f"\n\n{file.read()}\n\n"
-                if add_to_hist:
-                    self.history.add_history(code)
-                    self._hist_item = self.history.get_length()
-            self._poll_id = self.after(100, self._poll_output)
+    def _on_children(self, msg):
+        if self.explorer is not None:
+            self.explorer.update_children(msg)
+
+    def _on_result(self, msg):
+        """Display the prompt after the execution of the code."""
+        if self._execution is None:
+            return
+        auto_indent, code, index, add_to_hist = self._execution
+        self._execution = None
+        self.cwd = msg['cwd']
+        self.configure(state='normal')
+
+        if msg['exit']:
+            self.session += 1
+            self.history.new_session()
+            self.shell_clear()
+            self._finish_execution(False)
+            return
+
+        res = msg['more']
+        if not res and self.compare('insert linestart', '>', 'insert'):
+            self.insert('insert', '\n')
+        stats = msg.get('stats')
+        if stats and not res:
+            sep = '' if self.compare('input_end', '==', 'input_end linestart') else '\n'
+            self.insert('input_end', f'{sep}{format_stats(stats)}\n', 'stats')
+        self.prompt(res)
+        if res and auto_indent and code:
+            lines = code.splitlines()
+            indent = re.search(r'^( )*', lines[-1]).group()
+            line = lines[-1].strip()
+            if line and line[-1] == ':':
+                indent = indent + '    '
+            self.insert('insert', indent)
+        self.see('input_end')
+        if res:
+            self.mark_set('input', index)
+        elif code:
+            match = self._re_console_run.match(code.strip())
+            if match:
+                path = match.groups()[0]
+                with open(path) as file:
+                    self._jedi_comp_extra += f"\n\n{file.read()}\n\n"
+            if add_to_hist:
+                self.history.add_history(code, stats)
+                self._hist_item = self.history.get_length()
+        self._finish_execution(not res and not msg.get('error', False))
 
     # --- brackets
     def auto_close(self, event):
@@ -955,6 +1357,7 @@ class ConsoleFrame(BaseWidget):
         self.menu = tk.Menu(self)
         self.menu.add_command(label='Clear console', accelerator='Ctrl+L',
                               command=self.console.shell_clear)
+        self.menu.add_command(label='Save output', command=self.console.save_output)
         self.menu.add_command(label='Restart console', command=self.console.restart_shell)
 
         self.update_style = self.console.update_style
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+GUI widget to explore the variables of the console
+
+The widget only holds the summaries sent by the console process
+(see utils/namespace.py): the items of a variable are requested by pages
+when it is expanded.
+"""
+import tkinter as tk
+from tkinter import ttk
+from bisect import bisect_left
+
+from pytkeditorlib.gui_utils import AutoHideScrollbar
+from .base_widget import BaseWidget
+
+
+def format_memory(nbytes):
+    if nbytes is None:
+        return ''
+    for unit in ('B', 'kB', 'MB'):
+        if nbytes < 1024:
+            return f'{nbytes:.0f} {unit}' if unit == 'B' else f'{nbytes:.1f} {unit}'
+        nbytes /= 1024
+    return f'{nbytes:.1f} GB'
+
+
+class VariableExplorer(BaseWidget):
+    """Tree of the console variables."""
+
+    PAGE = 100  # number of items requested at once
+
+    def __init__(self, master, request, **kw):
+        """
+        Create the variable explorer.
+
+        request: function sending a message to the console process
+        """
+        BaseWidget.__init__(self, master, 'Variables', **kw)
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+        self.request = request
+
+        self.tree = ttk.Treeview(self, columns=('type', 'size', 'memory', 'value'),
+                                 selectmode='browse')
+        self.tree.heading('#0', text='Name', anchor='w')
+        self.tree.heading('type', text='Type', anchor='w')
+        self.tree.heading('size', text='Size', anchor='w')
+        self.tree.heading('memory', text='Memory', anchor='w')
+        self.tree.heading('value', text='Value', anchor='w')
+        self.tree.column('#0', width=100, stretch=False)
+        self.tree.column('type', width=80, stretch=False)
+        self.tree.column('size', width=60, stretch=False)
+        self.tree.column('memory', width=60, stretch=False)
+        self.tree.column('value', width=200)
+        self.tree.tag_configure('more', foreground='gray50')
+        self.tree.tag_configure('error', foreground='red')
+        sx = AutoHideScrollbar(self, orient='horizontal', command=self.tree.xview)
+        sy = AutoHideScrollbar(self, orient='vertical', command=self.tree.yview)
+        self.tree.configure(xscrollcommand=sx.set, yscrollcommand=sy.set)
+
+        self.tree.grid(row=0, column=0, sticky='ewns')
+        sx.grid(row=1, column=0, sticky='ew')
+        sy.grid(row=0, column=1, sticky='ns')
+
+        self._names = []  # sorted variable names
+        self._items = {}  # (name, path): item
+        self._keys = {}  # item: (name, path)
+        self._loading = set()  # keys of the items whose children were requested
+
+        self.tree.bind('<<TreeviewOpen>>', self._on_open)
+        self.tree.tag_bind('more', '<Double-1>', self._on_more)
+        self.tree.tag_bind('more', '<Return>', self._on_more)
+        self.tree.bind("<Control-Tab>", self.traversal_next)
+        self.tree.bind('<Shift-Control-ISO_Left_Tab>', self.traversal_prev)
+        self.bind('<Map>', lambda e: self.request({'type': 'namespace'}))
+
+        self.menu = tk.Menu(self)
+        self.menu.add_command(label='Refresh', command=self.refresh)
+
+    def focus_set(self):
+        self.tree.focus_set()
+
+    @staticmethod
+    def _values(summ):
+        typ = summ['type'] if summ['dtype'] is None else f"{summ['type']} ({summ['dtype']})"
+        if summ['shape'] is not None:
+            size = ' × '.join(map(str, summ['shape']))
+        elif summ['size'] is not None:
+            size = summ['size']
+        else:
+            size = ''
+        return typ, size, format_memory(summ['memory']), summ['preview']
+
+    def _insert(self, parent, index, key, summ):
+        item = self.tree.insert(parent, index, text=summ['name'], values=self._values(summ))
+        self._items[key] = item
+        self._keys[item] = key
+        if summ['expandable']:
+            self.tree.insert(item, 'end', text='…')  # dummy child to display the indicator
+        return item
+
+    def _forget_children(self, item):
+        for child in self.tree.get_children(item):
+            self._forget_children(child)
+            key = self._keys.pop(child, None)
+            if key is not None:
+                del self._items[key]
+                self._loading.discard(key)
+        self.tree.delete(*self.tree.get_children(item))
+
+    # --- console messages
+    def clear(self):
+        """Remove all variables (e.g. when the console is restarted)."""
+        self.tree.delete(*self.tree.get_children())
+        self._names.clear()
+        self._items.clear()
+        self._keys.clear()
+        self._loading.clear()
+
+    def refresh(self):
+        """Request the whole namespace again."""
+        self.clear()
+        self.request({'type': 'namespace', 'reset': True})
+
+    def update_namespace(self, msg):
+        """Apply the changes of the namespace sent by the console."""
+        for name in msg['removed']:
+            item = self._items.get((name, ()))
+            if item is None:
+                continue
+            self._forget_children(item)
+            del self._items[(name, ())]
+            del self._keys[item]
+            self._loading.discard((name, ()))
+            self.tree.delete(item)
+            del self._names[bisect_left(self._names, name)]
+        for summ in msg['changed']:
+            name = summ['name']
+            key = (name, ())
+            item = self._items.get(key)
+            if item is None:
+                i = bisect_left(self._names, name)
+                self._names.insert(i, name)
+                self._insert('', i, key, summ)
+            else:
+                # the displayed items may be outdated: collapse the variable
+                self._forget_children(item)
+                self._loading.discard(key)
+                self.tree.item(item, values=self._values(summ), open=False)
+                if summ['expandable']:
+                    self.tree.insert(item, 'end', text='…')
+
+    def update_children(self, msg):
+        """Display the page of items sent by the console."""
+        key = (msg['name'], tuple(msg['path']))
+        if key not in self._loading:  # outdated answer
+            return
+        self._loading.discard(key)
+        parent = self._items[key]
+        for child in self.tree.get_children(parent):
+            if child not in self._keys:  # dummy or "load more" item
+                self.tree.delete(child)
+        if 'error' in msg:
+            self.tree.insert(parent, 'end', text=msg['error'], tags='error')
+            return
+        start = msg['start']
+        for pos, summ in enumerate(msg['items'], start):
+            self._insert(parent, 'end', (key[0], key[1] + (pos,)), summ)
+        remaining = msg['total'] - start - len(msg['items'])
+        if remaining > 0:
+            self.tree.insert(parent, 'end', text=f'Load more… ({remaining} remaining)',
+                             values=('', '', '', ''), tags=('more', f'start={start + len(msg["items"])}'))
+
+    # --- expansion
+    def _request_children(self, item, start):
+        key = self._keys[item]
+        self._loading.add(key)
+        self.request({'type': 'children', 'name': key[0], 'path': list(key[1]),
+                      'start': start, 'count': self.PAGE})
+
+    def _on_open(self, event):
+        item = self.tree.focus()
+        if item not in self._keys or self._keys[item] in self._loading:
+            return
+        children = self.tree.get_children(item)
+        if len(children) == 1 and children[0] not in self._keys:  # dummy child
+            self.tree.item(children[0], text='Loading…')
+            self._request_children(item, 0)
+
+    def _on_more(self, event):
+        item = self.tree.focus()
+        parent = self.tree.parent(item)
+        if self._keys.get(parent) in self._loading:
+            return
+        start = int(self.tree.item(item, 'tags')[1].split('=')[1])
+        self.tree.item(item, text='Loading…')
+        self._request_children(parent, start)
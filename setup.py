@@ -44,7 +44,6 @@ setup(name="pytkeditor",
                 'pytkeditorlib.dialogs',
                 'pytkeditorlib.gui_utils',
                 'pytkeditorlib.utils',
-                'pytkeditorlib.custom_qtconsole',
                 'pytkeditorlib.widgets'],
       data_files=data_files,
       long_description=long_description,
@@ -54,11 +53,11 @@ setup(name="pytkeditor",
                         "pyflakes",
                         "pycodestyle",
                         "tkfilebrowser",
-                        "ewmh",
                         "python-xlib",
                         "tkcolorpicker",
                         "Pillow",
                         "docutils",
                         "pdfkit",
                         "pycups"],
-      extras_require={'Execute in Jupyter QtConsole': ["qtconsole", "qtpy", "traitlets", "jupyter_client"]})
+      extras_require={'Execute in a Jupyter kernel': ["jupyter_client", "ipykernel", "pyzmq"],
+                      'Open a Jupyter QtConsole': ["qtconsole"]})
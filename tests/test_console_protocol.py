@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Round trip of the console messages through a socket, with a throughput benchmark
+
+Run this file directly to benchmark larger outputs:
+
+    python tests/test_console_protocol.py [size in MB ...]
+"""
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'pytkeditorlib', 'utils'))
+
+from console_protocol import Dispatcher, MessageReader, encode, encode_stream  # noqa: E402
+
+
+def round_trip(text, name='stdout'):
+    """
+    Send text as stream messages through a socketpair.
+
+    Return the received text and the time elapsed, the temporary file
+    creation being forbidden.
+    """
+    sender, receiver = socket.socketpair()
+    received = []
+    results = []
+    reader = MessageReader()
+    dispatcher = Dispatcher(stream=lambda msg: received.append(msg['text']),
+                            result=results.append)
+
+    def send():
+        with sender:
+            sender.sendall(encode_stream(name, text))
+            sender.sendall(encode({'type': 'result', 'more': False, 'exit': False,
+                                   'error': False, 'cwd': '/'}))
+
+    with mock.patch('tempfile.mkstemp', side_effect=AssertionError('temporary file created')) as mkstemp:
+        start = time.perf_counter()
+        thread = threading.Thread(target=send)
+        thread.start()
+        with receiver:
+            while True:
+                data = receiver.recv(65536)
+                if not data:
+                    break
+                dispatcher.dispatch(reader.feed(data))
+        thread.join()
+        elapsed = time.perf_counter() - start
+    assert not mkstemp.called
+    assert len(results) == 1
+    return ''.join(received), elapsed
+
+
+class TestConsoleProtocol(unittest.TestCase):
+    def check(self, text):
+        received, elapsed = round_trip(text)
+        self.assertEqual(received, text)
+        size = len(text.encode('utf-8', 'surrogatepass')) / 2**20
+        print(f'\n{size:.1f} MB in {elapsed:.3f} s: {size / elapsed:.0f} MB/s', file=sys.stderr)
+
+    def test_large_ascii_output(self):
+        self.check('0123456789abcdef\n' * (4 * 2**20 // 17))
+
+    def test_large_multibyte_output(self):
+        # multibyte characters split between two reads
+        self.check('é€😀 ' * 2**20)
+
+    def test_lone_surrogates(self):
+        # e.g. print('\udcff') or a file decoded with surrogateescape
+        self.check('a\udcffb\ud800' * 1000)
+
+
+if __name__ == '__main__':
+    for arg in sys.argv[1:] or ['1', '8', '32']:
+        text = 'x' * 79 + '\n'
+        text *= int(float(arg) * 2**20) // len(text)
+        received, elapsed = round_trip(text)
+        assert received == text
+        print(f'{arg} MB: {elapsed:.3f} s, {float(arg) / elapsed:.0f} MB/s')
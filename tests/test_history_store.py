@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Console history storage
+"""
+import json
+import os
+import pickle
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'pytkeditorlib', 'utils'))
+
+from history_store import HistoryStore  # noqa: E402
+
+STATS = {'wall': 0.5, 'cpu': 0.25, 'rss': 0}
+
+
+class HistoryTestCase(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmpdir = tmpdir.name
+        self.histfile = os.path.join(self.tmpdir, 'history.jsonl')
+
+    def write_lines(self, lines):
+        with open(self.histfile, 'w', encoding='utf-8') as file:
+            file.writelines(line + '\n' for line in lines)
+
+    def read_records(self):
+        with open(self.histfile, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def store(self, records=(), **kw):
+        if records:
+            self.write_lines([json.dumps(rec) for rec in records])
+        return HistoryStore(self.histfile, **kw)
+
+
+class TestHistoryStore(HistoryTestCase):
+    def test_matches(self):
+        hist = self.store(['a1', 'b', 'a2', 'a1', 'ab'])
+        self.assertEqual(list(hist.matches('a')), [0, 2, 3, 4])
+        self.assertEqual(list(hist.matches('a1')), [0, 3])
+        self.assertEqual(list(hist.matches('c')), [])
+        self.assertEqual(list(hist.matches('')), [0, 1, 2, 3, 4])
+
+    def test_find(self):
+        hist = self.store(['a1', 'b', 'a2', 'a1', 'ab'])
+        self.assertEqual(hist.find('a', 5), 4)
+        self.assertEqual(hist.find('a', 4), 3)
+        self.assertEqual(hist.find('a', 2), 0)
+        self.assertIsNone(hist.find('a', 0))
+        self.assertEqual(hist.find('a', 0, backwards=False), 2)
+        self.assertEqual(hist.find('a', 2, backwards=False), 3)
+        self.assertIsNone(hist.find('a', 4, backwards=False))
+        self.assertEqual(hist.find('b', 5), 1)
+        self.assertIsNone(hist.find('c', 5))
+        # the cached matches are updated by the modifications
+        hist.append('a3')
+        self.assertEqual(hist.find('a', 6), 5)
+
+    def test_append(self):
+        hist = self.store(['old'])
+        hist.append('x = 1', STATS)
+        hist.append('print(x)')
+        self.assertEqual(hist.get_session_hist(), ['x = 1', 'print(x)'])
+        self.assertEqual(self.read_records(),
+                         ['old', {'cmd': 'x = 1', 'stats': STATS}, 'print(x)'])
+        hist = self.store()
+        self.assertEqual(hist.history, ['old', 'x = 1', 'print(x)'])
+        self.assertEqual(hist.stats, {1: STATS})
+        self.assertEqual(hist.get_session_hist(), [])
+
+    def test_replace(self):
+        hist = self.store(['a', {'cmd': 'b', 'stats': STATS}, 'c'])
+        hist.append('d', STATS)
+        hist.replace(1, 'a2')
+        self.assertEqual(hist.history, ['a', 'a2', 'c', 'd'])
+        self.assertEqual(hist.stats, {3: STATS})
+        self.assertEqual(list(hist.matches('a')), [0, 1])
+        self.assertEqual(list(hist.matches('b')), [])
+        self.assertEqual(hist.get_session_hist(), ['d'])
+
+    def test_remove(self):
+        stats = [dict(STATS, wall=i) for i in range(4)]
+        hist = self.store(['a', {'cmd': 'b', 'stats': stats[1]}, 'c'])
+        hist.append('d', stats[3])
+        hist.append('a')
+        hist.remove(1)
+        self.assertEqual(hist.history, ['a', 'c', 'd', 'a'])
+        self.assertEqual(hist.stats, {2: stats[3]})
+        self.assertEqual(hist.get_session_hist(), ['d', 'a'])
+        self.assertEqual(list(hist.matches('a')), [0, 3])
+        # command of the current session
+        hist.remove(2)
+        self.assertEqual(hist.history, ['a', 'c', 'a'])
+        self.assertEqual(hist.stats, {})
+        self.assertEqual(hist.get_session_hist(), ['a'])
+        self.assertEqual(hist.find('a', 3), 2)
+
+    def test_compact(self):
+        records = [f'cmd{i}' for i in range(15)]
+        records[12] = {'cmd': 'cmd12', 'stats': STATS}
+        hist = self.store(records, maxsize=10)
+        self.assertEqual(hist.history, [f'cmd{i}' for i in range(5, 15)])
+        self.assertEqual(hist.stats, {7: STATS})
+        hist.compact()
+        self.assertEqual(self.read_records(), records[5:])
+        hist = self.store(maxsize=10)
+        self.assertEqual(hist.stats, {7: STATS})
+
+    def test_compact_small_file(self):
+        hist = self.store(['a', 'b'], maxsize=10)
+        mtime = os.stat(self.histfile).st_mtime_ns
+        hist.compact()
+        self.assertEqual(os.stat(self.histfile).st_mtime_ns, mtime)
+
+    def test_truncated_line(self):
+        self.write_lines(['"a"', '{"cmd": "b", "stats": {"wall"', '"c"', '42', '{"x": 1}'])
+        with open(self.histfile, 'a', encoding='utf-8') as file:
+            file.write('{"cmd": "d')  # crash while appending
+        hist = self.store()
+        self.assertEqual(hist.history, ['a', 'c'])
+        hist.append('e')
+        self.assertEqual(self.store().history, ['a', 'c', 'e'])
+
+    def test_legacy_import(self):
+        legacy = os.path.join(self.tmpdir, 'history.pickle')
+        with open(legacy, 'wb') as file:
+            pickle.dump(['import os', 'os.getcwd()'], file)
+        hist = self.store(legacy_histfile=legacy)
+        self.assertEqual(hist.history, ['import os', 'os.getcwd()'])
+        self.assertEqual(self.read_records(), ['import os', 'os.getcwd()'])
+        # the legacy file is only imported once
+        hist.append('x')
+        self.assertEqual(self.store(legacy_histfile=legacy).history,
+                         ['import os', 'os.getcwd()', 'x'])
+
+    def test_corrupted_legacy_file(self):
+        legacy = os.path.join(self.tmpdir, 'history.pickle')
+        with open(legacy, 'wb') as file:
+            file.write(b'not a pickle')
+        with self.assertLogs(level='ERROR'):
+            hist = self.store(legacy_histfile=legacy)
+        self.assertEqual(hist.history, [])
+
+
+def linear_search(history, query, limit):
+    """Return the distinct commands containing query, the most recent first."""
+    query = query.lower()
+    res = []
+    for cmd in reversed(history):
+        if query in cmd.lower() and cmd not in res:
+            res.append(cmd)
+            if len(res) == limit:
+                break
+    return res
+
+
+class TestHistorySearch(HistoryTestCase):
+    def setUp(self):
+        HistoryTestCase.setUp(self)
+        rng = random.Random(4321)
+        words = ['print', 'PRINT', 'x', 'df', 'np.arange', 'import', 'os', '(', ')',
+                 ' ', '=', '1', 'abc', 'İ', 'é']
+        self.records = [''.join(rng.choice(words) for i in range(rng.randint(1, 6)))
+                        for j in range(600)]
+        self.queries = ['p', 'pr', 'x', 'İ', 'print', 'Print(', 'x=1', 'np.arange(',
+                        'abcabc', 'zzz', 'import os', 'é ', ' ']
+        self.queries.extend(rng.choice(self.records)[1:9] for i in range(20))
+
+    def exact(self, hist, query, limit=50):
+        return [cmd for cmd, fuzzy in hist.search(query, limit) if not fuzzy]
+
+    def check_search(self, hist):
+        for query in self.queries:
+            for limit in (1, 5, 50, 1000):
+                self.assertEqual(self.exact(hist, query, limit),
+                                 linear_search(hist.history, query, limit),
+                                 f'{query!r}, limit {limit}')
+
+    def test_short_queries(self):
+        hist = self.store(['ab', 'xyz', 'AB', 'b', 'ab'])
+        self.assertEqual(hist.search('b'), [('ab', False), ('b', False), ('AB', False)])
+        self.assertEqual(hist.search('ab', limit=1), [('ab', False)])
+        self.assertEqual(hist.search('q'), [])
+
+    def test_search(self):
+        hist = self.store(self.records)
+        while hist.index_step():
+            pass
+        self.check_search(hist)
+
+    def test_partial_index(self):
+        hist = self.store(self.records)
+        self.check_search(hist)  # nothing indexed
+        while hist.index_step(97):
+            self.check_search(hist)
+        self.check_search(hist)
+
+    def test_append_during_indexing(self):
+        hist = self.store(self.records)
+        hist.index_step(200)
+        hist.append('print(x)')
+        hist.append(self.records[0])  # most recent use of an unindexed command
+        hist.append(self.records[450])  # most recent use of an indexed command
+        self.queries.extend([self.records[0], self.records[450]])
+        self.check_search(hist)
+        while hist.index_step(200):
+            pass
+        self.check_search(hist)
+
+    def test_modification_resets_index(self):
+        hist = self.store(self.records)
+        while hist.index_step():
+            pass
+        hist.replace(10, 'unique_command()')
+        hist.remove(20)
+        self.assertEqual(hist.search('unique_command'), [('unique_command()', False)])
+        self.check_search(hist)
+        hist.index_step(300)
+        self.check_search(hist)
+        old = hist.history[-1]
+        hist.replace(len(hist) - 1, 'other_command()')
+        hist.remove(0)
+        self.assertEqual(self.exact(hist, old, limit=1000),
+                         linear_search(hist.history, old, 1000))
+        hist.replace(hist.history.index('unique_command()'), 'print(x)')
+        self.assertEqual(self.exact(hist, 'unique_command'), [])
+        self.assertEqual(self.exact(hist, 'other_command'), ['other_command()'])
+        while hist.index_step(300):
+            pass
+        self.check_search(hist)
+
+    def test_fuzzy_ranking(self):
+        hist = self.store(['abcdefgX', 'abcdXXXX', 'abcdeXXX', 'XabcdefgY', 'other'])
+        while hist.index_step():
+            pass
+        # trigrams of the query: abc bcd cde def efg fgh (fgh is never used)
+        self.assertEqual(hist.search('abcdefgh'),
+                         [('XabcdefgY', True), ('abcdefgX', True), ('abcdeXXX', True)])
+        self.assertEqual(hist.search('abcdefgh', limit=2),
+                         [('XabcdefgY', True), ('abcdefgX', True)])
+        # exact matches come first and are not repeated in the fuzzy ones
+        self.assertEqual(hist.search('abcdefg'),
+                         [('XabcdefgY', False), ('abcdefgX', False), ('abcdeXXX', True)])
+        # a single trigram: no fuzzy search
+        self.assertEqual(hist.search('bcx'), [])
+
+    def test_fuzzy_unindexed(self):
+        """The fuzzy search only uses the indexed commands."""
+        hist = self.store(['abcdefgX', 'other'])
+        self.assertEqual(hist.search('abcdefgh'), [])
+        hist.index_step()
+        self.assertEqual(hist.search('abcdefgh'), [('abcdefgX', True)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Single instance socket handling
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'pytkeditorlib', 'utils'))
+
+import instance  # noqa: E402
+
+
+class TestRelease(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        for name, value in [('LOCAL_PATH', tmpdir.name),
+                            ('SOCKET_PATH', os.path.join(tmpdir.name, 'pytkeditor.sock')),
+                            ('LOCK_PATH', os.path.join(tmpdir.name, 'pytkeditor.lock')),
+                            ('_server_id', None)]:
+            patcher = mock.patch.object(instance, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_release_own_socket(self):
+        primary, server = instance.claim([])
+        self.assertTrue(primary)
+        instance.release(server)
+        self.assertFalse(os.path.exists(instance.SOCKET_PATH))
+
+    def test_release_replaced_socket(self):
+        """A frozen instance must not remove the socket of the instance that replaced it."""
+        for i in range(10):  # the inode of the removed socket is often reused
+            primary, old = instance.claim([])
+            old_id = instance._server_id
+            os.remove(instance.SOCKET_PATH)  # taken over by a new instance
+            new = instance._listen()
+            new_id = instance._server_id
+            instance._server_id = old_id
+            instance.release(old)
+            self.assertTrue(os.path.exists(instance.SOCKET_PATH))
+            instance._server_id = new_id
+            instance.release(new)
+            self.assertFalse(os.path.exists(instance.SOCKET_PATH))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+PyTkEditor - Python IDE
+Copyright 2018-2020 Juliette Monsel <j_4321 at protonmail dot com>
+
+PyTkEditor is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyTkEditor is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Check that the modules deferred by utils/lazy_import.py are not imported at startup
+"""
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules only needed once their feature is used
+DEFERRED = ('jedi', 'docutils', 'pdfkit', 'cups', 'Xlib', 'jupyter_client', 'zmq')
+
+IMPORT_SCRIPT = f"""
+import json, sys
+try:
+    import pytkeditorlib.app
+except ModuleNotFoundError as e:
+    print(json.dumps({{'missing': e.name}}))
+else:
+    print(json.dumps({{'imported': [m for m in {DEFERRED!r} if m in sys.modules]}}))
+"""
+
+# the deferred modules are loaded on purpose by App._warm_up after the first frame
+FIRST_FRAME_SCRIPT = f"""
+import json, os, sys
+try:
+    from pytkeditorlib.app import App
+except ModuleNotFoundError as e:
+    print(json.dumps({{'missing': e.name}}))
+    sys.exit()
+
+App._warm_up = lambda self: None
+app = App(str(os.getpid()))
+
+
+def first_frame():
+    print(json.dumps({{'imported': [m for m in {DEFERRED!r} if m in sys.modules]}}),
+          flush=True)
+    app.quit()
+
+
+app.after_idle(app.after, 1, first_frame)
+app.mainloop()
+"""
+
+
+class TestLazyImports(unittest.TestCase):
+    def check_imports(self, cmd, cwd, env=None):
+        """Run cmd and check the deferred modules it reports as imported."""
+        proc = subprocess.Popen(cmd, cwd=cwd, env=env, start_new_session=True,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                universal_newlines=True)
+        try:
+            stdout, stderr = proc.communicate(timeout=120)
+        finally:
+            # stop the processes started by the app (console, splash screen)
+            try:
+                os.killpg(proc.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            proc.wait()
+        lines = [line for line in stdout.splitlines() if line.startswith('{')]
+        self.assertTrue(lines, stderr)
+        result = json.loads(lines[-1])
+        missing = result.get('missing')
+        if missing is not None:
+            missing = missing.split('.')[0]
+            self.assertNotIn(missing, DEFERRED, f'{missing} is imported at startup')
+            self.skipTest(f'dependency {missing} is not installed')
+        self.assertEqual(result['imported'], [],
+                         'modules imported at startup instead of on first use')
+
+    def test_app_import(self):
+        """Importing pytkeditorlib.app must not import the deferred modules."""
+        self.check_imports([sys.executable, '-c', IMPORT_SCRIPT], ROOT)
+
+    def test_first_frame(self):
+        """Creating the window must not import the deferred modules."""
+        cmd = [sys.executable, '-c', FIRST_FRAME_SCRIPT]
+        if not os.environ.get('DISPLAY'):
+            if shutil.which('xvfb-run') is None:
+                self.skipTest('no display')
+            cmd = ['xvfb-run', '-a'] + cmd
+        # run a copy of the package so that its config (written in the
+        # package folder when it is not installed) is not modified
+        with tempfile.TemporaryDirectory() as tmpdir:
+            shutil.copytree(os.path.join(ROOT, 'pytkeditorlib'),
+                            os.path.join(tmpdir, 'pytkeditorlib'),
+                            ignore=shutil.ignore_patterns('config', '__pycache__'))
+            env = dict(os.environ, HOME=tmpdir)
+            self.check_imports(cmd, tmpdir, env)
+
+
+if __name__ == '__main__':
+    unittest.main()